@@ -0,0 +1,22 @@
+"""
+Application preloading for pre-forking servers
+
+Called in the server's master process before workers are forked, so
+every worker shares the imported modules instead of importing them again.
+"""
+from django.contrib.auth.hashers import get_hashers
+from django.db import connections
+from django.urls import get_resolver
+
+
+def warm_up():
+    """Import everything an ordinary request needs and drop any DB connection."""
+    # Imports every URLconf, view, serializer and authentication class.
+    get_resolver().url_patterns
+
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+    jwt_settings.AUTH_TOKEN_CLASSES
+    get_hashers()
+
+    # Connections must not be shared with forked workers.
+    connections.close_all()
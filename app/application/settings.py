@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,6 +29,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Addresses allowed to reach internal endpoints such as pool statistics.
+INTERNAL_IPS = [ip.strip() for ip in os.environ.get('INTERNAL_IPS', '127.0.0.1').split(',') if ip.strip()]
+
 
 # Application definition
 
@@ -48,15 +52,52 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.PrometheusMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.memprofile.MemoryProfilingMiddleware',
+    'core.instrumentation.ServerTimingMiddleware',
+    'core.querycheck.QueryInspectionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_routing.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Compress JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES with
+# brotli (if the brotli package is installed) or gzip, as the client accepts.
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', '1') == '1'
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 4))
+
+# Fraction of requests measured by ServerTimingMiddleware, 0 disables it.
+# With PERF_TIMING_HEADER, INTERNAL_IPS and staff also get a Server-Timing header.
+PERF_TIMING_SAMPLE_RATE = float(os.environ.get('PERF_TIMING_SAMPLE_RATE', 0.01))
+PERF_TIMING_HEADER = os.environ.get('PERF_TIMING_HEADER', '0') == '1'
+
+# Log repeated (N+1) and slow queries per request, meant for staging.
+QUERY_INSPECTION_ENABLED = os.environ.get('QUERY_INSPECTION_ENABLED', '0') == '1'
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+QUERY_SLOW_MS = float(os.environ.get('QUERY_SLOW_MS', 100))
+
+# Profile a fraction of requests, and requests with a signed X-Profile
+# header from `manage.py profile_token`, into PROFILER_OUTPUT_DIR.
+# PROFILER_MODE is 'sampling' (collapsed stacks) or 'cprofile' (pstats).
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '0') == '1'
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+PROFILER_MODE = os.environ.get('PROFILER_MODE', 'sampling')
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+PROFILER_OUTPUT_DIR = os.environ.get('PROFILER_OUTPUT_DIR', '/vol/web/profiles')
+PROFILER_TOKEN_MAX_AGE = int(os.environ.get('PROFILER_TOKEN_MAX_AGE', 3600))
+
+# Log tracemalloc peak and retained memory per request stage, diagnostic only.
+MEMORY_PROFILING_ENABLED = os.environ.get('MEMORY_PROFILING_ENABLED', '0') == '1'
+MEMORY_PROFILING_SAMPLE_RATE = float(os.environ.get('MEMORY_PROFILING_SAMPLE_RATE', 1.0))
+
 ROOT_URLCONF = 'application.urls'
 
 TEMPLATES = [
@@ -80,6 +121,11 @@ WSGI_APPLICATION = 'application.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Connections are either kept per thread for DB_CONN_MAX_AGE seconds, or,
+# with DB_POOL=1, borrowed from a psycopg pool (requires psycopg[pool]).
+# Django does not allow both, so CONN_MAX_AGE is forced to 0 when pooling.
+
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
 
 DATABASES = {
     'default': {
@@ -88,10 +134,147 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'OPTIONS': {},
+    }
+}
+
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+    }
+
+# Read replicas share the primary's credentials. Safe requests to views with
+# read_from_replica = True read from them, and users who just wrote are
+# pinned to the primary for DB_REPLICA_PIN_SECONDS.
+
+DB_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(alias)
+
+# Tests get a replica mirroring the primary's test database, a second
+# connection that routing tests enable with DB_REPLICAS=['replica_1'].
+if not DB_REPLICAS and sys.argv[1:2] == ['test']:
+    DATABASES['replica_1'] = {
+        **DATABASES['default'],
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+
+DATABASE_ROUTERS = ['core.db_routing.ReplicaRouter']
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://redis:6379/0) in production so state such as
+# replica pins, token endpoint slots and recipe index generations is visible
+# to every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
 
+# Users whose in-memory recipe index (similar recipes, pantry matching,
+# tag filters) each worker keeps.
+RECIPE_INDEX_CACHE_SIZE = int(os.environ.get('RECIPE_INDEX_CACHE_SIZE', 256))
+# Answer tag and ingredient filters of the recipe list from that index
+# instead of joins on the link tables.
+RECIPE_BITMAP_FILTERS = os.environ.get('RECIPE_BITMAP_FILTERS', '0') == '1'
+# Indexes are only kept between requests with a shared cache, which tells
+# every worker about changes. Set this to keep them with a local memory
+# cache when a single process serves the API.
+RECIPE_INDEX_SINGLE_PROCESS = os.environ.get('RECIPE_INDEX_SINGLE_PROCESS', '0') == '1'
+
+
+# Delta sync change log entries older than this are pruned by
+# `manage.py prune_change_log`, clients that last synced before them resync.
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', 30))
+
+
+# Background jobs, run by `manage.py run_workers`. A job not finished within
+# its visibility timeout (seconds) is claimed again by another worker, and
+# failed attempts are retried after RETRY_BACKOFF * 2 ** (attempt - 1)
+# seconds, at most RETRY_BACKOFF_MAX.
+
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 1))
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 1))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 10))
+JOB_RETRY_BACKOFF_MAX = float(os.environ.get('JOB_RETRY_BACKOFF_MAX', 3600))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+# The first hasher is used for new hashes; stored hashes made with another
+# hasher or cost are upgraded transparently on the next successful login.
+
+PASSWORD_HASHERS = [
+    hasher.strip() for hasher in os.environ.get(
+        'PASSWORD_HASHERS',
+        'core.hashers.PBKDF2PasswordHasher,'
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher,'
+        'django.contrib.auth.hashers.Argon2PasswordHasher,'
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher,'
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ).split(',') if hasher.strip()
+]
+
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None
+
+# Token endpoint concurrency. The slots live in the default cache under a
+# key with the host name, so with a shared cache the bound covers all
+# workers of one host (hence the CPU count), not the whole cluster, and with
+# a local-memory cache only the threads of a single worker.
+# A slot held by a killed worker is freed after AUTH_TOKEN_SLOT_LEASE seconds,
+# which has to be well above the slowest login for slots to be released.
+
+AUTH_TOKEN_MAX_CONCURRENCY = int(os.environ.get('AUTH_TOKEN_MAX_CONCURRENCY', os.cpu_count() or 1))
+AUTH_TOKEN_SLOT_LEASE = int(os.environ.get('AUTH_TOKEN_SLOT_LEASE', 30))
+AUTH_TOKEN_QUEUE_TIMEOUT = float(os.environ.get('AUTH_TOKEN_QUEUE_TIMEOUT', 0.05))
+AUTH_TOKEN_RETRY_AFTER = int(os.environ.get('AUTH_TOKEN_RETRY_AFTER', 1))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -142,6 +325,11 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # FastJSONRenderer uses orjson when installed, rest_framework.renderers.JSONRenderer is the stdlib one.
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
@@ -150,3 +338,8 @@ REST_FRAMEWORK = {
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Rendered schemas are cached per code version. APP_VERSION (e.g. the git
+# sha) names the version, otherwise a digest of the sources is used.
+APP_VERSION = os.environ.get('APP_VERSION', '')
+SCHEMA_CACHE_DIR = os.environ.get('SCHEMA_CACHE_DIR', str(BASE_DIR / '.schema_cache'))
@@ -1,15 +1,18 @@
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from django.conf.urls.static import static
 from django.conf import settings
+from core import views as core_views
+from core.lazy import lazy_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
+    path('api/schema/', lazy_view('core.schema.CachedSpectacularAPIView'), name='api-schema'),
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='api-schema'), name='api-docs'),
     path('api/user/', include('user.urls')),
     path('api/user/', include('recipe.urls')),
+    path('internal/db/pool/', core_views.db_pool_stats, name='db-pool-stats'),
+    path('metrics', core_views.metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
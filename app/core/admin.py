@@ -1,13 +1,16 @@
 """Djanngo Admin customization"""
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Recipe, Tag, Ingredient
+from .jobs import enqueue
+from .models import User, Recipe, Tag, Ingredient, UserDeletion, Job
 from django.utils.translation import gettext_lazy as _
+from user.deletion import request_deletion
 
 class UserAdmin(BaseUserAdmin):
     """Admin class for the User model"""
     ordering = ['id']
-    list_display = ['email', 'name']
+    list_display = ['email', 'name', 'is_active']
+    actions = ['delete_in_background']
     fieldsets = (
         (None, {'fields': ('email', 'name')}),
         (_('Permissions'), {
@@ -24,7 +27,43 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    @admin.action(description=_('Deactivate and delete selected users in the background'))
+    def delete_in_background(self, request, queryset):
+        """Deactivate the users now and queue jobs deleting their data, see User deletions for progress."""
+        users = list(queryset)
+        for user in users:
+            enqueue('user.delete', {'deletion_id': request_deletion(user).pk})
+        self.message_user(request, _('%(count)d users deactivated and queued for deletion.') % {'count': len(users)})
+
+
+class UserDeletionAdmin(admin.ModelAdmin):
+    """Admin class showing the progress of batched user deletions"""
+    ordering = ['-requested_at']
+    list_display = ['email', 'status', 'progress', 'requested_at', 'started_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['user', 'email', 'status', 'progress', 'error', 'requested_at', 'started_at', 'finished_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Admin class listing background jobs and their last error"""
+    ordering = ['-id']
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = [
+        'name', 'payload', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_until', 'locked_by',
+        'last_error', 'created_at', 'finished_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(User, UserAdmin)
+admin.site.register(UserDeletion, UserDeletionAdmin)
+admin.site.register(Job, JobAdmin)
 admin.site.register(Recipe)
 admin.site.register(Tag)
 admin.site.register(Ingredient)
@@ -0,0 +1,158 @@
+"""
+In-process benchmark helpers
+
+A Scenario issues one request per call. ``measure`` times repeated calls
+and reports latency percentiles, queries per request and memory allocated
+per request; ``compare`` checks a run against a stored baseline.
+"""
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import connection
+
+from .instrumentation import wrap_queries
+from .metrics import QueryCounter
+
+# Latency and allocation metrics may drift by the threshold, query counts may not grow at all.
+COMPARED_METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'alloc_peak_kb': True,
+    'queries': False,
+}
+
+
+class BenchmarkError(Exception):
+    """A scenario did not return the expected response."""
+
+
+@dataclass
+class Scenario:
+    """A named request to benchmark."""
+    name: str
+    request: Callable
+    expected_status: int = 200
+
+
+@dataclass
+class Regression:
+    """A metric that got worse than the baseline allows."""
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+
+    def describe(self):
+        return f'{self.scenario} {self.metric}: {self.baseline:.2f} -> {self.current:.2f}'
+
+
+def percentile(samples, pct):
+    """Linearly interpolated percentile of the samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError('percentile of no samples')
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _call(scenario):
+    response = scenario.request()
+    if response.status_code != scenario.expected_status:
+        raise BenchmarkError(
+            f'{scenario.name} returned {response.status_code}, '
+            f'expected {scenario.expected_status}: {response.content[:500]!r}'
+        )
+    return response
+
+
+def measure(scenario, iterations, warmup=3, memory_iterations=5):
+    """Run a scenario and return its latency, query and allocation statistics."""
+    for _ in range(warmup):
+        _call(scenario)
+
+    durations = []
+    counter = QueryCounter()
+    with wrap_queries(counter):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            _call(scenario)
+            durations.append((time.perf_counter() - started) * 1000)
+
+    # Tracing slows every allocation down, so memory is measured in its own pass.
+    peaks = []
+    retained = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            _call(scenario)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - before) / 1024)
+            retained.append((current - before) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.fmean(durations),
+        'p50_ms': percentile(durations, 50),
+        'p95_ms': percentile(durations, 95),
+        'p99_ms': percentile(durations, 99),
+        'max_ms': max(durations),
+        'queries': counter.count / iterations,
+        'alloc_peak_kb': statistics.median(peaks) if peaks else 0.0,
+        'alloc_retained_kb': statistics.median(retained) if retained else 0.0,
+    }
+
+
+def run(scenarios, iterations, warmup=3, memory_iterations=5, on_result=None):
+    """Measure every scenario and return the results document."""
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = measure(scenario, iterations, warmup, memory_iterations)
+        if on_result is not None:
+            on_result(scenario.name, results[scenario.name])
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'database': connection.vendor,
+        },
+        'scenarios': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of a results document against a baseline document."""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric, relative in COMPARED_METRICS.items():
+            if metric not in previous:
+                continue
+            allowed = previous[metric] * (1 + threshold) if relative else previous[metric]
+            if current[metric] > allowed:
+                regressions.append(Regression(name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save(results, path):
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
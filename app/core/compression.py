@@ -0,0 +1,113 @@
+"""
+Negotiated compression of JSON responses
+
+CompressionMiddleware compresses JSON responses of at least
+RESPONSE_COMPRESSION_MIN_BYTES with brotli, when the brotli package is
+installed and the client accepts it, or with gzip. Smaller responses are
+sent as they are, compressing them costs more time than it saves on the
+wire. HTML pages are left alone, their CSRF tokens next to user input
+would make compressed sizes leak secrets (BREACH).
+
+JSON responses carry tokens and user data too, so like GZipMiddleware every
+compressed body is made up to MAX_RANDOM_BYTES longer by a random amount:
+gzip through random bytes in its header, brotli through random trailing
+JSON whitespace.
+"""
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is used without it.
+    brotli = None
+
+# Same bound as django.middleware.gzip.GZipMiddleware.max_random_bytes.
+MAX_RANDOM_BYTES = 100
+JSON_WHITESPACE = b' \t\n\r'
+
+
+def accepted_encodings(header):
+    """Content codings of an Accept-Encoding header not refused with q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(header):
+    """Preferred coding the client accepts: 'br', 'gzip' or None."""
+    accepted = accepted_encodings(header)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def json_padding(max_bytes):
+    """Random JSON whitespace adding up to about max_bytes once compressed.
+
+    Each character is one of four, so it costs about two bits compressed.
+    """
+    length = secrets.randbelow(4 * max_bytes + 1)
+    return bytes(secrets.choice(JSON_WHITESPACE) for _ in range(length))
+
+
+def compress(content, encoding):
+    """Compress JSON content with 'br' or 'gzip', padded by a random length."""
+    if encoding == 'br':
+        return brotli.compress(
+            content + json_padding(MAX_RANDOM_BYTES),
+            quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY,
+        )
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+class CompressionMiddleware:
+    """Compress large JSON responses with brotli or gzip, as the client accepts."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.RESPONSE_COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+            or not response.get('Content-Type', '').split(';')[0].strip().endswith('json')
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body differs byte for byte, a strong ETag would claim otherwise.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,107 @@
+"""
+Read replica routing with read-your-writes stickiness
+
+Safe-method requests to views marked with ``read_from_replica = True`` read
+from one of ``settings.DB_REPLICAS``. A successful write pins the writing
+user to the primary for ``DB_REPLICA_PIN_SECONDS`` so they always see their
+own changes. The pin lives in the default cache, which has to be shared
+between workers for the pin to hold across processes.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import LazyObject
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_reads = ContextVar('replica_reads', default=None)
+
+
+def pin_key(user_id):
+    """Cache key marking a user as pinned to the primary."""
+    return f'db-routing:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary for the configured window."""
+    cache.set(pin_key(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+class ReplicaReads:
+    """Per-request decision whether reads may go to a replica."""
+
+    def __init__(self, request, replica):
+        self.request = request
+        self.replica = replica
+        self._allowed = None
+
+    def allowed(self):
+        """Return True once the user is known and not pinned to the primary."""
+        if self._allowed is not None:
+            return self._allowed
+
+        user = self.request.__dict__.get('user')
+        if user is None or isinstance(user, LazyObject):
+            # Still authenticating, the user lookup itself goes to the primary.
+            return False
+        if not user.is_authenticated:
+            self._allowed = True
+        else:
+            self._allowed = not cache.get(pin_key(user.pk))
+        return self._allowed
+
+
+class ReplicaRouter:
+    """Route reads of the current request to its replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        reads = _replica_reads.get()
+        if reads is not None and reads.allowed():
+            return reads.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DB_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Enable replica reads for eligible views and pin users after writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DB_REPLICAS:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            token = request.__dict__.pop('_replica_reads_token', None)
+            if token is not None:
+                _replica_reads.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DB_REPLICAS or request.method not in SAFE_METHODS:
+            return None
+        if getattr(getattr(view_func, 'cls', None), 'read_from_replica', False):
+            reads = ReplicaReads(request, random.choice(settings.DB_REPLICAS))
+            request._replica_reads_token = _replica_reads.set(reads)
+        return None
@@ -0,0 +1,25 @@
+"""
+View decorators shared across apps
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponseForbidden
+
+
+def is_internal(request):
+    """Whether the request comes from INTERNAL_IPS or a staff user."""
+    user = getattr(request, 'user', None)
+    return request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS or bool(user and user.is_staff)
+
+
+def internal_only(view_func):
+    """Allow the view only from INTERNAL_IPS or for staff users."""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if is_internal(request):
+            return view_func(request, *args, **kwargs)
+        return HttpResponseForbidden()
+
+    return wrapper
@@ -0,0 +1,17 @@
+"""
+Password hashers with cost tunable from settings
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher as BasePBKDF2PasswordHasher
+
+
+class PBKDF2PasswordHasher(BasePBKDF2PasswordHasher):
+    """PBKDF2-SHA256 hasher reading its iteration count from settings.
+
+    The algorithm name is unchanged, so existing hashes keep verifying and
+    are re-encoded with the configured cost on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or BasePBKDF2PasswordHasher.iterations
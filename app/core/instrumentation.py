@@ -0,0 +1,154 @@
+"""
+Per-request performance instrumentation
+
+ServerTimingMiddleware measures DB queries and time, view time and render
+time of sampled requests. It logs them as one structured log line tagged
+with the view, e.g. ``RecipeViewSet.list``, and with PERF_TIMING_HEADER
+reports them in a ``Server-Timing`` header to internal callers only, since
+DB time and query counts tell outsiders too much about the backend.
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.decorators import is_internal
+
+logger = logging.getLogger(__name__)
+
+
+def view_label(request):
+    """Name the view handling the request, as ``ViewSet.action`` for DRF views."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is None:
+        return match.view_name or getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else None
+    return f'{cls.__name__}.{action or request.method.lower()}'
+
+
+class QueryTimer:
+    """Execute wrapper counting queries and the time spent running them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    """Install an execute wrapper on every database connection of this thread."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+class RequestTimings:
+    """Timestamps collected while a sampled request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+        self.queries = QueryTimer()
+
+    def metrics(self, finished):
+        """Return the durations in milliseconds."""
+        view_started = self.view_started or self.started
+        view_finished = self.view_finished or finished
+        metrics = {
+            'total': (finished - self.started) * 1000,
+            'view': (view_finished - view_started) * 1000,
+            'db': self.queries.duration * 1000,
+        }
+        metrics['app'] = max(metrics['view'] - metrics['db'], 0)
+        if self.render_finished is not None:
+            metrics['render'] = (self.render_finished - view_finished) * 1000
+        return metrics
+
+
+def server_timing_header(metrics, query_count):
+    """Format durations as a Server-Timing header value."""
+    entries = []
+    for name, duration in metrics.items():
+        entry = f'{name};dur={duration:.1f}'
+        if name == 'db':
+            entry += f';desc="{query_count} queries"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class ServerTimingMiddleware:
+    """Report DB, view and render time of a sample of requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PERF_TIMING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = request._perf_timings = RequestTimings()
+        with wrap_queries(timings.queries):
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        metrics = timings.metrics(finished)
+        if settings.PERF_TIMING_HEADER and is_internal(request):
+            response['Server-Timing'] = server_timing_header(metrics, timings.queries.count)
+        label = view_label(request)
+        logger.info(
+            'perf view=%s method=%s status=%s queries=%d %s',
+            label,
+            request.method,
+            response.status_code,
+            timings.queries.count,
+            ' '.join(f'{name}_ms={duration:.1f}' for name, duration in metrics.items()),
+            extra={
+                'perf': {
+                    'view': label,
+                    'method': request.method,
+                    'status': response.status_code,
+                    'queries': timings.queries.count,
+                    **{f'{name}_ms': round(duration, 3) for name, duration in metrics.items()},
+                },
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = getattr(request, '_perf_timings', None)
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = getattr(request, '_perf_timings', None)
+        if timings is not None:
+            timings.view_finished = time.perf_counter()
+
+            def render_finished(response):
+                timings.render_finished = time.perf_counter()
+
+            response.add_post_render_callback(render_finished)
+        return response
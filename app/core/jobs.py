@@ -0,0 +1,224 @@
+"""
+Durable background jobs stored in the database
+
+enqueue writes a Job row in the caller's transaction, so a job is only
+seen by workers once the work that queued it has committed. Workers
+(``manage.py run_workers``) claim jobs by marking them running with a
+lease until locked_until. A job whose worker died or overran its lease is
+claimed again once the lease expires, so handlers must be safe to run more
+than once. A failing job is retried with exponential backoff until it has
+used max_attempts, then marked failed.
+
+Postgres claims with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+workers never wait on each other. Other databases claim each candidate
+with a compare-and-set update on its status and attempts.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Claiming on databases without SKIP LOCKED reads this many candidates per job wanted.
+CLAIM_CANDIDATES = 4
+
+
+class JobHandler:
+    """Function registered for a job name, with its lease and attempt limits."""
+
+    def __init__(self, name, func, timeout=None, max_attempts=None):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+
+_registry = {}
+
+
+def job(name, timeout=None, max_attempts=None):
+    """Register the decorated function as the handler of jobs called name.
+
+    The function is called with the job payload as keyword arguments.
+    timeout (seconds) and max_attempts default to JOB_VISIBILITY_TIMEOUT and
+    JOB_MAX_ATTEMPTS.
+    """
+    def register(func):
+        _registry[name] = JobHandler(name, func, timeout, max_attempts)
+        return func
+    return register
+
+
+def autodiscover():
+    """Import the tasks module of every installed app, registering its jobs."""
+    autodiscover_modules('tasks')
+
+
+def get_handler(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'No job handler registered as {name!r}.') from None
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """Queue a job to run in delay seconds, visible to workers once the current transaction commits."""
+    handler = get_handler(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=max_attempts or handler.max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _claimable(now):
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now),
+    ).order_by('run_after', 'id')
+
+
+def _lease(job):
+    handler = _registry.get(job.name)
+    return (handler and handler.timeout) or settings.JOB_VISIBILITY_TIMEOUT
+
+
+def claim(worker_id, limit=1):
+    """Lease up to limit runnable jobs to worker_id and return them.
+
+    Jobs whose lease expired on their last attempt are marked failed
+    instead of being returned.
+    """
+    now = timezone.now()
+    db = router.db_for_write(Job)
+    claimed = []
+    if connections[db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=db):
+            for job in _claimable(now).select_for_update(skip_locked=True)[:limit]:
+                job.status, job.attempts = Job.RUNNING, job.attempts + 1
+                job.locked_by, job.locked_until = worker_id, now + timedelta(seconds=_lease(job))
+                job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_until'])
+                claimed.append(job)
+    else:
+        for job in _claimable(now)[:limit * CLAIM_CANDIDATES]:
+            locked_until = now + timedelta(seconds=_lease(job))
+            taken = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+                status=Job.RUNNING, attempts=job.attempts + 1, locked_by=worker_id, locked_until=locked_until,
+            )
+            if not taken:
+                continue
+            job.status, job.attempts, job.locked_by, job.locked_until = (
+                Job.RUNNING, job.attempts + 1, worker_id, locked_until,
+            )
+            claimed.append(job)
+            if len(claimed) == limit:
+                break
+
+    runnable = []
+    for job in claimed:
+        if job.attempts > job.max_attempts:
+            _finish(job, Job.FAILED, error='Lease expired on the last attempt.')
+        else:
+            runnable.append(job)
+    return runnable
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that failed attempts times, with jitter."""
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _finish(job, status, error='', **fields):
+    """Record the outcome of a claimed job, unless its lease was taken over. Return whether it was recorded."""
+    now = timezone.now()
+    if status == Job.QUEUED:
+        fields['run_after'] = now + timedelta(seconds=backoff(job.attempts))
+    else:
+        fields['finished_at'] = now
+    updated = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts).update(
+        status=status, last_error=error, locked_by='', locked_until=None, **fields,
+    )
+    if updated:
+        job.status, job.last_error = status, error
+    return bool(updated)
+
+
+def run(job):
+    """Run a claimed job, then mark it done, queue its retry or mark it failed."""
+    started = time.monotonic()
+    try:
+        get_handler(job.name).func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        status = Job.QUEUED if job.attempts < job.max_attempts else Job.FAILED
+        logger.exception('Job %s #%s failed on attempt %s of %s', job.name, job.pk, job.attempts, job.max_attempts)
+    else:
+        error = ''
+        status = Job.DONE
+        logger.info('Job %s #%s done in %.2fs', job.name, job.pk, time.monotonic() - started)
+    if not _finish(job, status, error):
+        logger.warning('Job %s #%s overran its lease, its result was discarded', job.name, job.pk)
+    return job
+
+
+class Worker:
+    """Claims and runs jobs in one or more threads until stopped.
+
+    With burst, each thread stops once no job is runnable.
+    """
+
+    def __init__(self, threads=1, poll_interval=None, burst=False):
+        self.threads = threads
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Let running jobs finish, then return from run."""
+        self.stopping.set()
+
+    def run(self):
+        """Run jobs until stopped, return how many were run."""
+        threads = [
+            threading.Thread(target=self._loop, args=(index,), name=f'job-worker-{index}')
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.processed
+
+    def _loop(self, index):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                jobs = claim(worker_id)
+                if not jobs:
+                    if self.burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    run(job)
+                    with self._lock:
+                        self.processed += 1
+        finally:
+            connection.close()
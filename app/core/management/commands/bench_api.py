@@ -0,0 +1,200 @@
+"""
+Django command to benchmark the API endpoints in-process against a seeded database.
+"""
+import io
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+
+BENCH_EMAIL_PREFIX = 'bench-user-'
+BENCH_PASSWORD = 'BenchPassword123'
+HEADER = f'{"scenario":<26}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}{"alloc KB":>10}'
+
+SCENARIOS = [
+    'recipe_list',
+    'recipe_list_tags',
+    'recipe_list_ingredients',
+    'recipe_detail',
+    'recipe_create',
+    'recipe_update',
+    'tag_list_assigned',
+    'ingredient_list_assigned',
+    'token_obtain',
+    'recipe_image_upload',
+]
+
+
+def _png_bytes():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color=(200, 120, 40)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints in-process against a seeded database."""
+
+    help = 'Benchmark API endpoints in-process, report latency percentiles, queries and allocations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario.')
+        parser.add_argument(
+            '--memory-iterations',
+            type=int,
+            default=5,
+            help='Requests per scenario traced with tracemalloc.',
+        )
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only these scenarios.')
+        parser.add_argument('--users', type=int, default=10, help='Users to seed.')
+        parser.add_argument('--max-recipes', type=int, default=2000, help='Largest recipe count per seeded user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated dataset.')
+        parser.add_argument(
+            '--current-db',
+            action='store_true',
+            help='Run against the configured database instead of a throwaway test database.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Compare against results previously written with --output.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.1,
+            help='Allowed relative slowdown against the baseline, 0.1 is 10%%.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive.')
+
+        if not options['current_db']:
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=['testserver']):
+                scenarios = self._scenarios(self._bench_user(options), options['scenario'] or SCENARIOS)
+                self.stdout.write(HEADER)
+                results = benchmarking.run(
+                    scenarios,
+                    options['iterations'],
+                    warmup=options['warmup'],
+                    memory_iterations=options['memory_iterations'],
+                    on_result=self._write_result,
+                )
+        except benchmarking.BenchmarkError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if not options['current_db']:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        if options['output']:
+            benchmarking.save(results, options['output'])
+            self.stdout.write(f'Results written to {options["output"]}.')
+
+        if options['baseline']:
+            regressions = benchmarking.compare(
+                results, benchmarking.load(options['baseline']), options['threshold'],
+            )
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(
+                    regression.describe() for regression in regressions
+                ))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def _write_result(self, name, result):
+        self.stdout.write(
+            f'{name:<26}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+            f'{result["queries"]:>9.1f}{result["alloc_peak_kb"]:>10.1f}'
+        )
+
+    def _bench_user(self, options):
+        """Return the seeded user with the most recipes, seeding the database first if needed."""
+        users = get_user_model().objects.filter(email__startswith=BENCH_EMAIL_PREFIX)
+        if not users.exists():
+            call_command(
+                'seed_data',
+                users=options['users'],
+                max_recipes=options['max_recipes'],
+                seed=options['seed'],
+                email_prefix=BENCH_EMAIL_PREFIX,
+                password=BENCH_PASSWORD,
+                stdout=StringIO(),
+            )
+        return users.annotate(recipe_count=Count('recipe')).order_by('-recipe_count', 'id').first()
+
+    def _scenarios(self, user, names):
+        """Build the requested scenarios for the benchmark user."""
+        client = APIClient()
+        token_url = reverse('user:token')
+        credentials = {'email': user.email, 'password': BENCH_PASSWORD}
+        response = client.post(token_url, credentials)
+        if response.status_code != 200:
+            raise CommandError(f'Could not obtain a token for {user.email}: {response.content!r}')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+        recipe = user.recipe_set.order_by('id').first()
+        if recipe is None:
+            raise CommandError(f'{user.email} has no recipes, seed with a larger --max-recipes.')
+        # Seeded popularity is Zipf-skewed by creation order, the first rows are the most linked.
+        tag_ids = ','.join(str(pk) for pk in user.tag_set.order_by('id').values_list('id', flat=True)[:2])
+        ingredient_ids = str(user.ingredient_set.order_by('id').values_list('id', flat=True).first())
+
+        recipes_url = reverse('recipe:recipe-list')
+        detail_url = reverse('recipe:recipe-detail', args=[recipe.id])
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        image = _png_bytes()
+        new_recipe = {
+            'title': 'Benchmark recipe',
+            'time_minutes': 30,
+            'price': '12.50',
+            'tags': [{'name': 'Benchmark'}, {'name': 'Dinner'}],
+            'ingredients': [{'name': 'Benchmark salt'}],
+        }
+
+        requests = {
+            'recipe_list': (lambda: client.get(recipes_url), 200),
+            'recipe_list_tags': (lambda: client.get(recipes_url, {'tags': tag_ids}), 200),
+            'recipe_list_ingredients': (lambda: client.get(recipes_url, {'ingredients': ingredient_ids}), 200),
+            'recipe_detail': (lambda: client.get(detail_url), 200),
+            'recipe_create': (lambda: client.post(recipes_url, new_recipe, format='json'), 201),
+            'recipe_update': (
+                lambda: client.patch(detail_url, {'title': 'Benchmark update', 'tags': [{'name': 'Benchmark'}]},
+                                     format='json'),
+                200,
+            ),
+            'tag_list_assigned': (lambda: client.get(reverse('recipe:tag-list'), {'assigned_only': 1}), 200),
+            'ingredient_list_assigned': (
+                lambda: client.get(reverse('recipe:ingredient-list'), {'assigned_only': 1}),
+                200,
+            ),
+            'token_obtain': (lambda: APIClient().post(token_url, credentials), 200),
+            'recipe_image_upload': (
+                lambda: client.post(
+                    upload_url,
+                    {'image': SimpleUploadedFile('bench.png', image, content_type='image/png')},
+                    format='multipart',
+                ),
+                200,
+            ),
+        }
+        return [benchmarking.Scenario(name, *requests[name]) for name in names]
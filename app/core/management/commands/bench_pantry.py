@@ -0,0 +1,92 @@
+"""
+Django command to benchmark pantry matching on synthetic recipe indexes.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import percentile
+from core.management.commands.seed_data import zipf_cum_weights
+from recipe.indexes import RecipeIndex
+
+HEADER = f'{"recipes":>9}{"links":>10}{"build ms":>10}{"p50 ms":>9}{"p95 ms":>9}{"scan p50 ms":>13}{"speedup":>9}'
+
+
+def scan_pantry(index, ingredient_ids, limit):
+    """Reference ranking comparing the ingredient set of every recipe with the pantry."""
+    pantry = set(ingredient_ids)
+    ranked = []
+    for recipe_id, ingredients in index.features['ingredients'].items():
+        covered = len(ingredients & pantry)
+        if covered:
+            ranked.append((len(ingredients) - covered, -covered, recipe_id))
+    ranked.sort()
+    return [(recipe_id, missing, -covered) for missing, covered, recipe_id in ranked[:limit]]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark pantry matching on synthetic recipe indexes."""
+
+    help = 'Benchmark pantry matching with bitsets against a per-recipe scan, without a database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, nargs='+', default=[10000, 100000], help='Recipe counts to test.')
+        parser.add_argument('--ingredients', type=int, default=500, help='Distinct ingredients of the user.')
+        parser.add_argument('--ingredients-per-recipe', type=float, default=8, help='Mean ingredients per recipe.')
+        parser.add_argument('--pantry-size', type=int, default=15, help='Ingredients at hand per request.')
+        parser.add_argument('--popularity-skew', type=float, default=1.0, help='Zipf exponent of ingredient use.')
+        parser.add_argument('--limit', type=int, default=20, help='Recipes returned per request.')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per recipe count.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data and pantries.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive.')
+
+        self.stdout.write(HEADER)
+        for recipe_count in options['recipes']:
+            rng = random.Random(options['seed'])
+            index, links = self._index(recipe_count, rng, options)
+            ingredient_ids = list(range(1, options['ingredients'] + 1))
+            cum_weights = zipf_cum_weights(len(ingredient_ids), options['popularity_skew'])
+            pantries = [
+                set(rng.choices(ingredient_ids, cum_weights=cum_weights, k=options['pantry_size']))
+                for _ in range(options['iterations'])
+            ]
+
+            start = time.perf_counter()
+            bitmaps = index.bitmaps()
+            build_ms = (time.perf_counter() - start) * 1000
+
+            timings, scan_timings = [], []
+            for pantry in pantries:
+                start = time.perf_counter()
+                ranked = bitmaps.pantry(pantry, options['limit'])
+                timings.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                expected = scan_pantry(index, pantry, options['limit'])
+                scan_timings.append((time.perf_counter() - start) * 1000)
+                if ranked != expected:
+                    raise CommandError(f'Bitset and scan rankings differ for pantry {sorted(pantry)}.')
+
+            p50, scan_p50 = percentile(timings, 50), percentile(scan_timings, 50)
+            self.stdout.write(
+                f'{recipe_count:>9}{links:>10}{build_ms:>10.1f}{p50:>9.2f}{percentile(timings, 95):>9.2f}'
+                f'{scan_p50:>13.2f}{scan_p50 / p50:>8.1f}x'
+            )
+
+    def _index(self, recipe_count, rng, options):
+        """Build an index with Zipf-popular ingredients the way seed_data links them."""
+        ingredient_ids = list(range(1, options['ingredients'] + 1))
+        cum_weights = zipf_cum_weights(len(ingredient_ids), options['popularity_skew'])
+        index = RecipeIndex()
+        links = 0
+        for recipe_id in range(1, recipe_count + 1):
+            count = min(len(ingredient_ids), int(rng.expovariate(1 / options['ingredients_per_recipe'])))
+            chosen = set(rng.choices(ingredient_ids, cum_weights=cum_weights, k=count))
+            index.add_recipe(recipe_id)
+            index.link('ingredients', recipe_id, chosen)
+            links += len(chosen)
+        return index, links
@@ -0,0 +1,114 @@
+"""
+Django command to benchmark JSON rendering and compression of recipe lists.
+"""
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core import compression, renderers
+from core.benchmarking import percentile
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer
+
+RENDERER_HEADER = f'{"payload":<12}{"renderer":<18}{"p50 ms":>9}{"p95 ms":>9}{"bytes":>10}{"speedup":>9}'
+ENCODING_HEADER = f'{"encoding":<12}{"p50 ms":>9}{"p95 ms":>9}{"bytes":>10}{"ratio":>8}'
+
+
+def timed(func, iterations):
+    """Call func iterations times, return its last result and the durations in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, timings
+
+
+class Command(BaseCommand):
+    """Django command to benchmark JSON rendering and compression of recipe lists."""
+
+    help = (
+        'Time JSONRenderer against FastJSONRenderer and gzip/brotli compression on RecipeSerializer output '
+        'of synthetic recipes, without a database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000, help='Recipes per payload.')
+        parser.add_argument('--tags-per-recipe', type=int, default=3, help='Tags of every recipe.')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8, help='Ingredients of every recipe.')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed renders per payload and renderer.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated recipes.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        if options['iterations'] < 1 or options['recipes'] < 1:
+            raise CommandError('--iterations and --recipes must be positive.')
+        if renderers.orjson is None:
+            self.stdout.write('orjson is not installed, FastJSONRenderer falls back to the stdlib encoder.')
+
+        recipes = self._recipes(random.Random(options['seed']), options)
+        payloads = {
+            # What the recipe list renders, prices already formatted as strings.
+            'serializer': RecipeSerializer(recipes, many=True).data,
+            # Raw values with Decimal prices, as in aggregates rendered without a serializer.
+            'values': [
+                {'id': recipe.id, 'title': recipe.title, 'time_minutes': recipe.time_minutes, 'price': recipe.price}
+                for recipe in recipes
+            ],
+        }
+
+        self.stdout.write(RENDERER_HEADER)
+        rendered = None
+        for name, payload in payloads.items():
+            baseline, baseline_timings = timed(lambda: JSONRenderer().render(payload), options['iterations'])
+            fast, timings = timed(lambda: renderers.FastJSONRenderer().render(payload), options['iterations'])
+            if json.loads(fast) != json.loads(baseline):
+                raise CommandError(f'FastJSONRenderer and JSONRenderer disagree on the {name} payload.')
+            baseline_p50, p50 = percentile(baseline_timings, 50), percentile(timings, 50)
+            self.stdout.write(
+                f'{name:<12}{"JSONRenderer":<18}{baseline_p50:>9.2f}{percentile(baseline_timings, 95):>9.2f}'
+                f'{len(baseline):>10}{1:>8.1f}x'
+            )
+            self.stdout.write(
+                f'{name:<12}{"FastJSONRenderer":<18}{p50:>9.2f}{percentile(timings, 95):>9.2f}'
+                f'{len(fast):>10}{baseline_p50 / p50:>8.1f}x'
+            )
+            rendered = rendered or fast
+
+        self.stdout.write(ENCODING_HEADER)
+        self.stdout.write(f'{"identity":<12}{0:>9.2f}{0:>9.2f}{len(rendered):>10}{1:>8.2f}')
+        for encoding in ['gzip', 'br']:
+            if encoding == 'br' and compression.brotli is None:
+                self.stdout.write('br          skipped, brotli is not installed')
+                continue
+            compressed, timings = timed(lambda: compression.compress(rendered, encoding), options['iterations'])
+            self.stdout.write(
+                f'{encoding:<12}{percentile(timings, 50):>9.2f}{percentile(timings, 95):>9.2f}'
+                f'{len(compressed):>10}{len(rendered) / len(compressed):>8.2f}'
+            )
+
+    def _recipes(self, rng, options):
+        """Unsaved recipes with prefetched tags and ingredients, serializable without queries."""
+        tags = [Tag(id=index, name=f'Tag {index}') for index in range(1, 51)]
+        ingredients = [Ingredient(id=index, name=f'Ingredient {index}') for index in range(1, 501)]
+        recipes = []
+        for recipe_id in range(1, options['recipes'] + 1):
+            recipe = Recipe(
+                id=recipe_id,
+                title=f'Recipe {recipe_id}',
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 10000)) / 100,
+                link=f'https://example.com/recipes/{recipe_id}' if rng.random() < 0.5 else '',
+            )
+            recipe._prefetched_objects_cache = {
+                'tags': sorted(rng.sample(tags, options['tags_per_recipe']), key=lambda tag: tag.id),
+                'ingredients': sorted(
+                    rng.sample(ingredients, options['ingredients_per_recipe']), key=lambda ingredient: ingredient.id,
+                ),
+            }
+            recipes.append(recipe)
+        return recipes
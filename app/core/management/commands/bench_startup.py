@@ -0,0 +1,127 @@
+"""
+Django command to measure application start-up and import time per module.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+{warm_up}
+print('STARTUP_MS', (time.perf_counter() - started) * 1000)
+"""
+
+URLCONF_WARM_UP = """
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+PRELOAD_WARM_UP = """
+from application.preload import warm_up
+warm_up()
+"""
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_import_times(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules
+
+
+class Command(BaseCommand):
+    """Django command to measure application start-up and import time per module."""
+
+    help = 'Start fresh interpreters, load the application and report import time per module.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Number of interpreters to start.')
+        parser.add_argument('--top', type=int, default=20, help='Number of modules to list.')
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help='Measure the full gunicorn warm-up instead of loading the URLconf only.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        if options['runs'] < 1:
+            raise CommandError('--runs must be positive.')
+
+        script = STARTUP_SCRIPT.format(warm_up=PRELOAD_WARM_UP if options['preload'] else URLCONF_WARM_UP)
+        startup_ms = []
+        self_times = defaultdict(list)
+        cumulative_times = defaultdict(list)
+        top_level = set()
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', script],
+                capture_output=True,
+                text=True,
+                cwd=settings.BASE_DIR,
+                env=os.environ.copy(),
+            )
+            if result.returncode:
+                raise CommandError(f'Start-up failed:\n{result.stderr[-2000:]}')
+            startup_ms.append(float(result.stdout.split('STARTUP_MS')[-1]))
+            for name, (self_us, cumulative_us, depth) in parse_import_times(result.stderr).items():
+                self_times[name].append(self_us)
+                cumulative_times[name].append(cumulative_us)
+                if depth == 0:
+                    top_level.add(name)
+
+        modules = {
+            name: {
+                'self_ms': statistics.median(self_times[name]) / 1000,
+                'cumulative_ms': statistics.median(cumulative_times[name]) / 1000,
+                'top_level': name in top_level,
+            }
+            for name in self_times
+        }
+        results = {
+            'runs': options['runs'],
+            'preload': options['preload'],
+            'startup_ms': {
+                'median': statistics.median(startup_ms),
+                'min': min(startup_ms),
+                'max': max(startup_ms),
+            },
+            'module_count': len(modules),
+            'modules': modules,
+        }
+
+        self.stdout.write(
+            f'Start-up: median {results["startup_ms"]["median"]:.1f} ms '
+            f'(min {results["startup_ms"]["min"]:.1f}, max {results["startup_ms"]["max"]:.1f}), '
+            f'{len(modules)} modules imported'
+        )
+        self.stdout.write('Slowest top-level imports (cumulative ms):')
+        slowest = sorted(
+            (name for name in modules if modules[name]['top_level']),
+            key=lambda name: modules[name]['cumulative_ms'],
+            reverse=True,
+        )
+        for name in slowest[:options['top']]:
+            self.stdout.write(f'  {modules[name]["cumulative_ms"]:8.1f}  {name}')
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
@@ -0,0 +1,35 @@
+"""
+Django command to prebuild the cached OpenAPI schema documents.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import translation
+
+from core.schema import CachedSpectacularAPIView, code_version, get_schema_document
+
+
+class Command(BaseCommand):
+    """Django command to prebuild the cached OpenAPI schema documents."""
+
+    help = 'Render the OpenAPI schema in every served format and store it for this code version.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lang',
+            action='append',
+            dest='languages',
+            help='Language to build, may be repeated. Defaults to LANGUAGE_CODE.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        view = CachedSpectacularAPIView()
+        for lang in options['languages'] or [settings.LANGUAGE_CODE]:
+            with translation.override(lang):
+                for renderer_class in view.renderer_classes:
+                    document = get_schema_document(view, renderer_class(), rebuild=True)
+                    self.stdout.write(
+                        f'{lang} {renderer_class.media_type}: {len(document.body)} bytes, '
+                        f'{len(document.gzipped)} gzipped'
+                    )
+        self.stdout.write(self.style.SUCCESS(f'Schema cache built for version {code_version()}.'))
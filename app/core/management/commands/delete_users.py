@@ -0,0 +1,50 @@
+"""
+Django command to delete users and their data in batches.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import UserDeletion
+from user.deletion import DELETE_BATCH_SIZE, request_deletion, run_deletion
+
+
+class Command(BaseCommand):
+    """Django command to delete users and their data in batches."""
+
+    help = (
+        'Deactivate users and delete their recipes, tags, ingredients and links in small committed batches, '
+        'reporting progress. --resume continues deletions that were interrupted or failed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', help='Emails of the users to delete.')
+        parser.add_argument('--resume', action='store_true', help='Also run every unfinished deletion.')
+        parser.add_argument('--batch-size', type=int, default=DELETE_BATCH_SIZE, help='Rows deleted per transaction.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        if not options['emails'] and not options['resume']:
+            raise CommandError('Give the emails of the users to delete or --resume.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        users = list(get_user_model().objects.filter(email__in=options['emails']))
+        missing = set(options['emails']) - {user.email for user in users}
+        if missing:
+            raise CommandError(f'No users with the emails {", ".join(sorted(missing))}.')
+
+        deletion_ids = [request_deletion(user).pk for user in users]
+        if options['resume']:
+            unfinished = UserDeletion.objects.exclude(status=UserDeletion.DONE).exclude(pk__in=deletion_ids)
+            deletion_ids += list(unfinished.order_by('requested_at').values_list('pk', flat=True))
+
+        for deletion_id in deletion_ids:
+            deletion = run_deletion(deletion_id, batch_size=options['batch_size'], report=self._report)
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deletion.email} in {(deletion.finished_at - deletion.started_at).total_seconds():.1f}s.'
+            ))
+
+    def _report(self, deletion):
+        self.stdout.write(
+            f'{deletion.email}: ' + ', '.join(f'{count} {name}' for name, count in deletion.progress.items())
+        )
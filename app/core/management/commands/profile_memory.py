@@ -0,0 +1,88 @@
+"""
+Django command to break down the memory of the recipe list by query, serializer and renderer.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from core.memprofile import MemoryTracker
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to break down the memory of the recipe list by query, serializer and renderer."""
+
+    help = 'Trace allocations of the recipe list per stage and report memory per recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='User whose recipes are listed, defaults to the one with most recipes.')
+        parser.add_argument('--limit', type=int, help='List at most this many recipes.')
+        parser.add_argument('--top', type=int, default=5, help='Allocation sites to show per stage, 0 for none.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        users = get_user_model().objects.all()
+        if options['email']:
+            user = users.filter(email=options['email']).first()
+        else:
+            user = users.annotate(recipe_count=Count('recipe')).order_by('-recipe_count', 'id').first()
+        if user is None:
+            raise CommandError('No such user.')
+
+        request = Request(APIRequestFactory().get('/api/user/recipes/'))
+        request.user = user
+        view = RecipeViewSet(action='list', request=request, format_kwarg=None, kwargs={})
+        queryset = view.get_queryset()
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+        tracker = MemoryTracker(top=options['top'])
+        tracker.start()
+        tracker.begin('query')
+        recipes = list(queryset)
+        tracker.begin('serializer')
+        data = view.get_serializer(recipes, many=True).data
+        tracker.begin('renderer')
+        body = renderer.render(data, renderer_context={'request': request, 'view': view})
+        memory = tracker.stop()
+
+        count = len(recipes)
+        memory.update({
+            'user': user.email,
+            'recipes': count,
+            'response_bytes': len(body),
+            'peak_bytes_per_recipe': memory['peak_kb'] * 1024 / count if count else 0,
+        })
+        self._report(memory)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(memory, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
+
+    def _report(self, memory):
+        count = memory['recipes'] or 1
+        self.stdout.write(
+            f'{memory["recipes"]} recipes of {memory["user"]}, {memory["response_bytes"]} response bytes'
+        )
+        self.stdout.write(f'{"stage":<12}{"peak KB":>12}{"retained KB":>14}{"peak B/recipe":>16}')
+        for name, stage in memory['stages'].items():
+            self.stdout.write(
+                f'{name:<12}{stage["peak_kb"]:>12.1f}{stage["retained_kb"]:>14.1f}'
+                f'{stage["peak_kb"] * 1024 / count:>16.0f}'
+            )
+        self.stdout.write(
+            f'{"total":<12}{memory["peak_kb"]:>12.1f}{memory["retained_kb"]:>14.1f}'
+            f'{memory["peak_bytes_per_recipe"]:>16.0f}'
+        )
+        for name, stage in memory['stages'].items():
+            if stage.get('top'):
+                self.stdout.write(f'Top allocation sites, {name}:')
+                for line in stage['top']:
+                    self.stdout.write(f'  {line}')
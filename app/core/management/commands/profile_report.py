@@ -0,0 +1,72 @@
+"""
+Django command to aggregate request profiles per view into flamegraph-ready files.
+"""
+import pstats
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import read_collapsed
+
+
+class Command(BaseCommand):
+    """Django command to aggregate request profiles per view into flamegraph-ready files."""
+
+    help = (
+        'Merge the collapsed stacks and pstats files of every view. Collapsed output feeds '
+        'flamegraph.pl or speedscope, merged pstats feed snakeviz or gprof2dot.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory, defaults to PROFILER_OUTPUT_DIR.')
+        parser.add_argument('--view', action='append', help='Only report these views, e.g. RecipeViewSet.list.')
+        parser.add_argument('--output-dir', help='Where to write merged files, defaults to <dir>/report.')
+        parser.add_argument('--top', type=int, default=10, help='Number of hot frames to list per view.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        source = Path(options['dir'] or settings.PROFILER_OUTPUT_DIR)
+        output_dir = Path(options['output_dir'] or source / 'report')
+        views = sorted(
+            path for path in source.iterdir()
+            if path.is_dir() and path != output_dir and (not options['view'] or path.name in options['view'])
+        ) if source.is_dir() else []
+        if not views:
+            raise CommandError(f'No profiles found in {source}.')
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for view in views:
+            self.stdout.write(self.style.MIGRATE_HEADING(view.name))
+            collapsed = sorted(view.glob('*.collapsed'))
+            if collapsed:
+                self._report_collapsed(view.name, collapsed, output_dir, options['top'])
+            stats_files = sorted(view.glob('*.pstats'))
+            if stats_files:
+                self._report_pstats(view.name, stats_files, output_dir, options['top'])
+        self.stdout.write(self.style.SUCCESS(f'Report written to {output_dir}.'))
+
+    def _report_collapsed(self, name, paths, output_dir, top):
+        stacks = Counter()
+        for path in paths:
+            stacks.update(read_collapsed(path))
+        total = sum(stacks.values())
+        output = output_dir / f'{name}.collapsed'
+        with open(output, 'w') as fh:
+            for stack, count in stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+        self.stdout.write(f'  {len(paths)} sampled profiles, {total} samples -> {output}')
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        for frame, count in leaves.most_common(top):
+            self.stdout.write(f'  {count / total:7.1%}  {frame}')
+
+    def _report_pstats(self, name, paths, output_dir, top):
+        stats = pstats.Stats(*map(str, paths), stream=self.stdout)
+        output = output_dir / f'{name}.pstats'
+        stats.dump_stats(output)
+        self.stdout.write(f'  {len(paths)} cProfile profiles, {stats.total_calls} calls -> {output}')
+        stats.sort_stats('cumulative').print_stats(top)
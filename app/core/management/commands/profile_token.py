@@ -0,0 +1,24 @@
+"""
+Django command to issue a signed token that requests profiling of a request.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import PROFILE_HEADER, PROFILERS, make_profile_token
+
+
+class Command(BaseCommand):
+    """Django command to issue a signed token that requests profiling of a request."""
+
+    help = f'Print a signed {PROFILE_HEADER} header value, valid for PROFILER_TOKEN_MAX_AGE seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=sorted(PROFILERS), help='Profiler to use, defaults to PROFILER_MODE.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        token = make_profile_token(options['mode'])
+        self.stdout.write(token)
+        self.stderr.write(
+            f'Send it as "{PROFILE_HEADER}: {token}", valid for {settings.PROFILER_TOKEN_MAX_AGE} seconds.'
+        )
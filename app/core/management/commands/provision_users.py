@@ -0,0 +1,139 @@
+"""
+Django command to bulk create users from a CSV or JSON lines file.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _init_worker():
+    """Make sure Django is configured in spawned hashing processes."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _read_csv(fh):
+    yield from csv.DictReader(fh)
+
+
+def _read_jsonl(fh):
+    for line_no, line in enumerate(fh, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise CommandError(f'Invalid JSON on line {line_no}: {e}')
+
+
+READERS = {
+    'csv': _read_csv,
+    'jsonl': _read_jsonl,
+}
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    """Django command to bulk create users from a CSV or JSON lines file."""
+
+    help = 'Create users in batches, hashing passwords across a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file with email, name and password columns.')
+        parser.add_argument('--format', choices=sorted(READERS), help='Input format, guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Hashing processes, 0 hashes in the current process.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError(f'Unknown input format "{fmt}", use --format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        executor = None
+        if options['workers'] > 0:
+            executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker)
+
+        created = skipped = 0
+        started = time.monotonic()
+        try:
+            with open(path, newline='', encoding='utf-8') as fh:
+                for batch in _batches(READERS[fmt](fh), options['batch_size']):
+                    batch_created, batch_skipped = self._provision_batch(batch, executor, options['workers'])
+                    created += batch_created
+                    skipped += batch_skipped
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f'{created} created, {skipped} skipped '
+                        f'({created / elapsed if elapsed else 0:.0f} users/s)'
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Provisioned {created} users, skipped {skipped} in {elapsed:.2f}s '
+            f'({created / elapsed if elapsed else 0:.0f} users/s).'
+        ))
+
+    def _provision_batch(self, rows, executor, workers):
+        """Create the users of one batch, returning created and skipped counts."""
+        user_model = get_user_model()
+        users = {}
+        skipped = 0
+        for row in rows:
+            email = (row.get('email') or '').strip()
+            if not email:
+                skipped += 1
+                continue
+            email = user_model.objects.normalize_email(email)
+            if email in users:
+                skipped += 1
+                continue
+            users[email] = row
+
+        existing = set(
+            user_model.objects.filter(email__in=list(users)).values_list('email', flat=True)
+        )
+        skipped += len(existing)
+        new = [(email, row) for email, row in users.items() if email not in existing]
+        if not new:
+            return 0, skipped
+
+        passwords = [row.get('password') or None for _, row in new]
+        if executor is None:
+            hashes = [make_password(password) for password in passwords]
+        else:
+            chunksize = max(1, len(passwords) // (workers * 4))
+            hashes = list(executor.map(make_password, passwords, chunksize=chunksize))
+
+        user_model.objects.bulk_create([
+            user_model(email=email, name=row.get('name') or '', password=password_hash)
+            for (email, row), password_hash in zip(new, hashes)
+        ])
+        return len(new), skipped
@@ -0,0 +1,36 @@
+"""
+Django command to prune the delta sync change log.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe.sync import PRUNE_BATCH_SIZE, prune_change_log
+
+
+class Command(BaseCommand):
+    """Django command to prune the delta sync change log."""
+
+    help = (
+        'Delete change log entries older than the retention window that a full sync does not need. '
+        'Run it periodically, e.g. daily from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SYNC_LOG_RETENTION_DAYS,
+            help='Keep entries of this many days, defaults to SYNC_LOG_RETENTION_DAYS.',
+        )
+        parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        started = time.monotonic()
+        pruned = prune_change_log(options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {pruned} change log entries older than {options["days"]} days '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
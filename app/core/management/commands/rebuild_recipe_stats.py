@@ -0,0 +1,44 @@
+"""
+Django command to rebuild the per-user recipe summaries.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.jobs import enqueue
+from recipe.stats import rebuild_summary
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the per-user recipe summaries."""
+
+    help = (
+        'Recompute RecipeSummary rows from the recipe tables, e.g. after bulk imports '
+        'such as seed_data that bypass the signals maintaining them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', action='append', help='Only rebuild these users, may be repeated.')
+        parser.add_argument('--queue', action='store_true', help='Queue a job per user for run_workers instead.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        users = get_user_model().objects.order_by('id')
+        if options['email']:
+            users = users.filter(email__in=options['email'])
+
+        started = time.monotonic()
+        count = 0
+        if options['queue']:
+            for user_id in users.values_list('id', flat=True).iterator():
+                enqueue('recipe.rebuild_summary', {'user_id': user_id})
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f'Queued {count} recipe summary rebuilds.'))
+            return
+        for user_id in users.values_list('id', flat=True).iterator():
+            rebuild_summary(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} recipe summaries in {time.monotonic() - started:.1f}s.'
+        ))
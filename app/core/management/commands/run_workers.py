@@ -0,0 +1,85 @@
+"""
+Django command to run background job workers.
+"""
+import multiprocessing
+import signal
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _run_worker(threads, poll_interval, burst):
+    """Run a Worker until SIGTERM or SIGINT, stopping after the running jobs."""
+    # Imported here, spawned processes import this module before django.setup().
+    from core.jobs import Worker
+
+    worker = Worker(threads=threads, poll_interval=poll_interval, burst=burst)
+
+    def stop(signum, frame):
+        worker.stop()
+
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        return worker.run()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def _run_worker_process(threads, poll_interval, burst):
+    django.setup()
+    _run_worker(threads, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    """Django command to run background job workers."""
+
+    help = (
+        'Claim and run queued background jobs. Each process runs --threads worker threads; '
+        'SIGTERM or SIGINT lets running jobs finish before exiting.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Worker processes (JOB_WORKER_PROCESSES).')
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads per process (JOB_WORKER_THREADS).')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds an idle worker waits before looking for jobs again.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is runnable.')
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        processes, threads = options['processes'], options['threads']
+        if processes < 1 or threads < 1:
+            raise CommandError('--processes and --threads must be positive.')
+        worker_args = (threads, options['poll_interval'], options['burst'])
+        self.stdout.write(f'Running {processes} worker processes with {threads} threads each.')
+
+        if processes == 1:
+            processed = _run_worker(*worker_args)
+            self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} jobs.'))
+            return
+
+        # Children start from a fresh interpreter and open their own connections.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        children = [
+            context.Process(target=_run_worker_process, args=worker_args, name=f'job-worker-{index}')
+            for index in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,152 @@
+"""
+Django command to generate a synthetic dataset for scale testing.
+"""
+import random
+import time
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+from recipe.stats import rebuild_summary
+
+ADJECTIVES = ['Spicy', 'Creamy', 'Smoky', 'Crispy', 'Zesty', 'Rustic', 'Golden', 'Hearty', 'Tangy', 'Sweet']
+DISHES = ['Curry', 'Stew', 'Salad', 'Soup', 'Pasta', 'Risotto', 'Tacos', 'Pie', 'Noodles', 'Casserole']
+TAG_WORDS = ['Vegan', 'Quick', 'Dinner', 'Breakfast', 'Dessert', 'Spicy', 'Budget', 'Family', 'Party', 'Healthy']
+INGREDIENT_WORDS = ['Salt', 'Garlic', 'Onion', 'Tomato', 'Rice', 'Chicken', 'Olive Oil', 'Butter', 'Lemon', 'Basil']
+
+
+def zipf_cum_weights(count, skew):
+    """Cumulative weights giving the n-th item a share proportional to 1 / n**skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    """Django command to generate a synthetic dataset for scale testing."""
+
+    help = 'Generate users, recipes, tags and ingredients with skewed distributions using bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--min-recipes', type=int, default=10, help='Smallest recipe count per user.')
+        parser.add_argument('--max-recipes', type=int, default=50000, help='Largest recipe count per user.')
+        parser.add_argument(
+            '--recipe-skew',
+            type=float,
+            default=1.16,
+            help='Pareto shape of recipes per user, lower values give heavier accounts.',
+        )
+        parser.add_argument('--tags-per-user', type=int, default=100)
+        parser.add_argument('--ingredients-per-user', type=int, default=500)
+        parser.add_argument('--tags-per-recipe', type=float, default=3, help='Mean tags per recipe.')
+        parser.add_argument('--ingredients-per-recipe', type=float, default=8, help='Mean ingredients per recipe.')
+        parser.add_argument(
+            '--popularity-skew',
+            type=float,
+            default=1.0,
+            help='Zipf exponent of tag and ingredient popularity.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same data.')
+        parser.add_argument('--password', default='Password123', help='Password of every generated user.')
+        parser.add_argument('--email-prefix', default='seed-user-')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Entry point of the management command."""
+        rng = random.Random(options['seed'])
+        user_model = get_user_model()
+        emails = [f'{options["email_prefix"]}{i}@example.com' for i in range(options['users'])]
+        if user_model.objects.filter(email__in=emails).exists():
+            raise CommandError('Seed users already exist, use another --email-prefix or remove them first.')
+
+        started = time.monotonic()
+        # Hash once, every generated user shares the same password.
+        password_hash = make_password(options['password'])
+        users = user_model.objects.bulk_create(
+            [user_model(email=email, name=f'Seed User {i}', password=password_hash) for i, email in enumerate(emails)],
+            batch_size=options['batch_size'],
+        )
+
+        totals = {'users': len(users), 'recipes': 0, 'tags': 0, 'ingredients': 0, 'links': 0}
+        for user in users:
+            with transaction.atomic():
+                for name, count in self._seed_user(user, rng, options).items():
+                    totals[name] += count
+
+        elapsed = time.monotonic() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{count} {name}' for name, count in totals.items()) +
+            f' created in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s).'
+        ))
+
+    def _seed_user(self, user, rng, options):
+        """Create one user's tags, ingredients, recipes and links."""
+        batch_size = options['batch_size']
+        recipe_count = min(
+            options['max_recipes'],
+            int(options['min_recipes'] * rng.paretovariate(options['recipe_skew'])),
+        )
+
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f'{rng.choice(TAG_WORDS)} {i}') for i in range(options['tags_per_user'])],
+            batch_size=batch_size,
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            [
+                Ingredient(user=user, name=f'{rng.choice(INGREDIENT_WORDS)} {i}')
+                for i in range(options['ingredients_per_user'])
+            ],
+            batch_size=batch_size,
+        )
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    user=user,
+                    title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}',
+                    time_minutes=max(1, int(rng.lognormvariate(3.3, 0.6))),
+                    price=Decimal(min(99999, int(rng.lognormvariate(7, 0.8)))) / 100,
+                    link='',
+                )
+                for i in range(recipe_count)
+            ],
+            batch_size=batch_size,
+        )
+
+        links = self._link(Recipe.tags.through, 'tag_id', recipes, tags, options['tags_per_recipe'], rng, options)
+        links += self._link(
+            Recipe.ingredients.through, 'ingredient_id', recipes, ingredients,
+            options['ingredients_per_recipe'], rng, options,
+        )
+        # Bulk inserts send no signals, log the rows so a first sync returns them.
+        logged = [(ChangeLog.TAG, tags), (ChangeLog.INGREDIENT, ingredients), (ChangeLog.RECIPE, recipes)]
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(user=user, kind=kind, object_id=obj.id) for kind, objs in logged for obj in objs],
+            batch_size=batch_size,
+        )
+        # Nor do they keep the summary current, build it so stats come from it.
+        rebuild_summary(user.id)
+        return {'recipes': len(recipes), 'tags': len(tags), 'ingredients': len(ingredients), 'links': links}
+
+    def _link(self, through, target_field, recipes, targets, mean, rng, options):
+        """Attach Zipf-popular targets to recipes, inserting through rows in batches."""
+        if not targets or mean <= 0:
+            return 0
+        target_ids = [target.id for target in targets]
+        cum_weights = zipf_cum_weights(len(target_ids), options['popularity_skew'])
+        created = 0
+        rows = []
+        for recipe in recipes:
+            count = min(len(target_ids), int(rng.expovariate(1 / mean)))
+            chosen = set(rng.choices(target_ids, cum_weights=cum_weights, k=count))
+            rows.extend(through(recipe_id=recipe.id, **{target_field: target_id}) for target_id in chosen)
+            if len(rows) >= options['batch_size']:
+                through.objects.bulk_create(rows, batch_size=options['batch_size'])
+                created += len(rows)
+                rows = []
+        through.objects.bulk_create(rows, batch_size=options['batch_size'])
+        return created + len(rows)
@@ -2,23 +2,92 @@
 Django command to wait until the database has become available.
 """
 
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+import random
 import time
 from psycopg2 import OperationalError as PsycopgOperationalError
 from django.db.utils import OperationalError
 
+
+class MigrationsPending(Exception):
+    """Raised when a database is reachable but not fully migrated."""
+
+
 class Command(BaseCommand):
     """Django command to wait until the database has become available."""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Database alias to wait for, may be repeated. Defaults to all configured databases.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Give up and exit non-zero after this many seconds, 0 waits forever.',
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.5, help='First backoff delay in seconds.')
+        parser.add_argument('--max-delay', type=float, default=10, help='Upper bound of a single backoff delay.')
+        parser.add_argument(
+            '--migrations',
+            action='store_true',
+            help='Also wait until every migration has been applied.',
+        )
+
     def handle(self, *args, **options):
         """Entry point of the management command."""
         self.stdout.write('Waiting for database connection...')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (PsycopgOperationalError, OperationalError) as e:
-                self.stdout.write('Database connection failed. Waiting 1 second')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Database connection successful.'))
\ No newline at end of file
+        pending = list(options['databases'] or settings.DATABASES)
+        deadline = time.monotonic() + options['timeout'] if options['timeout'] else None
+        attempt = 0
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            while True:
+                results = list(executor.map(
+                    lambda alias: self._check_database(alias, options['migrations']),
+                    pending,
+                ))
+                failures = {alias: error for alias, error in zip(pending, results) if error}
+                if not failures:
+                    break
+
+                pending = list(failures)
+                delay = random.uniform(0, min(options['max_delay'], options['initial_delay'] * 2 ** attempt))
+                attempt += 1
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise CommandError(
+                            'Timed out waiting for database: ' +
+                            ', '.join(f'{alias} ({error})' for alias, error in failures.items())
+                        )
+                    delay = min(delay, remaining)
+
+                for alias, error in failures.items():
+                    self.stdout.write(f'Database {alias} unavailable ({error}). Retrying in {delay:.2f} seconds')
+                time.sleep(delay)
+
+        self.stdout.write(self.style.SUCCESS('Database connection successful.'))
+
+    def _check_database(self, alias, migrations):
+        """Return None when the database is ready, otherwise a short reason."""
+        try:
+            self.check(databases=[alias])
+            if migrations:
+                connection = connections[alias]
+                executor = MigrationExecutor(connection)
+                plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+                if plan:
+                    raise MigrationsPending(f'{len(plan)} migrations pending')
+        except (PsycopgOperationalError, OperationalError, MigrationsPending) as e:
+            return str(e).strip() or e.__class__.__name__
+        finally:
+            connections[alias].close()
+        return None
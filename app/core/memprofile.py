@@ -0,0 +1,130 @@
+"""
+Memory profiling of requests by stage
+
+MemoryTracker measures consecutive stages with tracemalloc: the peak
+allocated above the stage start and what the stage left allocated. The
+opt-in MemoryProfilingMiddleware tracks the request, view (query and
+serializer) and render stages of sampled requests and logs them per view.
+``manage.py profile_memory`` separates query, serializer and renderer of
+the recipe list and reports memory per recipe.
+
+tracemalloc traces the whole process, so measure in single-threaded
+workers; concurrent requests are counted in the stage they overlap.
+"""
+import logging
+import random
+import threading
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import view_label
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+class MemoryTracker:
+    """Peak and retained allocations of consecutive stages."""
+
+    def __init__(self, top=0):
+        self.top = top
+        self.stages = {}
+        self._started_tracing = False
+        self._stage = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+
+    def begin(self, name):
+        """Start a stage, ending the current one."""
+        self.end()
+        tracemalloc.reset_peak()
+        snapshot = _snapshot() if self.top else None
+        self._stage = (name, tracemalloc.get_traced_memory()[0], snapshot)
+
+    def end(self):
+        """End the current stage and record its allocations."""
+        if self._stage is None:
+            return
+        name, before, snapshot = self._stage
+        self._stage = None
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak - self.baseline)
+        stage = {'peak_kb': (peak - before) / 1024, 'retained_kb': (current - before) / 1024}
+        if snapshot is not None:
+            stage['top'] = [str(stat) for stat in _snapshot().compare_to(snapshot, 'lineno')[:self.top]]
+        self.stages[name] = stage
+
+    def stop(self):
+        """End tracking and return the totals and stages."""
+        self.end()
+        current = tracemalloc.get_traced_memory()[0]
+        if self._started_tracing:
+            tracemalloc.stop()
+        return {
+            'peak_kb': self.peak / 1024,
+            'retained_kb': (current - self.baseline) / 1024,
+            'stages': self.stages,
+        }
+
+
+class MemoryProfilingMiddleware:
+    """Log peak and retained allocations per stage of sampled requests."""
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = settings.MEMORY_PROFILING_SAMPLE_RATE
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        if not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            tracker = request._memory_tracker = MemoryTracker()
+            tracker.start()
+            tracker.begin('request')
+            try:
+                response = self.get_response(request)
+            finally:
+                memory = tracker.stop()
+        finally:
+            self._lock.release()
+
+        label = view_label(request)
+        logger.info(
+            'memory view=%s method=%s status=%s peak_kb=%.1f retained_kb=%.1f %s',
+            label,
+            request.method,
+            response.status_code,
+            memory['peak_kb'],
+            memory['retained_kb'],
+            ' '.join(f'{name}_peak_kb={stage["peak_kb"]:.1f}' for name, stage in memory['stages'].items()),
+            extra={'memory': {'view': label, 'method': request.method, 'status': response.status_code, **memory}},
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        tracker = getattr(request, '_memory_tracker', None)
+        if tracker is not None:
+            tracker.begin('view')
+
+    def process_template_response(self, request, response):
+        tracker = getattr(request, '_memory_tracker', None)
+        if tracker is not None:
+            tracker.begin('render')
+            response.add_post_render_callback(lambda response: tracker.end())
+        return response
@@ -0,0 +1,117 @@
+"""
+Prometheus metrics for API latency and throughput
+
+Metrics are recorded by PrometheusMetricsMiddleware and exposed on
+``/metrics``. When ``PROMETHEUS_MULTIPROC_DIR`` is set before the workers
+start, every process writes its samples to memory-mapped files in that
+directory and the endpoint aggregates them, so any worker can answer a
+scrape for the whole server.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from .instrumentation import view_label, wrap_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route and view action.',
+    ['route', 'view', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    'http_requests',
+    'Handled requests by route, view action and status.',
+    ['route', 'view', 'method', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requests currently being handled.',
+    multiprocess_mode='livesum',
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries per request by route and view action.',
+    ['route', 'view', 'method'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+RECIPE_IMAGE_UPLOAD_BYTES = Counter(
+    'recipe_image_upload_bytes',
+    'Bytes of recipe images stored through the upload endpoint.',
+)
+
+
+def metrics_registry():
+    """Registry to scrape, aggregating all worker processes in multiprocess mode."""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Return the exposition body and its content type."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+class QueryCounter:
+    """Execute wrapper that only counts queries."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class PrometheusMetricsMiddleware:
+    """Record latency, status, in-flight and query count metrics for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Labelled children are looked up once per label set, not per request.
+        self._children = {}
+
+    def _observers(self, route, view, method):
+        key = (route, view, method)
+        observers = self._children.get(key)
+        if observers is None:
+            observers = self._children[key] = (
+                REQUEST_LATENCY.labels(route, view, method),
+                REQUEST_DB_QUERIES.labels(route, view, method),
+            )
+        return observers
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        counter = QueryCounter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with wrap_queries(counter):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        view = view_label(request)
+        latency, db_queries = self._observers(route, view, request.method)
+        latency.observe(time.perf_counter() - started)
+        db_queries.observe(counter.count)
+        REQUESTS.labels(route, view, request.method, response.status_code).inc()
+        return response
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def backfill_changelog(apps, schema_editor):
+    """Log existing recipes, tags and ingredients so a first sync returns them."""
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    for kind, model_name in (('tag', 'Tag'), ('ingredient', 'Ingredient'), ('recipe', 'Recipe')):
+        rows = apps.get_model('core', model_name).objects.order_by('id').values_list('id', 'user_id')
+        batch = []
+        for object_id, user_id in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(ChangeLog(user_id=user_id, kind=kind, object_id=object_id))
+            if len(batch) == BATCH_SIZE:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient'), ('recipe_tag', 'Recipe tag'), ('recipe_ingredient', 'Recipe ingredient')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('related_id', models.IntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='changelog_user_id_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changelog, migrations.RunPython.noop),
+    ]
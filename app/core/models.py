@@ -69,6 +69,16 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # One index per allowed list ordering, the id keeps ties stable.
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='recipe_user_title_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'], name='recipe_user_time_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='recipe_user_price_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -81,6 +91,7 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
     def __str__(self):
@@ -93,6 +104,147 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+
+class RecipeSummary(models.Model):
+    """Recipe statistics of a user, maintained incrementally by recipe signals"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_summary',
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    total_time_minutes = models.BigIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    price_buckets = models.JSONField(default=dict)
+    tag_counts = models.JSONField(default=dict)
+    ingredient_counts = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Recipe summary of {self.user_id}'
+
+
+class ChangeLog(models.Model):
+    """Change to a recipe, tag, ingredient or recipe link of a user, its id is the sync version"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    RECIPE_TAG = 'recipe_tag'
+    RECIPE_INGREDIENT = 'recipe_ingredient'
+    KIND_CHOICES = [
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+        (RECIPE_TAG, 'Recipe tag'),
+        (RECIPE_INGREDIENT, 'Recipe ingredient'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    # The tag or ingredient of a link change.
+    related_id = models.IntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id_idx'),
+            # Pruning finds old entries by age and superseded entries by object.
+            models.Index(fields=['created_at'], name='changelog_created_at_idx'),
+            models.Index(fields=['user', 'kind', 'object_id'], name='changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} {"deleted" if self.deleted else "changed"}'
+
+
+class SyncHorizon(models.Model):
+    """Highest change log id pruned for a user, clients synced before it have to resync"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    pruned_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id} pruned through {self.pruned_through}'
+
+
+class UserDeletion(models.Model):
+    """Progress of a user deleted in batches, kept after the user is gone"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    email = models.EmailField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Rows deleted so far per table.
+    progress = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Deletion of {self.email} ({self.status})'
+
+
+class Job(models.Model):
+    """Deferred call of a registered job handler, run by ``manage.py run_workers``"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    # Queued jobs run from run_after, running jobs are reclaimed after locked_until.
+    run_after = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_status_locked_until_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
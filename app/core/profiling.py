@@ -0,0 +1,184 @@
+"""
+Request profiling for production
+
+ProfilingMiddleware profiles a sample of requests (PROFILER_SAMPLE_RATE)
+and requests carrying a signed ``X-Profile`` token made by
+``manage.py profile_token``. Profiles are written per view, e.g.
+``<PROFILER_OUTPUT_DIR>/RecipeViewSet.list/``, as cProfile ``.pstats``
+files or, in sampling mode, as collapsed stacks ready for flamegraph
+tools. ``manage.py profile_report`` aggregates them. With
+PROFILER_ENABLED off the middleware removes itself and costs nothing.
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import view_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+_TOKEN_SALT = 'core.profiling'
+_UNSAFE_PATH_CHARS = re.compile(r'[^\w.-]')
+
+
+def make_profile_token(mode=None):
+    """Return a signed token that requests profiling in the given mode."""
+    return signing.TimestampSigner(salt=_TOKEN_SALT).sign(mode or settings.PROFILER_MODE)
+
+
+def verify_profile_token(token):
+    """Return the mode of a valid, unexpired token, None otherwise."""
+    try:
+        mode = signing.TimestampSigner(salt=_TOKEN_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return mode if mode in PROFILERS else None
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    filename = '/'.join(Path(code.co_filename).parts[-2:])
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame):
+    """Format a stack root first in the collapsed format of flamegraph tools."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class CProfileProfiler:
+    """Deterministic profiler recording every call."""
+    suffix = '.pstats'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stack of the current thread from a background thread."""
+    suffix = '.collapsed'
+
+    def __init__(self, interval=None):
+        self.interval = (interval or settings.PROFILER_INTERVAL_MS) / 1000
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'cprofile': CProfileProfiler,
+    'sampling': SamplingProfiler,
+}
+
+
+def profile_path(label, suffix):
+    """Return a new file path for a profile of the given view."""
+    directory = Path(settings.PROFILER_OUTPUT_DIR) / _UNSAFE_PATH_CHARS.sub('_', label)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{uuid.uuid4().hex[:8]}{suffix}'
+
+
+def read_collapsed(path):
+    """Read a collapsed stack file into a Counter."""
+    stacks = Counter()
+    with open(path) as fh:
+        for line in fh:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+class ProfilingMiddleware:
+    """Profile sampled requests and requests with a signed X-Profile header."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        # One profile at a time per process, profilers hook interpreter-wide state.
+        self._lock = threading.Lock()
+
+    def _requested_mode(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token:
+            mode = verify_profile_token(token)
+            if mode is not None:
+                return mode, True
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return settings.PROFILER_MODE, False
+        return None, False
+
+    def __call__(self, request):
+        mode, signed = self._requested_mode(request)
+        if mode is None or not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = PROFILERS[mode]()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            label = view_label(request)
+            try:
+                path = profile_path(label, profiler.suffix)
+                profiler.save(path)
+            except OSError:
+                # A lost profile must not turn the response into an error.
+                logger.exception('Could not save the profile of %s %s', request.method, request.path)
+                return response
+        finally:
+            self._lock.release()
+
+        logger.info('Profiled %s %s to %s', request.method, request.path, path)
+        if signed:
+            response['X-Profile-File'] = str(path.relative_to(settings.PROFILER_OUTPUT_DIR))
+        return response
@@ -0,0 +1,140 @@
+"""
+N+1 and slow query detection
+
+QueryInspector wraps database execution and flags query shapes repeated
+within one unit of work (usually an N+1 loop) and queries slower than a
+threshold, together with the stack that issued them. Use it through
+QueryInspectionMiddleware on staging, or ``detect_query_issues`` as a
+decorator or context manager in tests, where issues fail the test.
+"""
+import logging
+import re
+import time
+import traceback
+from collections import defaultdict
+from contextlib import ContextDecorator, ExitStack
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import view_label, wrap_queries
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """Normalise SQL so queries differing only in parameters compare equal."""
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def project_stack():
+    """Return the formatted frames of the current stack that belong to this project."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+@dataclass
+class QueryIssue:
+    """A repeated or slow query found by the inspector."""
+    kind: str
+    sql: str
+    count: int
+    duration_ms: float
+    stack: str = field(repr=False)
+
+    def describe(self):
+        if self.kind == 'repeated':
+            summary = f'Query executed {self.count} times ({self.duration_ms:.1f} ms total)'
+        else:
+            summary = f'Slow query took {self.duration_ms:.1f} ms'
+        return f'{summary}:\n    {self.sql}\n{self.stack}'
+
+
+class QueryInspector:
+    """Execute wrapper collecting repeated and slow queries."""
+
+    def __init__(self, repeat_threshold=None, slow_ms=None):
+        self.repeat_threshold = repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+        self.slow_ms = slow_ms if slow_ms is not None else settings.QUERY_SLOW_MS
+        self.query_count = 0
+        self._shapes = defaultdict(lambda: [0, 0.0, ''])
+        self._slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            shape = query_shape(sql)
+            stats = self._shapes[shape]
+            stats[0] += 1
+            stats[1] += duration_ms
+            if stats[0] == self.repeat_threshold:
+                stats[2] = project_stack()
+            if self.slow_ms and duration_ms >= self.slow_ms:
+                self._slow.append(QueryIssue('slow', shape, 1, duration_ms, project_stack()))
+
+    @property
+    def issues(self):
+        repeated = [
+            QueryIssue('repeated', shape, count, duration_ms, stack)
+            for shape, (count, duration_ms, stack) in self._shapes.items()
+            if count >= self.repeat_threshold
+        ]
+        return repeated + self._slow
+
+    def report(self):
+        return '\n'.join(issue.describe() for issue in self.issues)
+
+
+class detect_query_issues(ContextDecorator):
+    """Fail the wrapped block if it runs N+1 or slow queries.
+
+    Usable as ``@detect_query_issues()`` on a test or as
+    ``with detect_query_issues(repeat_threshold=3):`` around a request.
+    """
+
+    def __init__(self, repeat_threshold=None, slow_ms=None):
+        self.repeat_threshold = repeat_threshold
+        self.slow_ms = slow_ms
+
+    def __enter__(self):
+        self.inspector = QueryInspector(self.repeat_threshold, self.slow_ms)
+        self._stack = ExitStack()
+        self._stack.enter_context(wrap_queries(self.inspector))
+        return self.inspector
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None and self.inspector.issues:
+            raise AssertionError(f'Query issues detected:\n{self.inspector.report()}')
+        return False
+
+
+class QueryInspectionMiddleware:
+    """Log N+1 and slow queries of every request, enabled by QUERY_INSPECTION_ENABLED."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector()
+        with wrap_queries(inspector):
+            response = self.get_response(request)
+        for issue in inspector.issues:
+            logger.warning('%s %s: %s', request.method, view_label(request), issue.describe())
+        return response
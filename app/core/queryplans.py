@@ -0,0 +1,70 @@
+"""
+Query plan capture for snapshot tests
+
+``explain`` returns a normalised plan of a queryset: ``EXPLAIN`` without
+costs on PostgreSQL, run with sequential scans disabled so a scan in the
+plan means no index can serve the query, and ``EXPLAIN QUERY PLAN`` on
+SQLite as the local stand-in. Plans are compared against snapshot files,
+set ``UPDATE_QUERY_PLANS=1`` to write them for a new query or rewrite them
+after an intended change.
+"""
+import difflib
+import os
+import re
+from pathlib import Path
+
+from django.db import connections, transaction
+
+UPDATE_ENV = 'UPDATE_QUERY_PLANS'
+
+_SQLITE_NODE_IDS = re.compile(r'^\d+ \d+ \d+ ', re.MULTILINE)
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'^\s*SCAN (\w+)(?!.* USING )', re.MULTILINE),
+}
+
+
+def normalize_plan(plan):
+    """Drop node ids and literal values that change between runs."""
+    plan = _SQLITE_NODE_IDS.sub('', plan)
+    plan = _NUMBERS.sub('N', plan)
+    return '\n'.join(line.rstrip() for line in plan.splitlines() if line.strip()) + '\n'
+
+
+def explain(queryset):
+    """Return the normalised plan of a queryset on its database."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain(costs=False)
+    else:
+        plan = queryset.explain()
+    return normalize_plan(plan)
+
+
+def sequential_scans(plan, vendor):
+    """Return the tables a plan reads without an index."""
+    pattern = _SEQUENTIAL_SCAN.get(vendor)
+    return pattern.findall(plan) if pattern else []
+
+
+def diff_snapshot(path, plan):
+    """Return a diff of the plan against its snapshot file, or None when the snapshot was written.
+
+    Snapshots are only written with UPDATE_QUERY_PLANS set, a missing one
+    diffs as an empty file so the plan shows up as new.
+    """
+    path = Path(path)
+    if os.environ.get(UPDATE_ENV):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(plan)
+        return None
+    snapshot = path.read_text() if path.exists() else ''
+    return ''.join(difflib.unified_diff(
+        snapshot.splitlines(keepends=True),
+        plan.splitlines(keepends=True),
+        fromfile=f'{path.name} (snapshot)' if path.exists() else f'{path.name} (missing)',
+        tofile=f'{path.name} (current)',
+    ))
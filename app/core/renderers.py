@@ -0,0 +1,40 @@
+"""
+JSON rendering with orjson
+
+FastJSONRenderer encodes with orjson when it is installed, several times
+faster than the stdlib json module on large recipe lists, and falls back to
+DRF's JSONRenderer otherwise. Values orjson does not know, such as
+Decimal, lazy translation strings and timedeltas, go through DRF's encoder,
+so both produce the same JSON.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional, the stdlib encoder is used without it.
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding compact, UTF-8 output with orjson when available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+        # Escape the line separators like JSONRenderer, keeping the output a strict javascript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,158 @@
+"""
+Precomputed OpenAPI schema documents
+
+Generating the schema walks every view, so rendered documents are built
+once per code version, kept in memory and on disk under
+``settings.SCHEMA_CACHE_DIR``, and served with an ETag and a gzip variant.
+Each variant has its own ETag so a cache never answers a client with the
+encoding it validated for another one.
+They can be built ahead of time with ``manage.py build_schema_cache``.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.views import SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SchemaDocument:
+    """A rendered schema with its precompressed variant."""
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+    @property
+    def gzip_etag(self):
+        return f'{self.etag[:-1]}-gzip"'
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """Identify the deployed code, from APP_VERSION or a digest of the sources."""
+    if settings.APP_VERSION:
+        return settings.APP_VERSION
+
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+                with open(path, 'rb') as fh:
+                    digest.update(fh.read())
+    return digest.hexdigest()[:16]
+
+
+_documents = {}
+_lock = threading.Lock()
+
+
+def _document_path(lang, renderer):
+    name = f'{lang or "default"}-{renderer.__class__.__name__}'
+    return os.path.join(settings.SCHEMA_CACHE_DIR, code_version(), name)
+
+
+def _make_document(body):
+    return SchemaDocument(
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+        etag='"%s"' % hashlib.sha1(body).hexdigest(),
+    )
+
+
+def _load(path):
+    try:
+        with open(path, 'rb') as fh:
+            body = fh.read()
+        with open(f'{path}.gz', 'rb') as fh:
+            gzipped = fh.read()
+    except FileNotFoundError:
+        return None
+    return SchemaDocument(body=body, gzipped=gzipped, etag='"%s"' % hashlib.sha1(body).hexdigest())
+
+
+def _write_atomic(path, content):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+
+
+def _store(path, document):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(f'{path}.gz', document.gzipped)
+        _write_atomic(path, document.body)
+    except OSError as e:
+        logger.warning('Could not write schema cache %s: %s', path, e)
+
+
+def get_schema_document(view, renderer, rebuild=False):
+    """Return the rendered schema for the active language, building it at most once."""
+    lang = translation.get_language()
+    key = (code_version(), lang, renderer.__class__)
+    document = None if rebuild else _documents.get(key)
+    if document is not None:
+        return document
+
+    with _lock:
+        document = None if rebuild else _documents.get(key)
+        if document is None:
+            path = _document_path(lang, renderer)
+            document = None if rebuild else _load(path)
+            if document is None:
+                generator = view.generator_class(
+                    urlconf=view.urlconf,
+                    api_version=view.api_version,
+                    patterns=view.patterns,
+                )
+                data = generator.get_schema(request=None, public=True)
+                document = _make_document(renderer.render(data, renderer.media_type, {}))
+                _store(path, document)
+            _documents[key] = document
+    return document
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Schema view serving cached documents with ETag and gzip support."""
+
+    def _get_schema_response(self, request):
+        if not self.serve_public or self.custom_settings or request.version or request.GET.get('version'):
+            return super()._get_schema_response(request)
+
+        renderer = request.accepted_renderer
+        document = get_schema_document(self, renderer)
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = document.gzip_etag if use_gzip else document.etag
+        # Weak comparison, a proxy may have marked the ETag weak.
+        client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+
+        if etag in client_etags or '*' in client_etags:
+            response = HttpResponseNotModified()
+        else:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            if use_gzip:
+                response = HttpResponse(document.gzipped, content_type=content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(document.body, content_type=content_type)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
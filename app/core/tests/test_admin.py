@@ -3,6 +3,9 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Job, UserDeletion
 
 class AdminSiteTest(TestCase):
     """Test admin site."""
@@ -41,3 +44,36 @@ class AdminSiteTest(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_delete_in_background_action(self):
+        """Test that the action deactivates users and queues their deletion."""
+        url = reverse('admin:core_user_changelist')
+
+        response = self.client.post(url, {
+            'action': 'delete_in_background',
+            '_selected_action': [self.user.id],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        deletion = UserDeletion.objects.get()
+        self.assertEqual(deletion.email, self.user.email)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'user.delete')
+        self.assertEqual(job.payload, {'deletion_id': deletion.id})
+
+    def test_user_deletion_list(self):
+        """Test that deletion progress is listed."""
+        UserDeletion.objects.create(email='gone@example.com', progress={'recipes': 42})
+
+        response = self.client.get(reverse('admin:core_userdeletion_changelist'))
+
+        self.assertContains(response, 'gone@example.com')
+
+    def test_job_list(self):
+        """Test that background jobs are listed."""
+        Job.objects.create(name='recipe.rebuild_summary', max_attempts=5, run_after=timezone.now())
+
+        response = self.client.get(reverse('admin:core_job_changelist'))
+
+        self.assertContains(response, 'recipe.rebuild_summary')
@@ -0,0 +1,112 @@
+"""
+Tests for the endpoint benchmark suite
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import benchmarking
+
+
+class BenchmarkingTests(SimpleTestCase):
+    """Test the benchmark helpers"""
+
+    def test_percentile_interpolates(self):
+        samples = [4, 1, 3, 2]
+
+        self.assertEqual(benchmarking.percentile(samples, 0), 1)
+        self.assertEqual(benchmarking.percentile(samples, 50), 2.5)
+        self.assertEqual(benchmarking.percentile(samples, 100), 4)
+
+    def test_measure_reports_statistics(self):
+        scenario = benchmarking.Scenario('ok', lambda: HttpResponse('ok'))
+
+        result = benchmarking.measure(scenario, iterations=5, warmup=1, memory_iterations=2)
+
+        self.assertEqual(result['iterations'], 5)
+        self.assertEqual(result['queries'], 0)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_measure_rejects_unexpected_status(self):
+        scenario = benchmarking.Scenario('missing', lambda: HttpResponse(status=404))
+
+        with self.assertRaises(benchmarking.BenchmarkError):
+            benchmarking.measure(scenario, iterations=1, warmup=0, memory_iterations=0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'scenarios': {'list': {'p50_ms': 10, 'p95_ms': 20, 'alloc_peak_kb': 100, 'queries': 4}}}
+        current = {'scenarios': {
+            'list': {'p50_ms': 10.5, 'p95_ms': 25, 'alloc_peak_kb': 100, 'queries': 5},
+            'new': {'p50_ms': 1, 'p95_ms': 1, 'alloc_peak_kb': 1, 'queries': 1},
+        }}
+
+        regressions = benchmarking.compare(current, baseline, threshold=0.1)
+
+        self.assertEqual([(r.scenario, r.metric) for r in regressions], [('list', 'p95_ms'), ('list', 'queries')])
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class BenchApiCommandTests(TestCase):
+    """Test the bench_api command"""
+
+    def setUp(self):
+        fd, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.output)
+
+    def _bench(self, **options):
+        return call_command(
+            'bench_api', current_db=True, iterations=2, warmup=0, memory_iterations=1, users=2, max_recipes=5,
+            scenario=['recipe_list', 'recipe_create', 'recipe_image_upload'], output=self.output, stdout=StringIO(),
+            **options,
+        )
+
+    def test_bench_api_writes_results(self):
+        self._bench()
+
+        with open(self.output) as fh:
+            results = json.load(fh)
+        self.assertEqual(set(results['scenarios']), {'recipe_list', 'recipe_create', 'recipe_image_upload'})
+        self.assertGreater(results['scenarios']['recipe_create']['queries'], 0)
+
+    def test_bench_api_fails_on_regression(self):
+        baseline = {'scenarios': {'recipe_list': {'p50_ms': 0.0, 'p95_ms': 0.0, 'queries': 0}}}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+            json.dump(baseline, fh)
+        self.addCleanup(os.remove, fh.name)
+
+        with self.assertRaisesMessage(CommandError, 'recipe_list p50_ms'):
+            self._bench(baseline=fh.name)
+
+
+class BenchPantryCommandTests(SimpleTestCase):
+    """Test the bench_pantry command"""
+
+    def test_bench_pantry_reports_each_size(self):
+        out = StringIO()
+
+        call_command('bench_pantry', recipes=[50, 200], ingredients=20, iterations=3, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual([line.split()[0] for line in lines[1:]], ['50', '200'])
+
+
+class BenchRenderersCommandTests(SimpleTestCase):
+    """Test the bench_renderers command"""
+
+    def test_bench_renderers_reports_renderers_and_encodings(self):
+        out = StringIO()
+
+        call_command('bench_renderers', recipes=20, iterations=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('serializer  FastJSONRenderer', output)
+        self.assertIn('values      JSONRenderer', output)
+        self.assertIn('\ngzip ', output)
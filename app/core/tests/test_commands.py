@@ -2,12 +2,22 @@
 Test Custom Django managment commands
 """
 
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import Recipe, RecipeSummary, Tag, Ingredient, UserDeletion
+from recipe.stats import aggregate_stats, summary_stats
+
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandsTestCase(SimpleTestCase):
@@ -18,14 +28,178 @@ class CommandsTestCase(SimpleTestCase):
 
         call_command('wait_for_db')
 
-        patched_check.assert_called_once_with(databases=['default'])
+        self.assertCountEqual(
+            [call.kwargs['databases'] for call in patched_check.call_args_list],
+            [[alias] for alias in settings.DATABASES],
+        )
 
     @patch('time.sleep')
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         patched_check.side_effect = [Psycopg2Error] * 2 + [OperationalError] * 3 + [True]
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', databases=['default'])
 
         self.assertEqual(patched_check.call_count, 6)
 
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff_is_bounded(self, patched_sleep, patched_check):
+        patched_check.side_effect = [OperationalError] * 6 + [True]
+
+        call_command('wait_for_db', databases=['default'], initial_delay=1, max_delay=4, stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 6)
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, min(4, 2 ** attempt))
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_check):
+        patched_check.side_effect = OperationalError('connection refused')
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0.01, stdout=StringIO())
+
+    @patch('core.management.commands.wait_for_db.MigrationExecutor')
+    @patch('time.sleep')
+    def test_wait_for_db_migrations_pending(self, patched_sleep, patched_executor, patched_check):
+        patched_check.return_value = True
+        patched_executor.return_value.migration_plan.side_effect = [[('core', False)], []]
+
+        call_command('wait_for_db', databases=['default'], migrations=True, stdout=StringIO())
+
+        self.assertEqual(patched_executor.return_value.migration_plan.call_count, 2)
+        patched_sleep.assert_called_once()
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ProvisionUsersTests(TestCase):
+    """Test the provision_users command"""
+
+    def _write(self, suffix, content):
+        fh = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        with fh:
+            fh.write(content)
+        self.addCleanup(os.remove, fh.name)
+        return fh.name
+
+    def test_provision_users_from_csv(self):
+        path = self._write('.csv', 'email,name,password\n'
+                                   'one@example.com,One,Password123\n'
+                                   'two@EXAMPLE.com,Two,Password456\n')
+
+        call_command('provision_users', path, workers=0, stdout=StringIO())
+
+        user = get_user_model().objects.get(email='two@example.com')
+        self.assertEqual(user.name, 'Two')
+        self.assertTrue(user.check_password('Password456'))
+        self.assertEqual(get_user_model().objects.count(), 2)
+
+    def test_provision_users_skips_existing_and_duplicates(self):
+        get_user_model().objects.create_user(email='one@example.com', password='Original123')
+        path = self._write('.jsonl', '{"email": "one@example.com", "password": "Changed123"}\n'
+                                     '{"email": "two@example.com", "password": "Password456"}\n'
+                                     '{"email": "two@example.com", "password": "Password789"}\n')
+        out = StringIO()
+
+        call_command('provision_users', path, workers=0, batch_size=2, stdout=out)
+
+        self.assertEqual(get_user_model().objects.count(), 2)
+        self.assertTrue(get_user_model().objects.get(email='one@example.com').check_password('Original123'))
+        self.assertTrue(get_user_model().objects.get(email='two@example.com').check_password('Password456'))
+        self.assertIn('Provisioned 1 users, skipped 2', out.getvalue())
+
+    def test_provision_users_hashes_in_process_pool(self):
+        path = self._write('.csv', 'email,name,password\n' + ''.join(
+            f'user{i}@example.com,User {i},Password{i}\n' for i in range(6)
+        ))
+
+        call_command('provision_users', path, workers=2, stdout=StringIO())
+
+        self.assertEqual(get_user_model().objects.count(), 6)
+        self.assertTrue(get_user_model().objects.get(email='user3@example.com').check_password('Password3'))
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command"""
+
+    options = {
+        'users': 3, 'min_recipes': 2, 'max_recipes': 20, 'tags_per_user': 5,
+        'ingredients_per_user': 8, 'batch_size': 7, 'seed': 7,
+    }
+
+    def _snapshot(self):
+        return [
+            (recipe.user.email, recipe.title, recipe.time_minutes, recipe.price,
+             sorted(tag.name for tag in recipe.tags.all()),
+             sorted(ingredient.name for ingredient in recipe.ingredients.all()))
+            for recipe in Recipe.objects.select_related('user').prefetch_related('tags', 'ingredients').order_by('id')
+        ]
+
+    def test_seed_data_creates_rows(self):
+        out = StringIO()
+
+        call_command('seed_data', stdout=out, **self.options)
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredient.objects.count(), 24)
+        for user in get_user_model().objects.all():
+            self.assertTrue(user.check_password('Password123'))
+            self.assertGreaterEqual(user.recipe_set.count(), 2)
+            self.assertLessEqual(user.recipe_set.count(), 20)
+        self.assertTrue(Recipe.tags.through.objects.exists())
+        self.assertIn(f'{Recipe.objects.count()} recipes', out.getvalue())
+
+    def test_seed_data_builds_summaries(self):
+        call_command('seed_data', stdout=StringIO(), **self.options)
+
+        for user in get_user_model().objects.all():
+            summary = RecipeSummary.objects.get(user=user)
+            self.assertEqual(summary_stats(summary), aggregate_stats(user.id))
+
+    def test_seed_data_is_deterministic(self):
+        call_command('seed_data', stdout=StringIO(), **self.options)
+        first = self._snapshot()
+        get_user_model().objects.all().delete()
+
+        call_command('seed_data', stdout=StringIO(), **self.options)
+
+        self.assertEqual(self._snapshot(), first)
+
+    def test_seed_data_refuses_existing_users(self):
+        get_user_model().objects.create_user(email='seed-user-0@example.com', password='Password123')
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', stdout=StringIO(), **self.options)
+
+
+class DeleteUsersTests(TestCase):
+    """Test the delete_users command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='gone@example.com', password='Password123')
+        for index in range(3):
+            Recipe.objects.create(user=self.user, title=f'Recipe {index}', time_minutes=5, price=1)
+
+    def test_delete_users_reports_progress(self):
+        out = StringIO()
+
+        call_command('delete_users', 'gone@example.com', batch_size=2, stdout=out)
+
+        self.assertFalse(get_user_model().objects.filter(email='gone@example.com').exists())
+        self.assertIn('gone@example.com: 0 recipe_tags, 0 recipe_ingredients, 2 recipes\n', out.getvalue())
+        self.assertIn('Deleted gone@example.com', out.getvalue())
+
+    def test_delete_users_resumes_unfinished(self):
+        deletion = UserDeletion.objects.create(user=self.user, email=self.user.email, status=UserDeletion.FAILED)
+
+        call_command('delete_users', resume=True, stdout=StringIO())
+
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, UserDeletion.DONE)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_delete_users_unknown_email(self):
+        with self.assertRaises(CommandError):
+            call_command('delete_users', 'nobody@example.com', stdout=StringIO())
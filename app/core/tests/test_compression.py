@@ -0,0 +1,106 @@
+"""Tests for the response compression middleware."""
+import gzip
+import json
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    """Test Accept-Encoding negotiation."""
+
+    def test_accepted_encodings(self):
+        self.assertEqual(compression.accepted_encodings('gzip, deflate;q=0.5, br;q=0'), {'gzip', 'deflate'})
+        self.assertEqual(compression.accepted_encodings(''), set())
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding('deflate, gzip'), 'gzip')
+        self.assertEqual(compression.choose_encoding('*'), 'gzip')
+        self.assertIsNone(compression.choose_encoding('gzip;q=0, identity'))
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_choose_brotli(self):
+        self.assertEqual(compression.choose_encoding('gzip, br'), 'br')
+
+
+class CompressTests(SimpleTestCase):
+    """Test compressed sizes are randomised against BREACH."""
+
+    body = json.dumps([{'id': index, 'title': f'Recipe {index}'} for index in range(50)]).encode()
+
+    def _lengths(self, encoding):
+        return {len(compression.compress(self.body, encoding)) for _ in range(10)}
+
+    def test_gzip_length_randomised(self):
+        self.assertGreater(len(self._lengths('gzip')), 1)
+        self.assertEqual(gzip.decompress(compression.compress(self.body, 'gzip')), self.body)
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_length_randomised(self):
+        self.assertGreater(len(self._lengths('br')), 1)
+        decompressed = compression.brotli.decompress(compression.compress(self.body, 'br'))
+        self.assertEqual(json.loads(decompressed), json.loads(self.body))
+
+    def test_json_padding_is_whitespace(self):
+        padding = compression.json_padding(10)
+
+        self.assertLessEqual(len(padding), 40)
+        self.assertEqual(padding.strip(), b'')
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_BYTES=200)
+class CompressionMiddlewareTests(TestCase):
+    """Test JSON responses are compressed above the size threshold."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='gzip@example.com', password='Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _recipes(self, count):
+        for index in range(count):
+            Recipe.objects.create(user=self.user, title=f'Recipe {index}', time_minutes=5, price='5.50')
+
+    def test_large_response_is_gzipped(self):
+        self._recipes(10)
+
+        response = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(body), 10)
+
+    def test_not_compressed_without_accept_encoding(self):
+        self._recipes(10)
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(response.json()), 10)
+
+    def test_small_response_not_compressed(self):
+        response = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_html_not_compressed(self):
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', password='Password123')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('admin:index'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Content-Encoding'))
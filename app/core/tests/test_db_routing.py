@@ -0,0 +1,142 @@
+"""Tests for read replica routing."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from rest_framework.test import APIClient
+
+from core.db_routing import ReplicaRouter, ReplicaRoutingMiddleware, pin_key
+from core.models import Recipe, Tag
+
+
+class ReplicaView:
+    """Stand-in for a viewset class eligible for replica reads."""
+    read_from_replica = True
+
+
+class PrimaryView:
+    """Stand-in for a view that always reads from the primary."""
+
+
+def view_for(cls):
+    def view(request):
+        return HttpResponse()
+    view.cls = cls
+    return view
+
+
+@override_settings(DB_REPLICAS=['replica_1'], DB_REPLICA_PIN_SECONDS=30)
+class ReplicaRoutingTests(TestCase):
+    """Test routing reads between the primary and replicas."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.user = get_user_model().objects.create_user(email='replica@example.com', password='Password123')
+
+    def _dispatch(self, request, view, status=200):
+        """Run a request through the middleware and return the read alias seen by the view."""
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen['before_auth'] = self.router.db_for_read(Recipe)
+            request.user = self.user
+            seen['after_auth'] = self.router.db_for_read(Recipe)
+            return HttpResponse(status=status)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request.user = SimpleLazyObject(AnonymousUser)
+        middleware(request)
+        return seen
+
+    def test_safe_request_reads_from_replica(self):
+        """Test authenticated safe requests read from a replica."""
+        seen = self._dispatch(self.factory.get('/'), view_for(ReplicaView))
+
+        self.assertEqual(seen['before_auth'], 'default')
+        self.assertEqual(seen['after_auth'], 'replica_1')
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_ineligible_view_reads_from_primary(self):
+        """Test views without read_from_replica stay on the primary."""
+        seen = self._dispatch(self.factory.get('/'), view_for(PrimaryView))
+
+        self.assertEqual(seen['after_auth'], 'default')
+
+    def test_write_reads_from_primary_and_pins_user(self):
+        """Test a successful write pins the user to the primary."""
+        seen = self._dispatch(self.factory.post('/'), view_for(ReplicaView), status=201)
+
+        self.assertEqual(seen['after_auth'], 'default')
+        self.assertTrue(cache.get(pin_key(self.user.pk)))
+
+        seen = self._dispatch(self.factory.get('/'), view_for(ReplicaView))
+        self.assertEqual(seen['after_auth'], 'default')
+
+    def test_failed_write_does_not_pin_user(self):
+        """Test rejected writes leave the user on replicas."""
+        self._dispatch(self.factory.post('/'), view_for(ReplicaView), status=400)
+
+        self.assertIsNone(cache.get(pin_key(self.user.pk)))
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test writes always go to the primary and replicas are never migrated."""
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(DB_REPLICAS=['replica_1'], DB_REPLICA_PIN_SECONDS=30)
+class ReplicaQueryTests(TransactionTestCase):
+    """Test which connection runs the queries of real requests.
+
+    replica_1 mirrors the primary's test database on a connection of its
+    own, which only sees committed rows, hence no TestCase transaction.
+    """
+
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='replica@example.com', password='Password123')
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _request(self, method, url, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            response = getattr(self.client, method)(url, data, format='json')
+        return response, primary, replica
+
+    def _tag_queries(self, queries):
+        return [query['sql'] for query in queries.captured_queries if 'FROM "core_tag"' in query['sql']]
+
+    def test_list_reads_from_replica(self):
+        """Test a list request runs its query on the replica connection."""
+        response, primary, replica = self._request('get', reverse('recipe:tag-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag['name'] for tag in response.data], ['Vegan'])
+        self.assertEqual(len(self._tag_queries(replica)), 1)
+        self.assertEqual(self._tag_queries(primary), [])
+
+    def test_list_after_write_reads_from_primary(self):
+        """Test the list after a write runs on the primary connection."""
+        response, _, _ = self._request('post', reverse('recipe:recipe-list'), {
+            'title': 'Soup', 'time_minutes': 10, 'price': '4.50',
+        })
+        self.assertEqual(response.status_code, 201)
+
+        response, primary, replica = self._request('get', reverse('recipe:tag-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._tag_queries(primary)), 1)
+        self.assertEqual(self._tag_queries(replica), [])
@@ -0,0 +1,75 @@
+"""Tests for per-request performance instrumentation."""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.instrumentation import server_timing_header
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(PERF_TIMING_SAMPLE_RATE=1.0, PERF_TIMING_HEADER=True)
+class ServerTimingTests(TestCase):
+    """Test the Server-Timing middleware."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='timing@example.com', password='Password123')
+
+    def _client(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_server_timing_header(self):
+        """Test DRF responses carry DB, view and render timings."""
+        with self.assertLogs('core.instrumentation', level='INFO') as logs:
+            response = self._client().get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = response['Server-Timing']
+        for metric in ('total;dur=', 'view;dur=', 'db;dur=', 'app;dur=', 'render;dur='):
+            self.assertIn(metric, header)
+        self.assertIn('queries"', header)
+        self.assertIn('view=RecipeViewSet.list', logs.output[0])
+        self.assertEqual(logs.records[0].perf['view'], 'RecipeViewSet.list')
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_server_timing_header_internal_only(self):
+        """Test public callers are measured but get no header."""
+        with self.assertLogs('core.instrumentation', level='INFO'):
+            response = self._client().get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_server_timing_header_for_staff(self):
+        """Test staff users get the header from any address."""
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self._client().get(RECIPES_URL)
+
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(PERF_TIMING_HEADER=False)
+    def test_server_timing_header_off(self):
+        """Test the header is only sent when enabled."""
+        response = self._client().get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERF_TIMING_SAMPLE_RATE=0)
+    def test_server_timing_disabled(self):
+        """Test nothing is measured when sampling is off."""
+        response = self._client().get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_header_format(self):
+        """Test formatting of the header value."""
+        header = server_timing_header({'total': 12.345, 'db': 2.0}, 3)
+
+        self.assertEqual(header, 'total;dur=12.3, db;dur=2.0;desc="3 queries"')
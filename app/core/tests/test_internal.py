@@ -0,0 +1,48 @@
+"""Tests for internal operational endpoints."""
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from django.db import connections
+from django.test import TestCase, Client
+from django.urls import reverse
+
+DB_POOL_URL = reverse('db-pool-stats')
+
+
+class DbPoolStatsTests(TestCase):
+    """Test the connection pool statistics endpoint."""
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_pool_stats_without_pool(self):
+        """Test unpooled databases are reported as such."""
+        response = self.client.get(DB_POOL_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['databases']['default']['pooled'])
+
+    def test_pool_stats_with_pool(self):
+        """Test pool counters are exposed when pooling is enabled."""
+        pool = MagicMock()
+        pool.get_stats.return_value = {
+            'pool_min': 2,
+            'pool_max': 10,
+            'pool_size': 4,
+            'pool_available': 1,
+            'requests_waiting': 2,
+            'requests_wait_ms': 150,
+        }
+        with patch.object(type(connections['default']), 'pool', new_callable=PropertyMock, create=True, return_value=pool):
+            response = self.client.get(DB_POOL_URL)
+
+        stats = response.json()['databases']['default']
+        self.assertTrue(stats['pooled'])
+        self.assertEqual(stats['in_use'], 3)
+        self.assertEqual(stats['waiting'], 2)
+        self.assertEqual(stats['wait_ms'], 150)
+
+    def test_pool_stats_forbidden_from_external_address(self):
+        """Test the endpoint is not reachable from outside INTERNAL_IPS."""
+        response = self.client.get(DB_POOL_URL, REMOTE_ADDR='203.0.113.9')
+
+        self.assertEqual(response.status_code, 403)
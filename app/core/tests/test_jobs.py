@@ -0,0 +1,162 @@
+"""
+Tests for the background job queue.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job, Recipe, RecipeSummary
+
+calls = []
+
+
+@jobs.job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.job('tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('boom')
+
+
+class JobQueueTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue('tests.missing')
+
+    @override_settings(JOB_MAX_ATTEMPTS=7)
+    def test_enqueue_defaults(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.max_attempts, 7)
+        self.assertEqual(jobs.enqueue('tests.fail').max_attempts, 2)
+
+    def test_claim_and_run(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+
+        claimed = jobs.claim('worker-a')
+        self.assertEqual(claimed, [job])
+        self.assertEqual(jobs.claim('worker-b'), [])
+
+        jobs.run(claimed[0])
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [1])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_skips_delayed_jobs(self):
+        jobs.enqueue('tests.record', {'value': 1}, delay=60)
+
+        self.assertEqual(jobs.claim('worker-a'), [])
+
+    def test_claim_with_skip_locked(self):
+        """Test the claim used on databases that support SKIP LOCKED."""
+        first = jobs.enqueue('tests.record', {'value': 1})
+        second = jobs.enqueue('tests.record', {'value': 2})
+
+        features = type(connection.features)
+        with patch.object(features, 'has_select_for_update_skip_locked', True):
+            claimed = jobs.claim('worker-a', limit=5)
+
+        self.assertEqual(claimed, [first, second])
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING, locked_by='worker-a', attempts=1).count(), 2)
+
+    @override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=15)
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue('tests.fail')
+
+        before = timezone.now()
+        jobs.run(jobs.claim('worker-a')[0])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=5))
+        self.assertEqual(job.locked_by, '')
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run(jobs.claim('worker-a')[0])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=15)
+    def test_backoff_is_capped(self):
+        self.assertLessEqual(jobs.backoff(1), 10)
+        self.assertLessEqual(jobs.backoff(10), 15)
+        self.assertGreaterEqual(jobs.backoff(10), 7.5)
+
+    def test_expired_lease_is_reclaimed(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+        stale = jobs.claim('worker-a')[0]
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = jobs.claim('worker-b')[0]
+        jobs.run(stale)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_by, 'worker-b')
+        self.assertEqual(job.attempts, 2)
+
+        jobs.run(reclaimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_expired_last_attempt_fails(self):
+        job = jobs.enqueue('tests.record', {'value': 1}, max_attempts=1)
+        jobs.claim('worker-a')
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(jobs.claim('worker-b'), [])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(calls, [])
+
+
+class WorkerTests(TransactionTestCase):
+    """Test workers running jobs from their own threads and connections."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_worker_runs_queued_jobs(self):
+        for value in range(5):
+            jobs.enqueue('tests.record', {'value': value})
+        jobs.enqueue('tests.record', {'value': 99}, delay=60)
+
+        processed = jobs.Worker(threads=2, burst=True).run()
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+
+    def test_run_workers_command(self):
+        user = get_user_model().objects.create_user(email='user@example.com', password='Password123')
+        Recipe.objects.create(user=user, title='Soup', time_minutes=5, price=1)
+        RecipeSummary.objects.filter(user=user).delete()
+        call_command('rebuild_recipe_stats', queue=True, stdout=StringIO())
+        out = StringIO()
+
+        call_command('run_workers', burst=True, threads=1, stdout=out)
+
+        self.assertIn('Worker stopped after 1 jobs.', out.getvalue())
+        self.assertEqual(RecipeSummary.objects.get(user=user).recipe_count, 1)
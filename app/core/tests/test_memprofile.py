@@ -0,0 +1,81 @@
+"""
+Tests for memory profiling
+"""
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.memprofile import MemoryProfilingMiddleware, MemoryTracker
+from core.models import Recipe, Tag
+
+
+class MemoryTrackerTests(SimpleTestCase):
+    """Test the stage tracker"""
+
+    def test_tracker_measures_stages(self):
+        tracker = MemoryTracker(top=2)
+        tracker.start()
+        tracker.begin('allocate')
+        kept = [bytearray(1024) for _ in range(256)]
+        tracker.begin('transient')
+        len([bytearray(1024) for _ in range(512)])
+        memory = tracker.stop()
+
+        self.assertGreaterEqual(memory['stages']['allocate']['retained_kb'], 256)
+        self.assertGreaterEqual(memory['stages']['transient']['peak_kb'], 512)
+        self.assertLess(memory['stages']['transient']['retained_kb'], 64)
+        self.assertGreaterEqual(memory['peak_kb'], 768)
+        self.assertEqual(len(memory['stages']['allocate']['top']), 2)
+        self.assertTrue(kept)
+
+    @override_settings(MEMORY_PROFILING_ENABLED=False)
+    def test_middleware_unused_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MemoryProfilingMiddleware(lambda request: HttpResponse())
+
+
+class MemoryProfilingTests(TestCase):
+    """Test memory profiling of the recipe list"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='memory@example.com', password='Password123')
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        for i in range(3):
+            recipe = Recipe.objects.create(user=self.user, title=f'Recipe {i}', time_minutes=5, price=Decimal('1.00'))
+            recipe.tags.add(tag)
+
+    @override_settings(MEMORY_PROFILING_ENABLED=True)
+    def test_middleware_logs_stages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('core.memprofile', level='INFO') as logs:
+            response = client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(response.status_code, 200)
+        record = logs.records[0]
+        self.assertEqual(record.memory['view'], 'RecipeViewSet.list')
+        self.assertEqual(list(record.memory['stages']), ['request', 'view', 'render'])
+
+    def test_profile_memory_command(self):
+        fd, output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, output)
+
+        call_command('profile_memory', email='memory@example.com', top=1, output=output, stdout=StringIO())
+
+        with open(output) as fh:
+            memory = json.load(fh)
+        self.assertEqual(memory['recipes'], 3)
+        self.assertEqual(list(memory['stages']), ['query', 'serializer', 'renderer'])
+        self.assertGreater(memory['peak_bytes_per_recipe'], 0)
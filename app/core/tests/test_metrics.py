@@ -0,0 +1,78 @@
+"""Tests for the Prometheus metrics endpoint."""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from prometheus_client import REGISTRY, CollectorRegistry
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import metrics_registry
+from core.models import Recipe
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class MetricsTests(TestCase):
+    """Test recording and exposing metrics."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='metrics@example.com', password='Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_request_metrics_exposed(self):
+        """Test latency, status and query count metrics are recorded per view action."""
+        labels = {'route': 'recipe:recipe-list', 'view': 'RecipeViewSet.list', 'method': 'GET'}
+        before = REGISTRY.get_sample_value('http_requests_total', {**labels, 'status': '200'}) or 0
+
+        self.client.get(RECIPES_URL)
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(REGISTRY.get_sample_value('http_requests_total', {**labels, 'status': '200'}), before + 1)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="recipe:recipe-list"', body)
+        self.assertIn('http_request_db_queries_count{method="GET",route="recipe:recipe-list"', body)
+        self.assertIn('http_requests_in_flight', body)
+
+    def test_metrics_forbidden_from_external_address(self):
+        """Test the endpoint is internal only."""
+        response = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.9')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_image_upload_bytes_counted(self):
+        """Test uploaded image bytes are counted."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=Decimal('2.50'))
+        before = REGISTRY.get_sample_value('recipe_image_upload_bytes_total') or 0
+
+        with override_settings(MEDIA_ROOT=media_root), tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            size = image_file.tell()
+            image_file.seek(0)
+            url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+            response = self.client.post(url, {'image': image_file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(REGISTRY.get_sample_value('recipe_image_upload_bytes_total'), before + size)
+
+    def test_multiprocess_registry(self):
+        """Test metrics are read from the shared directory in multiprocess mode."""
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+
+        with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': metrics_dir}):
+            registry = metrics_registry()
+
+        self.assertIsInstance(registry, CollectorRegistry)
+        self.assertIsNot(registry, REGISTRY)
@@ -0,0 +1,123 @@
+"""
+Tests for request profiling
+"""
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.profiling import (
+    PROFILE_HEADER,
+    ProfilingMiddleware,
+    SamplingProfiler,
+    make_profile_token,
+    read_collapsed,
+    verify_profile_token,
+)
+
+
+class ProfilingHelperTests(SimpleTestCase):
+    """Test profile tokens, the sampler and the disabled middleware"""
+
+    @override_settings(PROFILER_ENABLED=False)
+    def test_middleware_unused_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_profile_token_round_trip(self):
+        self.assertEqual(verify_profile_token(make_profile_token('cprofile')), 'cprofile')
+        self.assertIsNone(verify_profile_token(make_profile_token('cprofile') + 'x'))
+        self.assertIsNone(verify_profile_token('garbage'))
+
+    @override_settings(PROFILER_TOKEN_MAX_AGE=-1)
+    def test_profile_token_expires(self):
+        self.assertIsNone(verify_profile_token(make_profile_token('sampling')))
+
+    def test_sampling_profiler_collects_collapsed_stacks(self):
+        def busy():
+            total = 0
+            for i in range(3_000_000):
+                total += i
+            return total
+
+        profiler = SamplingProfiler(interval=1)
+        profiler.start()
+        busy()
+        profiler.stop()
+
+        self.assertTrue(profiler.stacks)
+        self.assertTrue(any('busy (tests/test_profiling.py' in stack for stack in profiler.stacks))
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'profile.collapsed'
+            profiler.save(path)
+            self.assertEqual(read_collapsed(path), profiler.stacks)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Test profiling of API requests"""
+
+    def setUp(self):
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+        self.user = get_user_model().objects.create_user(email='profile@example.com', password='Password123')
+
+    def _get(self, **headers):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(reverse('recipe:recipe-list'), headers=headers)
+
+    def test_signed_header_writes_pstats_per_view(self):
+        with override_settings(PROFILER_ENABLED=True, PROFILER_OUTPUT_DIR=self.output_dir.name):
+            response = self._get(**{PROFILE_HEADER: make_profile_token('cprofile')})
+
+        self.assertEqual(response.status_code, 200)
+        profile = Path(self.output_dir.name) / response['X-Profile-File']
+        self.assertEqual(profile.parent.name, 'RecipeViewSet.list')
+        self.assertEqual(profile.suffix, '.pstats')
+        self.assertTrue(profile.exists())
+
+    def test_invalid_header_is_not_profiled(self):
+        with override_settings(PROFILER_ENABLED=True, PROFILER_OUTPUT_DIR=self.output_dir.name):
+            response = self._get(**{PROFILE_HEADER: 'sampling:forged'})
+
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(list(Path(self.output_dir.name).iterdir()), [])
+
+    def test_sampled_requests_are_profiled_and_reported(self):
+        settings = {
+            'PROFILER_ENABLED': True,
+            'PROFILER_SAMPLE_RATE': 1.0,
+            'PROFILER_MODE': 'sampling',
+            'PROFILER_OUTPUT_DIR': self.output_dir.name,
+        }
+        with override_settings(**settings):
+            response = self._get()
+            self._get(**{PROFILE_HEADER: make_profile_token('cprofile')})
+            out = StringIO()
+            call_command('profile_report', stdout=out)
+
+        self.assertNotIn('X-Profile-File', response)
+        view_dir = Path(self.output_dir.name) / 'RecipeViewSet.list'
+        self.assertEqual(len(list(view_dir.glob('*.collapsed'))), 1)
+        report_dir = Path(self.output_dir.name) / 'report'
+        self.assertTrue((report_dir / 'RecipeViewSet.list.collapsed').exists())
+        self.assertTrue((report_dir / 'RecipeViewSet.list.pstats').exists())
+        self.assertIn('1 sampled profiles', out.getvalue())
+        self.assertIn('1 cProfile profiles', out.getvalue())
+
+    def test_failed_save_keeps_response(self):
+        with override_settings(PROFILER_ENABLED=True, PROFILER_OUTPUT_DIR=self.output_dir.name), \
+                patch('core.profiling.CProfileProfiler.save', side_effect=PermissionError(13, 'Permission denied')), \
+                self.assertLogs('core.profiling', level='ERROR'):
+            response = self._get(**{PROFILE_HEADER: make_profile_token('cprofile')})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-File', response)
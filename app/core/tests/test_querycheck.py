@@ -0,0 +1,70 @@
+"""Tests for the N+1 and slow query detector."""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+
+from core.models import Tag
+from core.querycheck import QueryInspectionMiddleware, detect_query_issues, query_shape
+
+
+def create_tags(count):
+    user = get_user_model().objects.create_user(email='querycheck@example.com', password='Password123')
+    return [Tag.objects.create(user=user, name=f'Tag {i}') for i in range(count)]
+
+
+class QueryCheckTests(TestCase):
+    """Test detecting repeated and slow queries."""
+
+    def test_query_shape_ignores_parameters(self):
+        """Test queries differing only in IN list length share a shape."""
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s)\n  AND a = %s'),
+            query_shape('SELECT * FROM t WHERE id IN (%s) AND a = %s'),
+        )
+
+    def test_repeated_queries_fail(self):
+        """Test an N+1 loop fails the block with the offending query."""
+        tags = create_tags(3)
+
+        with self.assertRaises(AssertionError) as cm:
+            with detect_query_issues(repeat_threshold=3):
+                for tag in tags:
+                    Tag.objects.get(pk=tag.pk)
+
+        self.assertIn('Query executed 3 times', str(cm.exception))
+        self.assertIn('core_tag', str(cm.exception))
+        self.assertIn('test_querycheck.py', str(cm.exception))
+
+    def test_distinct_queries_pass(self):
+        """Test a single query per shape is not reported."""
+        tags = create_tags(3)
+
+        with detect_query_issues(repeat_threshold=2) as inspector:
+            list(Tag.objects.filter(pk__in=[tag.pk for tag in tags]))
+
+        self.assertEqual(inspector.query_count, 1)
+        self.assertEqual(inspector.issues, [])
+
+    def test_slow_queries_fail(self):
+        """Test queries over the time threshold are reported."""
+        with self.assertRaises(AssertionError) as cm:
+            with detect_query_issues(slow_ms=0.000001):
+                Tag.objects.count()
+
+        self.assertIn('Slow query', str(cm.exception))
+
+    @override_settings(QUERY_INSPECTION_ENABLED=True, QUERY_REPEAT_THRESHOLD=2, QUERY_SLOW_MS=0)
+    def test_middleware_logs_issues(self):
+        """Test the middleware logs N+1 queries of a request."""
+        tags = create_tags(2)
+
+        def get_response(request):
+            for tag in tags:
+                Tag.objects.get(pk=tag.pk)
+            return HttpResponse()
+
+        middleware = QueryInspectionMiddleware(get_response)
+        with self.assertLogs('core.querycheck', level='WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+
+        self.assertIn('Query executed 2 times', logs.output[0])
@@ -0,0 +1,46 @@
+"""
+Tests for the query plan helpers
+"""
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.queryplans import UPDATE_ENV, diff_snapshot, normalize_plan, sequential_scans
+
+
+class QueryPlanHelperTests(SimpleTestCase):
+    """Test plan normalisation, scan detection and snapshots"""
+
+    def test_normalize_plan_drops_node_ids_and_literals(self):
+        plan = '6 0 0 SEARCH core_recipe USING INDEX core_recipe_user_id_04234149 (user_id=?)\n'
+        self.assertEqual(
+            normalize_plan(plan),
+            'SEARCH core_recipe USING INDEX core_recipe_user_id_04234149 (user_id=?)\n',
+        )
+        self.assertEqual(normalize_plan('Index Cond: (user_id = 42)  '), 'Index Cond: (user_id = N)\n')
+
+    def test_sequential_scans(self):
+        self.assertEqual(sequential_scans('SCAN core_tag\nSCAN core_recipe USING INDEX ix\n', 'sqlite'), ['core_tag'])
+        self.assertEqual(
+            sequential_scans('Sort\n  ->  Seq Scan on core_recipe\n  ->  Index Scan using ix on core_tag', 'postgresql'),
+            ['core_recipe'],
+        )
+
+    @patch.dict(os.environ)
+    def test_diff_snapshot(self):
+        os.environ.pop(UPDATE_ENV, None)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'plans' / 'list.sqlite.txt'
+
+            self.assertIn('+SEARCH a', diff_snapshot(path, 'SEARCH a\n'))
+            self.assertFalse(path.exists())
+            with patch.dict(os.environ, {UPDATE_ENV: '1'}):
+                self.assertIsNone(diff_snapshot(path, 'SEARCH a\n'))
+            self.assertEqual(diff_snapshot(path, 'SEARCH a\n'), '')
+            self.assertIn('+SCAN a', diff_snapshot(path, 'SCAN a\n'))
+            with patch.dict(os.environ, {UPDATE_ENV: '1'}):
+                self.assertIsNone(diff_snapshot(path, 'SCAN a\n'))
+            self.assertEqual(path.read_text(), 'SCAN a\n')
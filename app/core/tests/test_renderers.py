@@ -0,0 +1,60 @@
+"""Tests for the orjson JSON renderer."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.renderers import FastJSONRenderer
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer renders the same JSON as JSONRenderer."""
+
+    def assertRendersLikeJSONRenderer(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_recipe_like_payload(self):
+        self.assertRendersLikeJSONRenderer({
+            'count': 1,
+            'results': [{'id': 1, 'title': 'Crème brûlée', 'price': '5.50', 'tags': [{'id': 2, 'name': 'Dessert'}]}],
+        })
+
+    def test_decimal(self):
+        self.assertEqual(FastJSONRenderer().render({'price': Decimal('5.50')}), b'{"price":5.5}')
+        self.assertRendersLikeJSONRenderer([Decimal('0.10'), Decimal('12345.67')])
+
+    def test_values_of_drf_encoder(self):
+        self.assertRendersLikeJSONRenderer({
+            'detail': gettext_lazy('Not found.'),
+            'duration': timedelta(minutes=5),
+            'updated_at': datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+            'ids': {1, 2},
+            'counts': {1: 2},
+        })
+
+    def test_line_separators_escaped(self):
+        self.assertRendersLikeJSONRenderer({'title': 'a b c'})
+
+    def test_indent_uses_json_renderer(self):
+        rendered = FastJSONRenderer().render({'id': 1}, 'application/json; indent=2')
+
+        self.assertEqual(rendered, b'{\n  "id": 1\n}')
+
+    def test_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONRendererFallbackTests(SimpleTestCase):
+    """Test FastJSONRenderer without orjson installed."""
+
+    @patch.object(renderers, 'orjson', None)
+    def test_falls_back_to_stdlib(self):
+        data = {'price': Decimal('5.50'), 'title': 'Soup'}
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
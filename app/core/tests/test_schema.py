@@ -0,0 +1,97 @@
+"""Tests for the cached OpenAPI schema view."""
+import gzip
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class CachedSchemaTests(TestCase):
+    """Test serving the precomputed schema."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        settings_override = override_settings(SCHEMA_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema._documents.clear()
+        self.client = APIClient()
+
+    def test_schema_generated_once(self):
+        """Test the schema is generated on first request only."""
+        with patch.object(SchemaGenerator, 'get_schema', autospec=True, side_effect=SchemaGenerator.get_schema) as get_schema:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertIn(b'/api/user/recipes/', first.content)
+
+    def test_schema_loaded_from_disk(self):
+        """Test a schema written by another process is reused."""
+        body = self.client.get(SCHEMA_URL).content
+        schema._documents.clear()
+
+        with patch.object(SchemaGenerator, 'get_schema') as get_schema:
+            response = self.client.get(SCHEMA_URL)
+
+        get_schema.assert_not_called()
+        self.assertEqual(response.content, body)
+
+    def test_schema_not_modified(self):
+        """Test a matching ETag is answered with 304."""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_schema_etag_per_encoding(self):
+        """Test the gzip variant has its own ETag and is not validated by the plain one."""
+        plain_etag = self.client.get(SCHEMA_URL)['ETag']
+        gzip_response = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(gzip_response['ETag'], f'{plain_etag[:-1]}-gzip"')
+
+        response = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        response = self.client.get(
+            SCHEMA_URL,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=f'W/{gzip_response["ETag"]}',
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], gzip_response['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=gzip_response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_schema_gzip_variant(self):
+        """Test gzip clients receive the precompressed document."""
+        plain = self.client.get(SCHEMA_URL, HTTP_ACCEPT='application/vnd.oai.openapi+json')
+
+        response = self.client.get(
+            SCHEMA_URL,
+            HTTP_ACCEPT='application/vnd.oai.openapi+json',
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIn('Accept-Encoding', response['Vary'])
@@ -0,0 +1,82 @@
+"""Tests for worker start-up behaviour."""
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.management.commands.bench_startup import parse_import_times
+
+LAZY_MODULES = ['PIL', 'drf_spectacular.views', 'drf_spectacular.generators']
+
+
+def load_gunicorn_config():
+    """Import gunicorn.conf.py as a module."""
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', Path(settings.BASE_DIR) / 'gunicorn.conf.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StartupTests(SimpleTestCase):
+    """Test what is imported when a worker starts."""
+
+    def test_heavy_modules_loaded_lazily(self):
+        """Test image and schema libraries are not imported by warm-up."""
+        script = (
+            'import django, sys\n'
+            'django.setup()\n'
+            'from application.preload import warm_up\n'
+            'warm_up()\n'
+            f'print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_parse_import_times(self):
+        """Test parsing of -X importtime output."""
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     encodings.utf_8\n'
+            'import time:      2000 |       5000 | django\n'
+        )
+
+        modules = parse_import_times(stderr)
+
+        self.assertEqual(modules['django'], (2000, 5000, 0))
+        self.assertEqual(modules['encodings.utf_8'], (120, 120, 2))
+
+    def test_on_starting_clears_metrics_dir(self):
+        """Test stale metric files are removed and the directory is kept."""
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            Path(metrics_dir, 'counter_1.db').write_bytes(b'stale')
+            with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': metrics_dir}):
+                load_gunicorn_config().on_starting(MagicMock())
+
+            self.assertTrue(os.path.isdir(metrics_dir))
+            self.assertEqual(os.listdir(metrics_dir), [])
+
+    def test_on_starting_unusable_metrics_dir_exits(self):
+        """Test an unwritable metrics directory stops the server with a message."""
+        config = load_gunicorn_config()
+        server = MagicMock()
+
+        with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': '/vol/web/prometheus'}), \
+                patch.object(config.os, 'makedirs', side_effect=PermissionError(13, 'Permission denied')):
+            with self.assertRaises(SystemExit):
+                config.on_starting(server)
+
+        server.log.error.assert_called_once()
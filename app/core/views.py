@@ -0,0 +1,59 @@
+"""
+Internal operational views
+"""
+import os
+
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .decorators import internal_only
+from .metrics import render_metrics
+
+
+def _database_stats(connection):
+    """Connection settings and pool counters for one database alias."""
+    stats = {
+        'vendor': connection.vendor,
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+        'pooled': False,
+    }
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return stats
+
+    counters = pool.get_stats()
+    stats.update({
+        'pooled': True,
+        'min_size': counters.get('pool_min'),
+        'max_size': counters.get('pool_max'),
+        'size': counters.get('pool_size', 0),
+        'available': counters.get('pool_available', 0),
+        'in_use': counters.get('pool_size', 0) - counters.get('pool_available', 0),
+        'waiting': counters.get('requests_waiting', 0),
+        'requests': counters.get('requests_num', 0),
+        'requests_queued': counters.get('requests_queued', 0),
+        'wait_ms': counters.get('requests_wait_ms', 0),
+        'errors': counters.get('requests_errors', 0),
+        'counters': counters,
+    })
+    return stats
+
+
+@require_GET
+@internal_only
+def db_pool_stats(request):
+    """Report connection pool usage of this worker process."""
+    return JsonResponse({
+        'pid': os.getpid(),
+        'databases': {conn.alias: _database_stats(conn) for conn in connections.all()},
+    })
+
+
+@require_GET
+@internal_only
+def metrics(request):
+    """Expose Prometheus metrics aggregated over all worker processes."""
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
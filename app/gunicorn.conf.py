@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration
+
+The application is loaded once in the master process and warmed up before
+the workers are forked, so new workers can serve requests immediately.
+
+Prometheus metrics are shared between workers through files in
+PROMETHEUS_MULTIPROC_DIR, which has to be set before the app is imported.
+The image creates /vol/web/prometheus for them, writable by django-user.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import sys
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/vol/web/prometheus')
+
+wsgi_app = 'application.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+
+def on_starting(server):
+    """Start with empty metric files, samples of a previous run are stale."""
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    try:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for entry in os.scandir(metrics_dir):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+    except OSError as exc:
+        server.log.error(
+            'PROMETHEUS_MULTIPROC_DIR %s is not usable (%s). Create it writable '
+            'for the server user or point the variable at such a directory.',
+            metrics_dir,
+            exc,
+        )
+        sys.exit(1)
+
+
+def when_ready(server):
+    """Warm up the preloaded application before the first fork."""
+    from application.preload import warm_up
+
+    warm_up()
+    # Keep preloaded objects out of the collector so their pages stay shared.
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that has exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
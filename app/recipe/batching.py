@@ -0,0 +1,65 @@
+"""
+Batched summary and change log writes
+
+Saving a recipe with its tags and ingredients sends a signal per save and
+per m2m add or remove. Inside ``batched_writes()`` the handlers collect
+their summary deltas and change log entries per user instead of writing
+each one; the batch writes them once, in the same transaction, when the
+block exits. Outside a batch every write happens right away.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+def current_batch():
+    """Return the batch of the running ``batched_writes`` block, if any."""
+    return getattr(_local, 'batch', None)
+
+
+class WriteBatch:
+    """Pending writes keyed by e.g. ('summary', user_id).
+
+    Each pending item has a ``flush()`` method and a class level
+    ``flush_order``; change logs go first so every batch takes the user
+    row lock before the summary row lock.
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def get(self, key, factory):
+        """Return the pending item for key, created by factory on first use."""
+        item = self.pending.get(key)
+        if item is None:
+            item = self.pending[key] = factory()
+        return item
+
+    def flush(self):
+        for item in sorted(self.pending.values(), key=lambda item: item.flush_order):
+            item.flush()
+        self.pending.clear()
+
+
+@contextmanager
+def batched_writes():
+    """Collect summary and change log writes of the block and write them once at its end.
+
+    The block runs in a transaction. A nested block joins the outer batch.
+    """
+    if current_batch() is not None:
+        yield current_batch()
+        return
+
+    batch = WriteBatch()
+    _local.batch = batch
+    try:
+        with transaction.atomic():
+            yield batch
+            _local.batch = None
+            batch.flush()
+    finally:
+        _local.batch = None
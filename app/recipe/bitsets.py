@@ -0,0 +1,77 @@
+"""
+Integer bitsets and bit-sliced counters
+
+A bitset is a Python int whose bit n stands for the n-th recipe of an
+index. A bit-sliced counter holds one small count per recipe as a list of
+bitsets, slice i holding bit i of every count, so adding a bitset to all
+counts or selecting the recipes with a given count takes a few big-int
+operations instead of a loop over the recipes.
+"""
+
+
+def bitset(positions, size):
+    """Bitset with the given bit positions set."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bit_positions(bits, reverse=False):
+    """Set bit positions of a bitset in ascending order, descending with reverse."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    if reverse:
+        for offset in range(len(data) - 1, -1, -1):
+            byte = data[offset]
+            while byte:
+                high = byte.bit_length() - 1
+                yield offset * 8 + high
+                byte ^= 1 << high
+        return
+    for offset, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield offset * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def counter(counts, size):
+    """Bit-sliced counter of a list of non-negative counts."""
+    slices = []
+    for bit in range(max(counts, default=0).bit_length()):
+        slices.append(bitset((position for position, count in enumerate(counts) if count >> bit & 1), size))
+    return slices
+
+
+def increment(slices, bits):
+    """Add one to the counts of the recipes in bits, in place."""
+    carry = bits
+    for index, current in enumerate(slices):
+        if not carry:
+            return
+        slices[index], carry = current ^ carry, current & carry
+    if carry:
+        slices.append(carry)
+
+
+def subtract(minuend, subtrahend):
+    """Bit-sliced difference of two counters, every count of minuend at least that of subtrahend."""
+    difference = []
+    borrow = 0
+    for index, current in enumerate(minuend):
+        other = subtrahend[index] if index < len(subtrahend) else 0
+        difference.append(current ^ other ^ borrow)
+        borrow = (~current & (other | borrow)) | (other & borrow)
+    return difference
+
+
+def equal(slices, value, within):
+    """Recipes of within whose count is value."""
+    if value >> len(slices):
+        return 0
+    matches = within
+    for index, current in enumerate(slices):
+        matches &= current if value >> index & 1 else ~current
+        if not matches:
+            break
+    return matches
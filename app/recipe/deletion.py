@@ -0,0 +1,90 @@
+"""
+Set-based deletion of recipes
+
+Deleting recipes one by one runs Django's collector, which loads every
+recipe and link row and sends a signal per object. delete_recipes removes
+recipes in chunks with a fixed number of statements each: the link rows
+and the recipes are deleted with one DELETE per table. The summary,
+change log and recipe index, which the signals would have kept current,
+are updated for the chunk as a whole in the same transaction.
+"""
+from django.db import connections, router
+
+from core.models import ChangeLog, Recipe
+from .batching import batched_writes
+from .indexes import index_changed
+from .stats import remove_from_summary
+from .sync import record_changes
+
+DELETE_CHUNK_SIZE = 1000
+LINK_TABLES = {'recipe_tags': Recipe.tags.through, 'recipe_ingredients': Recipe.ingredients.through}
+
+
+def delete_rows(model, ids):
+    """Delete the rows of model with the given ids in a single DELETE, returning the row count.
+
+    No signals are sent and nothing cascades, the caller makes sure no
+    other rows reference the deleted ones.
+    """
+    if not ids:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({placeholders})',
+            list(ids),
+        )
+        return cursor.rowcount
+
+
+def _delete_chunk(user_id, candidate_ids):
+    """Delete one chunk of a user's recipes, returning the deleted row counts.
+
+    The chunk is a write batch, its change log and summary writes lock the
+    user row before the summary row like every other batch.
+    """
+    with batched_writes():
+        recipe_ids = list(
+            Recipe.objects.select_for_update()
+            .filter(user_id=user_id, id__in=candidate_ids)
+            .values_list('id', flat=True)
+        )
+        counts = {'recipes': 0, **{name: 0 for name in LINK_TABLES}}
+        if not recipe_ids:
+            return counts
+
+        remove_from_summary(user_id, recipe_ids)
+        for name, through in LINK_TABLES.items():
+            # The link tables have no dependents or signal receivers, so this is a single DELETE.
+            counts[name] = through.objects.filter(recipe_id__in=recipe_ids).delete()[0]
+        # Recipes have receivers that would make delete() collect them one by one, the
+        # link rows are gone and nothing else references them.
+        counts['recipes'] = delete_rows(Recipe, recipe_ids)
+
+        record_changes(user_id, ChangeLog.RECIPE, recipe_ids, deleted=True)
+
+        def update(index):
+            for recipe_id in recipe_ids:
+                index.remove_recipe(recipe_id)
+        index_changed(user_id, update)
+    return counts
+
+
+def delete_recipes(user_id, queryset, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete the user's recipes in queryset chunk by chunk, returning the deleted row counts.
+
+    Each chunk commits on its own, an interrupted call leaves the
+    remaining recipes in place and can be repeated.
+    """
+    totals = {'recipes': 0, **{name: 0 for name in LINK_TABLES}}
+    ids = queryset.filter(user_id=user_id).order_by('id').values_list('id', flat=True).distinct()
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return totals
+        for name, count in _delete_chunk(user_id, chunk).items():
+            totals[name] += count
+        last_id = chunk[-1]
@@ -0,0 +1,339 @@
+"""
+Per-user in-memory recipe index
+
+A RecipeIndex holds, for one user, the tags and ingredients of every
+recipe and the inverted postings (tag or ingredient -> recipe ids). It is
+built lazily from the link tables and kept in a bounded per-process LRU.
+Set-at-a-time queries run on Bitmaps, an immutable bitset snapshot of the
+index built on first use after a change.
+
+Every committed change bumps a per-user generation counter in the Django
+cache. A process whose cached index is one generation behind applies the
+change in place, any other process rebuilds on its next read. This needs a
+shared CACHE_BACKEND: with a local memory (or dummy) cache a write in one
+worker would never reach the indexes of the others, so indexes are then
+built per request and the recipe list filters with joins instead, unless
+RECIPE_INDEX_SINGLE_PROCESS says this is the only process.
+"""
+import heapq
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from core.models import Recipe
+
+from . import bitsets
+
+FIELDS = ('tags', 'ingredients')
+# Ingredients say more about what a dish is than tags do.
+FIELD_WEIGHTS = {'tags': 0.5, 'ingredients': 1.0}
+
+
+class RecipeIndex:
+    """Recipe links of one user with inverted postings."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.features = {field: {} for field in FIELDS}
+        self.postings = {field: defaultdict(set) for field in FIELDS}
+        self._bitmaps = None
+
+    @classmethod
+    def build(cls, user_id):
+        """Load the index of a user from the database."""
+        index = cls()
+        for recipe_id in Recipe.objects.filter(user_id=user_id).values_list('id', flat=True):
+            index.add_recipe(recipe_id)
+        for field in FIELDS:
+            through = Recipe._meta.get_field(field).remote_field.through
+            target = f'{Recipe._meta.get_field(field).related_model._meta.model_name}_id'
+            for recipe_id, target_id in through.objects.filter(recipe__user_id=user_id).values_list(
+                'recipe_id', target,
+            ):
+                index.link(field, recipe_id, [target_id])
+        return index
+
+    @property
+    def recipe_count(self):
+        return len(self.features['tags'])
+
+    def add_recipe(self, recipe_id):
+        with self.lock:
+            self._bitmaps = None
+            for field in FIELDS:
+                self.features[field].setdefault(recipe_id, set())
+
+    def remove_recipe(self, recipe_id):
+        with self.lock:
+            self._bitmaps = None
+            for field in FIELDS:
+                for target_id in self.features[field].pop(recipe_id, ()):
+                    self._discard_posting(field, target_id, recipe_id)
+
+    def link(self, field, recipe_id, target_ids):
+        with self.lock:
+            self._bitmaps = None
+            features = self.features[field].setdefault(recipe_id, set())
+            for target_id in target_ids:
+                features.add(target_id)
+                self.postings[field][target_id].add(recipe_id)
+
+    def unlink(self, field, recipe_id, target_ids=None):
+        """Remove links of a recipe, all of them when target_ids is None."""
+        with self.lock:
+            self._bitmaps = None
+            features = self.features[field].get(recipe_id, set())
+            for target_id in list(features if target_ids is None else target_ids):
+                features.discard(target_id)
+                self._discard_posting(field, target_id, recipe_id)
+
+    def unlink_target(self, field, target_id, recipe_ids=None):
+        """Remove links to a tag or ingredient, all of them when recipe_ids is None."""
+        with self.lock:
+            self._bitmaps = None
+            posting = self.postings[field].get(target_id, set())
+            for recipe_id in list(posting if recipe_ids is None else recipe_ids):
+                self.features[field].get(recipe_id, set()).discard(target_id)
+                self._discard_posting(field, target_id, recipe_id)
+
+    def _discard_posting(self, field, target_id, recipe_id):
+        posting = self.postings[field].get(target_id)
+        if posting is not None:
+            posting.discard(recipe_id)
+            if not posting:
+                del self.postings[field][target_id]
+
+    def _weight(self, field, target_id):
+        """Field weight scaled by inverse document frequency, rare links count more."""
+        document_frequency = len(self.postings[field].get(target_id, ())) or 1
+        return FIELD_WEIGHTS[field] * math.log(1 + self.recipe_count / document_frequency)
+
+    def similar(self, recipe_id, limit):
+        """Return up to limit (recipe_id, score) pairs ranked by weighted Jaccard similarity.
+
+        Only recipes sharing a tag or ingredient are scored, so the cost
+        follows the postings of the recipe rather than the recipe count.
+        """
+        with self.lock:
+            if recipe_id not in self.features['tags']:
+                return []
+            weights = {}
+            intersection = defaultdict(float)
+            own_weight = 0.0
+            for field in FIELDS:
+                for target_id in self.features[field][recipe_id]:
+                    weight = weights[field, target_id] = self._weight(field, target_id)
+                    own_weight += weight
+                    for other_id in self.postings[field][target_id]:
+                        if other_id != recipe_id:
+                            intersection[other_id] += weight
+
+            scores = []
+            for other_id, shared in intersection.items():
+                other_weight = 0.0
+                for field in FIELDS:
+                    for target_id in self.features[field][other_id]:
+                        weight = weights.get((field, target_id))
+                        if weight is None:
+                            weight = weights[field, target_id] = self._weight(field, target_id)
+                        other_weight += weight
+                scores.append((shared / (own_weight + other_weight - shared), other_id))
+        best = heapq.nlargest(limit, scores, key=lambda item: (item[0], -item[1]))
+        return [(other_id, score) for score, other_id in best]
+
+    def bitmaps(self):
+        """Return the bitset snapshot of the index, building it after a change."""
+        with self.lock:
+            if self._bitmaps is None:
+                self._bitmaps = Bitmaps(self)
+            return self._bitmaps
+
+
+class Bitmaps:
+    """Bitsets of one index state, bit n stands for the recipe with the n-th smallest id."""
+
+    def __init__(self, index):
+        self.recipe_ids = sorted(index.features['tags'])
+        self.size = len(self.recipe_ids)
+        self.all = (1 << self.size) - 1
+        positions = {recipe_id: position for position, recipe_id in enumerate(self.recipe_ids)}
+        self.bitsets = {
+            field: {
+                target_id: bitsets.bitset((positions[recipe_id] for recipe_id in posting), self.size)
+                for target_id, posting in index.postings[field].items()
+            }
+            for field in FIELDS
+        }
+        self.ingredient_counts = bitsets.counter(
+            [len(index.features['ingredients'][recipe_id]) for recipe_id in self.recipe_ids], self.size,
+        )
+
+    def select(self, filters):
+        """Bitset of the recipes matching tag and ingredient filters.
+
+        filters maps (field, mode) to target ids: mode 'any' keeps recipes
+        linked to one of them, 'all' to every one and 'not' to none.
+        """
+        bits = self.all
+        for (field, mode), target_ids in filters.items():
+            targets = [self.bitsets[field].get(target_id, 0) for target_id in target_ids]
+            if mode == 'any':
+                union = 0
+                for target in targets:
+                    union |= target
+                bits &= union
+            elif mode == 'all':
+                for target in targets:
+                    bits &= target
+            else:
+                for target in targets:
+                    bits &= ~target
+        return bits
+
+    def pantry(self, ingredient_ids, limit, max_missing=None):
+        """Rank recipes using the given ingredients by coverage.
+
+        Returns up to limit (recipe_id, missing, covered) triples, fewest
+        missing ingredients first, then most pantry ingredients used, then
+        by id. Recipes using none of the ingredients are left out.
+        """
+        pantry = [self.bitsets['ingredients'][pk] for pk in set(ingredient_ids) if pk in self.bitsets['ingredients']]
+        covered = []
+        candidates = 0
+        for bits in pantry:
+            bitsets.increment(covered, bits)
+            candidates |= bits
+        missing = bitsets.subtract(self.ingredient_counts, covered)
+
+        ranked = []
+        highest = (1 << len(missing)) - 1
+        if max_missing is not None:
+            highest = min(highest, max_missing)
+        for missing_count in range(highest + 1):
+            level = bitsets.equal(missing, missing_count, candidates)
+            candidates &= ~level
+            for covered_count in range(len(pantry), 0, -1):
+                if not level:
+                    break
+                group = bitsets.equal(covered, covered_count, level)
+                level &= ~group
+                for position in bitsets.bit_positions(group):
+                    ranked.append((self.recipe_ids[position], missing_count, covered_count))
+                    if len(ranked) == limit:
+                        return ranked
+            if not candidates:
+                break
+        return ranked
+
+
+class MatchingIds:
+    """Recipe ids of a bitset in id order, resolved one slice at a time for pagination."""
+
+    def __init__(self, bitmaps, bits, reverse=False):
+        self.bitmaps = bitmaps
+        self.bits = bits
+        self.reverse = reverse
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __iter__(self):
+        recipe_ids = self.bitmaps.recipe_ids
+        return (recipe_ids[position] for position in bitsets.bit_positions(self.bits, self.reverse))
+
+    def __getitem__(self, items):
+        if not isinstance(items, slice) or items.step is not None:
+            raise TypeError('MatchingIds supports slices without a step only.')
+        return list(islice(self, items.start, items.stop))
+
+
+class _CacheEntry:
+    __slots__ = ('index', 'generation')
+
+    def __init__(self, index, generation):
+        self.index = index
+        self.generation = generation
+
+
+_entries = OrderedDict()
+_entries_lock = threading.Lock()
+
+
+def _generation_key(user_id):
+    return f'recipe-index:generation:{user_id}'
+
+
+def _bump_generation(user_id):
+    key = _generation_key(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr, start over from the initial generation.
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def caching_enabled():
+    """Whether indexes may be kept between requests, i.e. every process sees the generations."""
+    if settings.RECIPE_INDEX_SINGLE_PROCESS:
+        return True
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_index(user_id):
+    """Return the current index of a user, building it when missing or stale."""
+    if not caching_enabled():
+        return RecipeIndex.build(user_id)
+    generation = cache.get(_generation_key(user_id), 0)
+    with _entries_lock:
+        entry = _entries.get(user_id)
+        if entry is not None and entry.generation == generation:
+            _entries.move_to_end(user_id)
+            return entry.index
+
+    # The generation is read before the tables, a change committed meanwhile bumps it again.
+    index = RecipeIndex.build(user_id)
+    with _entries_lock:
+        _entries[user_id] = _CacheEntry(index, generation)
+        _entries.move_to_end(user_id)
+        while len(_entries) > settings.RECIPE_INDEX_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return index
+
+
+def index_changed(user_id, update=None):
+    """Publish a change of a user's recipes once the transaction commits.
+
+    ``update`` applies the change to an index in place, this process keeps
+    its cached index when it is current and drops it otherwise.
+    """
+    if not caching_enabled():
+        return
+
+    def publish():
+        generation = _bump_generation(user_id)
+        with _entries_lock:
+            entry = _entries.get(user_id)
+            if entry is None:
+                return
+            if update is not None and entry.generation == generation - 1:
+                update(entry.index)
+                entry.generation = generation
+            else:
+                del _entries[user_id]
+
+    transaction.on_commit(publish, robust=True)
+
+
+def clear():
+    """Drop every cached index of this process."""
+    with _entries_lock:
+        _entries.clear()
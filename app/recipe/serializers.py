@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
+from .batching import batched_writes
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredients"""
@@ -28,42 +29,44 @@ class RecipeSerializer(serializers.ModelSerializer):
     def _get_or_create_tags(self, tags, recipe):
         """Get or create tags based on their name"""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, name=tag['name'])
-            recipe.tags.add(tag_obj)
+        tag_objs = [Tag.objects.get_or_create(user=auth_user, name=tag['name'])[0] for tag in tags]
+        recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Get or create ingredients based on their name"""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(user=auth_user, name=ingredient['name'])
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = [
+            Ingredient.objects.get_or_create(user=auth_user, name=ingredient['name'])[0] for ingredient in ingredients
+        ]
+        recipe.ingredients.add(*ingredient_objs)
 
     def create(self, validated_data):
         """Create a new recipe with tags"""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        with batched_writes():
+            recipe = Recipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, recipe)
+            self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
     def update(self, instance, validated_data):
         """Update a recipe with tags"""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+        with batched_writes():
+            if tags is not None:
+                instance.tags.clear()
+                self._get_or_create_tags(tags, instance)
 
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            if ingredients is not None:
+                instance.ingredients.clear()
+                self._get_or_create_ingredients(ingredients, instance)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        instance.save()
+            instance.save()
         return instance
 
 
@@ -73,6 +76,103 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ['description']
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serializer for a recipe with its similarity to another recipe"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['similarity']
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """Serializer for a recipe with its coverage by a set of ingredients"""
+    missing_count = serializers.IntegerField(read_only=True)
+    covered_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['missing_count', 'covered_count']
+
+
+class RecipeStatsEntrySerializer(serializers.Serializer):
+    """Serializer for a tag or ingredient ranked by recipe count"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField()
+
+
+class PriceBucketSerializer(serializers.Serializer):
+    """Serializer for the recipe count of a price range"""
+    range = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """Serializer for the recipe statistics of a user"""
+    recipe_count = serializers.IntegerField()
+    avg_time_minutes = serializers.FloatField(allow_null=True)
+    avg_price = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    price_distribution = PriceBucketSerializer(many=True)
+    top_tags = RecipeStatsEntrySerializer(many=True)
+    top_ingredients = RecipeStatsEntrySerializer(many=True)
+
+
+class SyncTagSerializer(TagSerializer):
+    """Serializer for a tag in a sync page"""
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['updated_at']
+
+
+class SyncIngredientSerializer(IngredientSerializer):
+    """Serializer for an ingredient in a sync page"""
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['updated_at']
+
+
+class SyncRecipeSerializer(RecipeDetailSerializer):
+    """Serializer for a recipe in a sync page"""
+    class Meta(RecipeDetailSerializer.Meta):
+        fields = RecipeDetailSerializer.Meta.fields + ['image', 'updated_at']
+
+
+class SyncDeletedSerializer(serializers.Serializer):
+    """Serializer for the ids of objects deleted since the last sync"""
+    recipes = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+
+
+class SyncSerializer(serializers.Serializer):
+    """Serializer for a page of changes since a sync version"""
+    version = serializers.IntegerField()
+    has_more = serializers.BooleanField()
+    recipes = SyncRecipeSerializer(many=True)
+    tags = SyncTagSerializer(many=True)
+    ingredients = SyncIngredientSerializer(many=True)
+    deleted = SyncDeletedSerializer()
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for selecting recipes to delete by id or by filters"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False)
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        """Refuse an empty selection, it would delete every recipe"""
+        if not attrs:
+            raise serializers.ValidationError('Give recipe ids or at least one filter.')
+        return attrs
+
+
+class RecipeBulkDeleteResultSerializer(serializers.Serializer):
+    """Serializer for the rows removed by a bulk delete"""
+    recipes = serializers.IntegerField()
+    recipe_tags = serializers.IntegerField()
+    recipe_ingredients = serializers.IntegerField()
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
@@ -0,0 +1,237 @@
+"""
+Signal handlers keeping the per-user recipe summaries, indexes and change logs current
+
+Summary and change log writes are collected per user while a
+``batched_writes()`` block runs, see ``recipe.batching``. Outside a batch
+the summary row is locked before the user row, the reverse of a batch,
+so the API runs every write, deletes included, in a batch.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+from .indexes import index_changed
+from .stats import price_bucket, schedule_rebuild, update_summary
+from .sync import record_changes
+
+LINK_FIELDS = {Recipe.tags.through: 'tags', Recipe.ingredients.through: 'ingredients'}
+CHANGE_KINDS = {
+    Recipe: ChangeLog.RECIPE,
+    Tag: ChangeLog.TAG,
+    Ingredient: ChangeLog.INGREDIENT,
+    Recipe.tags.through: ChangeLog.RECIPE_TAG,
+    Recipe.ingredients.through: ChangeLog.RECIPE_INGREDIENT,
+}
+
+
+def _deleted_directly(origin, model):
+    """Whether a delete started from the model itself rather than cascading from its user."""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+def _recipe_values(recipe):
+    return recipe.user_id, int(recipe.time_minutes), Decimal(str(recipe.price))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_values(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored values of an updated recipe to compute deltas after saving."""
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'user', 'time_minutes', 'price'} & set(update_fields):
+        return
+    instance._stats_previous = Recipe.objects.filter(pk=instance.pk).values_list(
+        'user_id', 'time_minutes', 'price',
+    ).first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    user_id, time_minutes, price = _recipe_values(instance)
+    if created:
+        update_summary(
+            user_id, create=True, recipes=1, time_minutes=time_minutes, price=price,
+            buckets={price_bucket(price): 1},
+        )
+        return
+
+    previous = instance.__dict__.pop('_stats_previous', None)
+    if previous is None or previous == (user_id, time_minutes, price):
+        return
+    previous_user_id, previous_time, previous_price = previous
+    if previous_user_id != user_id:
+        schedule_rebuild(previous_user_id)
+        schedule_rebuild(user_id)
+        return
+    buckets = {price_bucket(previous_price): -1}
+    buckets[price_bucket(price)] = buckets.get(price_bucket(price), 0) + 1
+    update_summary(
+        user_id, create=True, time_minutes=time_minutes - previous_time, price=price - previous_price,
+        buckets=buckets,
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_links(sender, instance, origin=None, **kwargs):
+    """Keep the links of a deleted recipe, their rows are gone once it is deleted."""
+    if _deleted_directly(origin, Recipe):
+        instance._stats_links = (
+            list(instance.tags.values_list('id', flat=True)),
+            list(instance.ingredients.values_list('id', flat=True)),
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    links = instance.__dict__.pop('_stats_links', None)
+    if links is None:
+        return
+    user_id, time_minutes, price = _recipe_values(instance)
+    tag_ids, ingredient_ids = links
+    update_summary(
+        user_id, recipes=-1, time_minutes=-time_minutes, price=-price,
+        buckets={price_bucket(price): -1},
+        tags={pk: -1 for pk in tag_ids},
+        ingredients={pk: -1 for pk in ingredient_ids},
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def link_target_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, sender):
+        field = 'tags' if sender is Tag else 'ingredients'
+        update_summary(instance.user_id, **{field: {instance.pk: None}})
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count added and removed tags or ingredients from either side of the relation."""
+    field = LINK_FIELDS[sender]
+    if reverse:
+        linked = instance.recipe_set
+    else:
+        linked = getattr(instance, field)
+
+    if action == 'pre_remove':
+        instance._stats_removed = set(linked.filter(id__in=pk_set).values_list('id', flat=True))
+        return
+    if action == 'pre_clear':
+        instance._stats_removed = set(linked.values_list('id', flat=True))
+        return
+
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = instance.__dict__.pop('_stats_removed', set()), -1
+    else:
+        return
+    if not changed:
+        return
+
+    if reverse:
+        deltas = {instance.pk: delta * len(changed)}
+    else:
+        deltas = {pk: delta for pk in changed}
+    update_summary(instance.user_id, create=delta > 0, **{field: deltas})
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_saved(sender, instance, created, **kwargs):
+    if created:
+        recipe_id = instance.pk
+        index_changed(instance.user_id, lambda index: index.add_recipe(recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def index_recipe_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, Recipe):
+        recipe_id = instance.pk
+        index_changed(instance.user_id, lambda index: index.remove_recipe(recipe_id))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_link_target_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, sender):
+        field = 'tags' if sender is Tag else 'ingredients'
+        target_id = instance.pk
+        index_changed(instance.user_id, lambda index: index.unlink_target(field, target_id))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def index_user_deleted(sender, instance, **kwargs):
+    index_changed(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Apply added and removed links to the cached index of the owner."""
+    field = LINK_FIELDS[sender]
+    ids = set(pk_set or ())
+    owner_id = instance.pk
+
+    if action == 'post_add' and reverse:
+        def update(index):
+            for recipe_id in ids:
+                index.link(field, recipe_id, [owner_id])
+    elif action == 'post_add':
+        def update(index):
+            index.link(field, owner_id, ids)
+    elif action in ('post_remove', 'post_clear') and reverse:
+        def update(index):
+            index.unlink_target(field, owner_id, ids if action == 'post_remove' else None)
+    elif action in ('post_remove', 'post_clear'):
+        def update(index):
+            index.unlink(field, owner_id, ids if action == 'post_remove' else None)
+    else:
+        return
+    index_changed(instance.user_id, update)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_saved(sender, instance, **kwargs):
+    record_changes(instance.user_id, CHANGE_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_deleted(sender, instance, origin=None, **kwargs):
+    """Log a tombstone, links deleted with the object are implied by it."""
+    if _deleted_directly(origin, sender):
+        record_changes(instance.user_id, CHANGE_KINDS[sender], [instance.pk], deleted=True)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def log_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log added and removed links as (recipe, tag or ingredient) pairs."""
+    if action == 'pre_clear':
+        linked = instance.recipe_set if reverse else getattr(instance, LINK_FIELDS[sender])
+        instance._sync_cleared = list(linked.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        ids = instance.__dict__.pop('_sync_cleared', [])
+    elif action in ('post_add', 'post_remove'):
+        ids = sorted(pk_set)
+    else:
+        return
+
+    if reverse:
+        recipe_ids, related_ids = ids, [instance.pk]
+    else:
+        recipe_ids, related_ids = [instance.pk], ids
+    record_changes(
+        instance.user_id, CHANGE_KINDS[sender], recipe_ids, deleted=action != 'post_add', related_ids=related_ids,
+    )
@@ -0,0 +1,270 @@
+"""
+Per-user recipe statistics
+
+Statistics come from the user's RecipeSummary row, which the handlers in
+``recipe.signals`` keep current on recipe saves, deletes and tag or
+ingredient changes. Within ``batched_writes()`` the deltas of one user are
+summed up and applied once. Users without a summary get the same
+statistics from aggregate queries; ``manage.py rebuild_recipe_stats``
+rebuilds the rows, bulk inserts call ``rebuild_summary`` themselves.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from core.models import Recipe, RecipeSummary, Tag, Ingredient
+from .batching import current_batch
+
+PRICE_BUCKET_BOUNDS = [0, 5, 10, 20, 50, 100]
+PRICE_BUCKETS = [
+    f'{low}-{high}' if high is not None else f'{low}+'
+    for low, high in zip(PRICE_BUCKET_BOUNDS, PRICE_BUCKET_BOUNDS[1:] + [None])
+]
+TOP_DEFAULT = 10
+CENT = Decimal('0.01')
+
+
+def price_bucket(price):
+    """Label of the price bucket a price falls in."""
+    for label, high in zip(PRICE_BUCKETS, PRICE_BUCKET_BOUNDS[1:]):
+        if price < high:
+            return label
+    return PRICE_BUCKETS[-1]
+
+
+def _bucket_filters():
+    filters = {}
+    for label, low, high in zip(PRICE_BUCKETS, PRICE_BUCKET_BOUNDS, PRICE_BUCKET_BOUNDS[1:] + [None]):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        filters[label] = condition
+    return filters
+
+
+def _recipe_aggregates(user_id, recipe_ids=None):
+    """Count, totals and price buckets of a user's recipes in one query."""
+    recipes = Recipe.objects.filter(user_id=user_id)
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+    return recipes.aggregate(
+        recipe_count=Count('id'),
+        total_time_minutes=Sum('time_minutes'),
+        total_price=Sum('price'),
+        **{f'bucket_{label}': Count('id', filter=condition) for label, condition in _bucket_filters().items()},
+    )
+
+
+def _link_counts(field, user_id, recipe_ids=None):
+    """Recipes per tag or ingredient of a user, keyed by id as a string."""
+    through = Recipe._meta.get_field(field).remote_field.through
+    target = f'{Recipe._meta.get_field(field).related_model._meta.model_name}_id'
+    links = through.objects.filter(recipe__user_id=user_id)
+    if recipe_ids is not None:
+        links = links.filter(recipe_id__in=recipe_ids)
+    rows = links.values(target).annotate(count=Count('id'))
+    return {str(row[target]): row['count'] for row in rows}
+
+
+def _format(recipe_count, total_time_minutes, total_price, price_buckets, top_tags, top_ingredients):
+    return {
+        'recipe_count': recipe_count,
+        'avg_time_minutes': total_time_minutes / recipe_count if recipe_count else None,
+        'avg_price': (Decimal(total_price) / recipe_count).quantize(CENT) if recipe_count else None,
+        'price_distribution': [{'range': label, 'count': price_buckets.get(label, 0)} for label in PRICE_BUCKETS],
+        'top_tags': top_tags,
+        'top_ingredients': top_ingredients,
+    }
+
+
+def _top_from_counts(model, counts, top):
+    ranked = sorted(
+        ((int(pk), count) for pk, count in counts.items() if count > 0),
+        key=lambda item: (-item[1], item[0]),
+    )[:top]
+    names = dict(model.objects.filter(id__in=[pk for pk, _ in ranked]).values_list('id', 'name'))
+    return [{'id': pk, 'name': names[pk], 'recipe_count': count} for pk, count in ranked if pk in names]
+
+
+def _top_from_aggregates(model, user_id, top):
+    rows = (
+        model.objects.filter(user_id=user_id)
+        .annotate(recipe_count=Count('recipe'))
+        .filter(recipe_count__gt=0)
+        .order_by('-recipe_count', 'id')
+        .values('id', 'name', 'recipe_count')[:top]
+    )
+    return list(rows)
+
+
+def summary_stats(summary, top=TOP_DEFAULT):
+    """Statistics from a maintained summary row."""
+    return _format(
+        summary.recipe_count,
+        summary.total_time_minutes,
+        summary.total_price,
+        summary.price_buckets,
+        _top_from_counts(Tag, summary.tag_counts, top),
+        _top_from_counts(Ingredient, summary.ingredient_counts, top),
+    )
+
+
+def aggregate_stats(user_id, top=TOP_DEFAULT):
+    """Statistics computed from the recipe tables."""
+    totals = _recipe_aggregates(user_id)
+    return _format(
+        totals['recipe_count'],
+        totals['total_time_minutes'] or 0,
+        totals['total_price'] or 0,
+        {label: totals[f'bucket_{label}'] for label in PRICE_BUCKETS},
+        _top_from_aggregates(Tag, user_id, top),
+        _top_from_aggregates(Ingredient, user_id, top),
+    )
+
+
+def user_stats(user_id, top=TOP_DEFAULT):
+    """Statistics of a user, from the summary when there is one."""
+    summary = RecipeSummary.objects.filter(user_id=user_id).first()
+    if summary is None:
+        return aggregate_stats(user_id, top)
+    return summary_stats(summary, top)
+
+
+def rebuild_summary(user_id):
+    """Recompute a user's summary row from the recipe tables."""
+    totals = _recipe_aggregates(user_id)
+    summary, _ = RecipeSummary.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'recipe_count': totals['recipe_count'],
+            'total_time_minutes': totals['total_time_minutes'] or 0,
+            'total_price': totals['total_price'] or 0,
+            'price_buckets': {
+                label: totals[f'bucket_{label}'] for label in PRICE_BUCKETS if totals[f'bucket_{label}']
+            },
+            'tag_counts': _link_counts('tags', user_id),
+            'ingredient_counts': _link_counts('ingredients', user_id),
+        },
+    )
+    return summary
+
+
+def _add_counts(counts, deltas):
+    for pk, delta in deltas.items():
+        if delta is None:
+            counts.pop(str(pk), None)
+            continue
+        value = counts.get(str(pk), 0) + delta
+        if value > 0:
+            counts[str(pk)] = value
+        else:
+            counts.pop(str(pk), None)
+
+
+def _merge_counts(counts, deltas):
+    for pk, delta in deltas.items():
+        key = str(pk)
+        if delta is None or (key in counts and counts[key] is None):
+            counts[key] = None
+        else:
+            counts[key] = counts.get(key, 0) + delta
+
+
+class PendingSummary:
+    """Summary deltas of one user collected by a write batch."""
+
+    flush_order = 1
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.create = False
+        self.rebuild = False
+        self.recipes = 0
+        self.time_minutes = 0
+        self.price = 0
+        self.buckets = {}
+        self.tags = {}
+        self.ingredients = {}
+
+    def add(self, create, recipes, time_minutes, price, buckets, tags, ingredients):
+        self.create = self.create or create
+        self.recipes += recipes
+        self.time_minutes += time_minutes
+        self.price += price
+        _merge_counts(self.buckets, buckets or {})
+        _merge_counts(self.tags, tags or {})
+        _merge_counts(self.ingredients, ingredients or {})
+
+    def flush(self):
+        if self.rebuild:
+            rebuild_summary(self.user_id)
+            return
+        changed = self.recipes or self.time_minutes or self.price or any(
+            delta != 0 for counts in (self.buckets, self.tags, self.ingredients) for delta in counts.values()
+        )
+        if changed or self.create:
+            _apply_summary(
+                self.user_id, self.create, self.recipes, self.time_minutes, self.price, self.buckets, self.tags,
+                self.ingredients,
+            )
+
+
+def _pending_summary(batch, user_id):
+    return batch.get(('summary', user_id), lambda: PendingSummary(user_id))
+
+
+def update_summary(user_id, create=False, recipes=0, time_minutes=0, price=0, buckets=None, tags=None,
+                   ingredients=None):
+    """Apply deltas to a user's summary, once per user at the end of a write batch.
+
+    Count deltas map ids to increments, None drops the id. A missing
+    summary is rebuilt from the tables when ``create`` is set, as they
+    already include the change, and left missing otherwise.
+    """
+    batch = current_batch()
+    if batch is not None:
+        _pending_summary(batch, user_id).add(create, recipes, time_minutes, price, buckets, tags, ingredients)
+        return
+    _apply_summary(user_id, create, recipes, time_minutes, price, buckets, tags, ingredients)
+
+
+def schedule_rebuild(user_id):
+    """Rebuild a user's summary, at the end of the write batch if there is one."""
+    batch = current_batch()
+    if batch is not None:
+        _pending_summary(batch, user_id).rebuild = True
+        return
+    rebuild_summary(user_id)
+
+
+def _apply_summary(user_id, create, recipes, time_minutes, price, buckets, tags, ingredients):
+    with transaction.atomic():
+        summary = RecipeSummary.objects.select_for_update().filter(user_id=user_id).first()
+        if summary is None:
+            if create:
+                rebuild_summary(user_id)
+            return
+        summary.recipe_count += recipes
+        summary.total_time_minutes += time_minutes
+        summary.total_price += price
+        _add_counts(summary.price_buckets, buckets or {})
+        _add_counts(summary.tag_counts, tags or {})
+        _add_counts(summary.ingredient_counts, ingredients or {})
+        summary.save()
+
+
+def remove_from_summary(user_id, recipe_ids):
+    """Subtract recipes that are deleted without signals from a user's summary, before deleting them."""
+    if not RecipeSummary.objects.filter(user_id=user_id).exists():
+        return
+    totals = _recipe_aggregates(user_id, recipe_ids)
+    update_summary(
+        user_id,
+        recipes=-totals['recipe_count'],
+        time_minutes=-(totals['total_time_minutes'] or 0),
+        price=-(totals['total_price'] or 0),
+        buckets={label: -totals[f'bucket_{label}'] for label in PRICE_BUCKETS if totals[f'bucket_{label}']},
+        tags={pk: -count for pk, count in _link_counts('tags', user_id, recipe_ids).items()},
+        ingredients={pk: -count for pk, count in _link_counts('ingredients', user_id, recipe_ids).items()},
+    )
@@ -0,0 +1,164 @@
+"""
+Delta sync of recipes, tags and ingredients
+
+Every change is appended to the user's ChangeLog in the transaction that
+makes it, the log id being the version a client syncs from. Writers of a
+user take a lock on the user row before logging, so log ids of one user
+are assigned in commit order and a client never skips a change committed
+after it synced. A sync page reads the next log entries and returns the
+current state of the objects they touch, objects gone since are returned
+as deleted. Within ``batched_writes()`` a user's entries are inserted
+together, under one lock, when the batch ends.
+
+``prune_change_log`` keeps the log bounded: entries older than the
+retention window are deleted unless they are the latest entry of a live
+object, which a full sync from version 0 still needs. The highest pruned
+id of each user is kept as its SyncHorizon, a client that synced before
+it may have missed a pruned change and gets ResyncRequired.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.models import ChangeLog, Recipe, SyncHorizon, Tag, Ingredient
+from .batching import current_batch
+
+SYNC_LIMIT_DEFAULT = 500
+SYNC_LIMIT_MAX = 5000
+LINK_KINDS = {ChangeLog.RECIPE_TAG, ChangeLog.RECIPE_INGREDIENT}
+PRUNE_BATCH_SIZE = 5000
+
+
+class ResyncRequired(APIException):
+    """Changes after the client's version were pruned from the log"""
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Changes since this version are no longer available, sync again from version 0.'
+    default_code = 'resync_required'
+
+
+class PendingChanges:
+    """Change log entries of one user collected by a write batch."""
+
+    flush_order = 0
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.entries = []
+
+    def flush(self):
+        _write_changes(self.user_id, self.entries)
+
+
+def record_changes(user_id, kind, object_ids, deleted=False, related_ids=None):
+    """Log changes of objects, or of links between recipes (object_ids) and related_ids."""
+    if related_ids is None:
+        pairs = [(object_id, None) for object_id in object_ids]
+    else:
+        pairs = [(object_id, related_id) for object_id in object_ids for related_id in related_ids]
+    entries = [
+        ChangeLog(user_id=user_id, kind=kind, object_id=object_id, related_id=related_id, deleted=deleted)
+        for object_id, related_id in pairs
+    ]
+    batch = current_batch()
+    if batch is not None:
+        batch.get(('changes', user_id), lambda: PendingChanges(user_id)).entries.extend(entries)
+        return
+    _write_changes(user_id, entries)
+
+
+def _write_changes(user_id, entries):
+    if not entries:
+        return
+    with transaction.atomic():
+        list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk'))
+        ChangeLog.objects.bulk_create(entries)
+
+
+def changes_since(user, since, limit=SYNC_LIMIT_DEFAULT, full=False):
+    """Return the next page of changes of a user after version since.
+
+    Link changes are returned as changes of their recipe, which lists its
+    tags and ingredients. Raises ResyncRequired when changes after since
+    have been pruned, unless full says since continues a full sync from
+    version 0, which only needs the entries that are kept.
+    """
+    horizon = SyncHorizon.objects.filter(user=user).values_list('pruned_through', flat=True).first() or 0
+    if not full and 0 < since < horizon:
+        raise ResyncRequired()
+    entries = list(
+        ChangeLog.objects.filter(user=user, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'kind', 'object_id')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    touched = {ChangeLog.RECIPE: set(), ChangeLog.TAG: set(), ChangeLog.INGREDIENT: set()}
+    for _, kind, object_id in entries:
+        touched[ChangeLog.RECIPE if kind in LINK_KINDS else kind].add(object_id)
+
+    recipes = list(
+        Recipe.objects.filter(user=user, id__in=touched[ChangeLog.RECIPE])
+        .order_by('id')
+        .prefetch_related('tags', 'ingredients')
+    )
+    tags = list(Tag.objects.filter(user=user, id__in=touched[ChangeLog.TAG]).order_by('id'))
+    ingredients = list(Ingredient.objects.filter(user=user, id__in=touched[ChangeLog.INGREDIENT]).order_by('id'))
+
+    def deleted(kind, current):
+        return sorted(touched[kind] - {obj.id for obj in current})
+
+    version = entries[-1][0] if entries else since
+    if not has_more:
+        # A full sync has seen every live object, pruned entries no longer matter to it.
+        version = max(version, horizon)
+    return {
+        'version': version,
+        'has_more': has_more,
+        'recipes': recipes,
+        'tags': tags,
+        'ingredients': ingredients,
+        'deleted': {
+            'recipes': deleted(ChangeLog.RECIPE, recipes),
+            'tags': deleted(ChangeLog.TAG, tags),
+            'ingredients': deleted(ChangeLog.INGREDIENT, ingredients),
+        },
+    }
+
+
+def prune_change_log(retention_days, batch_size=PRUNE_BATCH_SIZE):
+    """Delete change log entries older than retention_days, returning how many.
+
+    Old link changes, tombstones and entries superseded by a newer entry of
+    the same object go; the latest entry of a live object stays. Each batch
+    commits on its own together with the raised SyncHorizons of its users.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    newer = ChangeLog.objects.filter(
+        user=OuterRef('user'), kind=OuterRef('kind'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'),
+    )
+    prunable = (
+        ChangeLog.objects.filter(created_at__lt=cutoff)
+        .filter(Q(kind__in=LINK_KINDS) | Q(deleted=True) | Exists(newer))
+        .order_by('id')
+        .values_list('id', 'user_id')
+    )
+    pruned = 0
+    while True:
+        with transaction.atomic():
+            rows = list(prunable[:batch_size])
+            if not rows:
+                return pruned
+            horizons = {}
+            for entry_id, user_id in rows:
+                horizons[user_id] = max(horizons.get(user_id, 0), entry_id)
+            # Nothing references change log entries, delete() is one DELETE statement.
+            pruned += ChangeLog.objects.filter(id__in=[entry_id for entry_id, _ in rows]).delete()[0]
+            for user_id, entry_id in horizons.items():
+                # Batches run in id order, a later batch never lowers a horizon.
+                SyncHorizon.objects.update_or_create(user_id=user_id, defaults={'pruned_through': entry_id})
@@ -0,0 +1,12 @@
+"""
+Background jobs of the recipe app
+"""
+from core.jobs import job
+
+from .stats import rebuild_summary
+
+
+@job('recipe.rebuild_summary')
+def rebuild_recipe_summary(user_id):
+    """Recompute the RecipeSummary of a user from the recipe tables."""
+    rebuild_summary(user_id)
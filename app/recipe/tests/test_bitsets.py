@@ -0,0 +1,50 @@
+"""
+Tests for bitsets and bit-sliced counters
+"""
+import random
+
+from django.test import SimpleTestCase
+
+from recipe import bitsets
+
+
+class BitsetTests(SimpleTestCase):
+    """Test bitset helpers against plain Python counts"""
+
+    def test_bitset_round_trip(self):
+        positions = [0, 3, 8, 9, 63, 64, 200]
+
+        bits = bitsets.bitset(positions, 201)
+
+        self.assertEqual(list(bitsets.bit_positions(bits)), positions)
+        self.assertEqual(list(bitsets.bit_positions(bits, reverse=True)), positions[::-1])
+        self.assertEqual(list(bitsets.bit_positions(0)), [])
+
+    def test_counters_match_python_counts(self):
+        rng = random.Random(7)
+        size = 300
+        totals = [rng.randrange(12) for _ in range(size)]
+        members = [
+            [position for position in range(size) if rng.random() < 0.3]
+            for _ in range(6)
+        ]
+        counts = [0] * size
+        covered = []
+        for positions in members:
+            for position in positions:
+                counts[position] += 1
+            bitsets.increment(covered, bitsets.bitset(positions, size))
+        totals = [max(total, count) for total, count in zip(totals, counts)]
+
+        difference = bitsets.subtract(bitsets.counter(totals, size), covered)
+        everything = (1 << size) - 1
+
+        for value in range(16):
+            self.assertEqual(
+                list(bitsets.bit_positions(bitsets.equal(covered, value, everything))),
+                [position for position, count in enumerate(counts) if count == value],
+            )
+            self.assertEqual(
+                list(bitsets.bit_positions(bitsets.equal(difference, value, everything))),
+                [position for position, (total, count) in enumerate(zip(totals, counts)) if total - count == value],
+            )
@@ -0,0 +1,137 @@
+"""
+Tests for set-based bulk deletion of recipes
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+from recipe import indexes
+from recipe.deletion import delete_recipes
+from recipe.stats import aggregate_stats, rebuild_summary, user_stats
+
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+
+
+def create_recipe(user, title, tags=(), ingredients=(), price='5.00'):
+    recipe = Recipe.objects.create(user=user, title=title, time_minutes=10, price=Decimal(price))
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@override_settings(RECIPE_INDEX_SINGLE_PROCESS=True)
+class BulkDeleteApiTests(TestCase):
+    """Test deleting many recipes with set-based statements"""
+
+    def setUp(self):
+        indexes.clear()
+        cache.clear()
+        self.addCleanup(indexes.clear)
+        self.user = get_user_model().objects.create_user('bulk@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.curry = create_recipe(self.user, 'Curry', [self.vegan], [self.rice], price='7.50')
+        self.salad = create_recipe(self.user, 'Salad', [self.vegan], [], price='25.00')
+        self.steak = create_recipe(self.user, 'Steak', [], [self.rice])
+        rebuild_summary(self.user.id)
+
+    def test_bulk_delete_by_ids(self):
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        foreign = create_recipe(other, 'Foreign')
+
+        res = self.client.post(BULK_DELETE_URL, {'ids': [self.curry.id, self.salad.id, foreign.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'recipes': 2, 'recipe_tags': 2, 'recipe_ingredients': 1})
+        self.assertEqual(list(Recipe.objects.filter(user=self.user)), [self.steak])
+        self.assertTrue(Recipe.objects.filter(id=foreign.id).exists())
+        self.assertTrue(Tag.objects.filter(id=self.vegan.id).exists())
+
+    def test_bulk_delete_by_filters(self):
+        Recipe.objects.filter(id=self.salad.id).update(updated_at=timezone.now() - timedelta(days=30))
+
+        res = self.client.post(BULK_DELETE_URL, {
+            'tags': [self.vegan.id],
+            'updated_after': (timezone.now() - timedelta(days=1)).isoformat(),
+        }, format='json')
+
+        self.assertEqual(res.data['recipes'], 1)
+        self.assertEqual(set(Recipe.objects.values_list('title', flat=True)), {'Salad', 'Steak'})
+
+    def test_bulk_delete_requires_a_selection(self):
+        res = self.client.post(BULK_DELETE_URL, {}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 3)
+
+    def test_bulk_delete_keeps_derived_state_current(self):
+        cached = indexes.get_index(self.user.id)
+        version = ChangeLog.objects.latest('id').id
+        curry_id, salad_id = self.curry.id, self.salad.id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(BULK_DELETE_URL, {'ids': [curry_id, salad_id]}, format='json')
+
+        self.assertEqual(user_stats(self.user.id), aggregate_stats(self.user.id))
+        self.assertEqual(
+            sorted(ChangeLog.objects.filter(id__gt=version, deleted=True).values_list('object_id', flat=True)),
+            [curry_id, salad_id],
+        )
+        self.assertIs(indexes.get_index(self.user.id), cached)
+        self.assertEqual(cached.features, indexes.RecipeIndex.build(self.user.id).features)
+
+    def test_statements_per_chunk_are_bounded(self):
+        for index in range(17):
+            create_recipe(self.user, f'Recipe {index}', [self.vegan], [self.rice])
+        recipes = Recipe.objects.filter(user=self.user)
+
+        with CaptureQueriesContext(connection) as small_chunks:
+            delete_recipes(self.user.id, recipes.filter(title__startswith='Recipe'), chunk_size=3)
+        # Six chunks, then the query finding no more recipes.
+        per_chunk = (len(small_chunks) - 1) / 6
+
+        with CaptureQueriesContext(connection) as one_chunk:
+            delete_recipes(self.user.id, recipes, chunk_size=100)
+
+        self.assertEqual(len(one_chunk) - 1, per_chunk)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_delete_query_count(self):
+        recipes = Recipe.objects.filter(user=self.user)
+
+        # One DELETE per link table and one for the recipes, the rest is the summary
+        # update, the change log entries, savepoints and the queries for the next chunk.
+        with self.assertNumQueries(20):
+            counts = delete_recipes(self.user.id, recipes)
+
+        self.assertEqual(counts, {'recipes': 3, 'recipe_tags': 2, 'recipe_ingredients': 2})
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_delete_locks_user_before_summary(self):
+        """A chunk locks the rows in the order of batched writes, so it cannot deadlock with them"""
+        lock = ' FOR UPDATE' if connection.features.has_select_for_update else ''
+
+        with CaptureQueriesContext(connection) as queries:
+            delete_recipes(self.user.id, Recipe.objects.filter(user=self.user))
+
+        sql = [query['sql'] for query in queries.captured_queries]
+
+        def first(prefix):
+            return next(i for i, query in enumerate(sql) if query.startswith(prefix) and query.endswith(lock))
+
+        self.assertLess(
+            first('SELECT "core_user"."id" AS "pk" FROM "core_user"'),
+            first('SELECT "core_recipesummary"."user_id"'),
+        )
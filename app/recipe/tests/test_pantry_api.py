@@ -0,0 +1,97 @@
+"""
+Tests for the pantry matching endpoint
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe import indexes
+
+PANTRY_URL = reverse('recipe:recipe-pantry')
+
+
+def create_recipe(user, title, ingredients=()):
+    recipe = Recipe.objects.create(user=user, title=title, time_minutes=10, price=Decimal('5.00'))
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@override_settings(RECIPE_INDEX_SINGLE_PROCESS=True)
+class PantryApiTests(TestCase):
+    """Test ranking recipes by the ingredients at hand"""
+
+    def setUp(self):
+        indexes.clear()
+        cache.clear()
+        self.addCleanup(indexes.clear)
+        self.user = get_user_model().objects.create_user('pantry@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rice, self.egg, self.tofu, self.leek, self.saffron = (
+            Ingredient.objects.create(user=self.user, name=name) for name in ('Rice', 'Egg', 'Tofu', 'Leek', 'Saffron')
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fried_rice = create_recipe(self.user, 'Fried rice', [self.rice, self.egg])
+            self.omelette = create_recipe(self.user, 'Omelette', [self.egg])
+            self.bowl = create_recipe(self.user, 'Bowl', [self.rice, self.tofu, self.leek])
+            self.paella = create_recipe(self.user, 'Paella', [self.rice, self.saffron, self.leek, self.egg])
+            create_recipe(self.user, 'Leek soup', [self.leek])
+            create_recipe(self.user, 'Water', [])
+
+    def ranking(self, res):
+        return [(recipe['title'], recipe['missing_count'], recipe['covered_count']) for recipe in res.data]
+
+    def test_pantry_ranks_by_missing_then_covered(self):
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.rice.id},{self.egg.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ranking(res), [
+            ('Fried rice', 0, 2),
+            ('Omelette', 0, 1),
+            ('Paella', 2, 2),
+            ('Bowl', 2, 1),
+        ])
+
+    def test_pantry_by_name_and_max_missing(self):
+        res = self.client.get(PANTRY_URL, {'names': ' rice ,TOFU', 'max_missing': 1})
+
+        self.assertEqual(self.ranking(res), [('Bowl', 1, 2), ('Fried rice', 1, 1)])
+
+    def test_pantry_limit(self):
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.rice.id},{self.egg.id}', 'limit': 3})
+
+        self.assertEqual([title for title, _, _ in self.ranking(res)], ['Fried rice', 'Omelette', 'Paella'])
+
+    def test_pantry_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bowl.ingredients.remove(self.tofu, self.leek)
+            self.omelette.delete()
+
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.rice.id},{self.egg.id}'})
+
+        self.assertEqual(self.ranking(res), [
+            ('Fried rice', 0, 2),
+            ('Bowl', 0, 1),
+            ('Paella', 2, 2),
+        ])
+
+    def test_pantry_ignores_other_users_ingredients(self):
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        rice = Ingredient.objects.create(user=other, name='Rice')
+        create_recipe(other, 'Other rice', [rice])
+
+        res = self.client.get(PANTRY_URL, {'ingredients': str(rice.id)})
+
+        self.assertEqual(res.data, [])
+
+    def test_pantry_invalid_params(self):
+        for params in ({}, {'ingredients': 'rice'}, {'ingredients': '1', 'max_missing': -1}):
+            res = self.client.get(PANTRY_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,87 @@
+"""
+Query plan snapshot tests for the recipe API querysets
+"""
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from core.queryplans import explain, diff_snapshot, sequential_scans
+from recipe import views
+
+SNAPSHOT_DIR = Path(__file__).parent / 'query_plans'
+
+
+class QueryPlanTests(TestCase):
+    """Test that hot querysets keep using indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor == 'postgresql':
+            # Rows of earlier tests are rolled back but still take up pages that change the
+            # plan costs. TRUNCATE gives the tables new, empty files until the class rolls back.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'TRUNCATE core_recipe_tags, core_recipe_ingredients, core_recipe, core_tag, core_ingredient'
+                )
+        cls.user = get_user_model().objects.create_user(email='plans@example.com', password='Password123')
+        cls.tags = [Tag.objects.create(user=cls.user, name=f'Tag {i}') for i in range(3)]
+        cls.ingredients = [Ingredient.objects.create(user=cls.user, name=f'Ingredient {i}') for i in range(3)]
+        for i in range(5):
+            recipe = Recipe.objects.create(user=cls.user, title=f'Recipe {i}', time_minutes=10, price=Decimal('5.00'))
+            recipe.tags.add(cls.tags[i % 3])
+            recipe.ingredients.add(cls.ingredients[i % 3])
+
+    def _queryset(self, viewset_class, params=None):
+        request = Request(APIRequestFactory().get('/', params or {}))
+        request.user = self.user
+        view = viewset_class(action='list', request=request, format_kwarg=None, kwargs={})
+        return view.get_queryset()
+
+    def assert_plan(self, name, queryset):
+        """Fail on sequential scans or a plan that differs from its snapshot."""
+        plan = explain(queryset)
+        self.assertEqual(sequential_scans(plan, connection.vendor), [], f'{name} reads without an index:\n{plan}')
+
+        path = SNAPSHOT_DIR / f'{name}.{connection.vendor}.txt'
+        diff = diff_snapshot(path, plan)
+        if diff is None:
+            self.skipTest(f'Recorded query plan snapshot {path.name}, commit it.')
+        self.assertEqual(diff, '', f'{name} plan changed or has no snapshot, rerun with UPDATE_QUERY_PLANS=1 '
+                                   f'if intended:\n{diff}')
+
+    def test_recipe_list_plan(self):
+        self.assert_plan('recipe_list', self._queryset(views.RecipeViewSet))
+
+    def test_recipe_list_tags_plan(self):
+        tag_ids = ','.join(str(tag.id) for tag in self.tags[:2])
+        self.assert_plan('recipe_list_tags', self._queryset(views.RecipeViewSet, {'tags': tag_ids}))
+
+    def test_recipe_list_ingredients_plan(self):
+        params = {'ingredients': str(self.ingredients[0].id)}
+        self.assert_plan('recipe_list_ingredients', self._queryset(views.RecipeViewSet, params))
+
+    def test_recipe_list_tags_and_ingredients_plan(self):
+        params = {'tags': str(self.tags[0].id), 'ingredients': str(self.ingredients[0].id)}
+        self.assert_plan('recipe_list_tags_ingredients', self._queryset(views.RecipeViewSet, params))
+
+    def test_recipe_list_ordering_plans(self):
+        for ordering in ('title', '-time_minutes', 'price'):
+            with self.subTest(ordering=ordering):
+                queryset = self._queryset(views.RecipeViewSet, {'ordering': ordering})
+                self.assert_plan(f'recipe_list_ordering_{ordering.lstrip("-")}', queryset)
+
+    def test_recipe_list_range_plan(self):
+        params = {'price_max': '10', 'time_minutes_max': 30, 'ordering': 'price'}
+        self.assert_plan('recipe_list_price_time_range', self._queryset(views.RecipeViewSet, params))
+
+    def test_tag_list_assigned_only_plan(self):
+        self.assert_plan('tag_list_assigned', self._queryset(views.TagAttrViewSet, {'assigned_only': 1}))
+
+    def test_ingredient_list_assigned_only_plan(self):
+        self.assert_plan('ingredient_list_assigned', self._queryset(views.IngredientAttrViewSet, {'assigned_only': 1}))
@@ -7,6 +7,7 @@ from rest_framework.test import APIClient
 from decimal import Decimal
 from core.models import Recipe, Tag, Ingredient # and this works as well
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer # This import works'
+from core.querycheck import detect_query_issues
 import tempfile
 import os
 
@@ -71,6 +72,20 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_list_recipes_without_n_plus_one(self):
+        """Test listing recipes with tags and ingredients does not query per recipe."""
+        for i in range(6):
+            recipe = create_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(Ingredient.objects.create(user=self.user, name=f'Ingredient {i}'))
+
+        with detect_query_issues(repeat_threshold=3) as inspector:
+            response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+        self.assertLessEqual(inspector.query_count, 3)
+
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
         user2 = create_user(email='testopzxc@example.con', password='Lodfdokfdkfodl2')
@@ -382,6 +397,62 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(s2.data, response.data)
         self.assertEqual(len(response.data), 2)
 
+    def test_filter_by_time_and_price_range(self):
+        """Test filtering by time_minutes and price ranges."""
+        quick_cheap = create_recipe(self.user, time_minutes=15, price=Decimal('8.00'))
+        create_recipe(self.user, time_minutes=45, price=Decimal('8.00'))
+        create_recipe(self.user, time_minutes=15, price=Decimal('12.50'))
+        boundary = create_recipe(self.user, time_minutes=30, price=Decimal('10.00'))
+
+        response = self.client.get(RECIPES_URL, {'time_minutes_max': 30, 'price_max': '10'})
+
+        self.assertEqual([recipe['id'] for recipe in response.data], [boundary.id, quick_cheap.id])
+
+        response = self.client.get(RECIPES_URL, {'time_minutes_min': 20, 'price_min': '9.99'})
+
+        self.assertEqual([recipe['id'] for recipe in response.data], [boundary.id])
+
+    def test_invalid_range_and_ordering_params(self):
+        """Test that malformed filter and ordering values are rejected."""
+        for params in ({'price_max': 'cheap'}, {'time_minutes_min': -1}, {'ordering': 'description'},
+                       {'ordering': '--price'}):
+            with self.subTest(params=params):
+                response = self.client.get(RECIPES_URL, params)
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_breaks_ties_by_id(self):
+        """Test ordering by a field keeps recipes with equal values in id order."""
+        a = create_recipe(self.user, title='B', price=Decimal('5.00'))
+        b = create_recipe(self.user, title='A', price=Decimal('5.00'))
+        c = create_recipe(self.user, title='C', price=Decimal('2.00'))
+
+        ascending = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        descending = self.client.get(RECIPES_URL, {'ordering': '-price'})
+        by_title = self.client.get(RECIPES_URL, {'ordering': 'title'})
+
+        self.assertEqual([recipe['id'] for recipe in ascending.data], [c.id, a.id, b.id])
+        self.assertEqual([recipe['id'] for recipe in descending.data], [b.id, a.id, c.id])
+        self.assertEqual([recipe['id'] for recipe in by_title.data], [b.id, a.id, c.id])
+
+    def test_pagination_is_opt_in_and_stable(self):
+        """Test limit/offset pages partition the ordered list."""
+        for i in range(7):
+            create_recipe(self.user, title=f'Recipe {i}', time_minutes=10 + i % 2)
+
+        unpaginated = self.client.get(RECIPES_URL, {'ordering': 'time_minutes'})
+        pages = [
+            self.client.get(RECIPES_URL, {'ordering': 'time_minutes', 'limit': 3, 'offset': offset})
+            for offset in (0, 3, 6)
+        ]
+
+        self.assertIsInstance(unpaginated.data, list)
+        self.assertEqual(pages[0].data['count'], 7)
+        self.assertEqual(
+            [recipe['id'] for page in pages for recipe in page.data['results']],
+            [recipe['id'] for recipe in unpaginated.data],
+        )
+
 
 class ImageUploadTest(TestCase):
     """Tests image upload endpoint."""
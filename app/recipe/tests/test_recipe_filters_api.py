@@ -0,0 +1,108 @@
+"""
+Tests for tag and ingredient filters of the recipe list, with and without bitmap filters
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import indexes
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(RECIPE_INDEX_SINGLE_PROCESS=True)
+class RecipeLinkFilterTests(TestCase):
+    """Test AND, OR and NOT filters on tags and ingredients"""
+
+    def setUp(self):
+        indexes.clear()
+        cache.clear()
+        self.addCleanup(indexes.clear)
+        self.user = get_user_model().objects.create_user('filters@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan, self.quick, self.dinner = (
+            Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Quick', 'Dinner')
+        )
+        self.rice, self.tofu = (Ingredient.objects.create(user=self.user, name=name) for name in ('Rice', 'Tofu'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bowl = self.create_recipe('Bowl', 5, [self.vegan, self.quick, self.dinner], [self.rice, self.tofu])
+            self.salad = self.create_recipe('Salad', 20, [self.vegan, self.quick], [self.tofu])
+            self.stew = self.create_recipe('Stew', 90, [self.vegan, self.dinner], [self.rice])
+            self.steak = self.create_recipe('Steak', 15, [self.quick, self.dinner], [])
+            self.toast = self.create_recipe('Toast', 3, [], [])
+
+    def create_recipe(self, title, time_minutes, tags, ingredients):
+        recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=time_minutes, price=Decimal('5.00'))
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def titles(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipes = res.data['results'] if 'limit' in params else res.data
+        return [recipe['title'] for recipe in recipes]
+
+    def cases(self):
+        return [
+            ({'tags_all': f'{self.vegan.id},{self.quick.id}'}, ['Salad', 'Bowl']),
+            ({'tags_all': f'{self.vegan.id},{self.quick.id},{self.dinner.id}'}, ['Bowl']),
+            ({'tags': f'{self.quick.id},{self.dinner.id}', 'tags_not': str(self.vegan.id)}, ['Steak']),
+            ({'tags_not': f'{self.vegan.id},{self.quick.id}'}, ['Toast']),
+            ({'tags_all': str(self.vegan.id), 'ingredients_not': str(self.rice.id)}, ['Salad']),
+            ({'ingredients_all': f'{self.rice.id},{self.tofu.id}'}, ['Bowl']),
+            ({'tags_all': str(self.vegan.id), 'ordering': 'time_minutes'}, ['Bowl', 'Salad', 'Stew']),
+            ({'tags_all': str(self.vegan.id), 'time_minutes_max': 30}, ['Salad', 'Bowl']),
+            ({'tags_all': str(self.vegan.id), 'limit': 2}, ['Stew', 'Salad']),
+            ({'tags_all': str(self.vegan.id), 'limit': 2, 'offset': 2, 'ordering': 'id'}, ['Stew']),
+            ({'tags_all': '0'}, []),
+        ]
+
+    def test_filters_match_in_both_modes(self):
+        for bitmap_filters in (False, True):
+            with override_settings(RECIPE_BITMAP_FILTERS=bitmap_filters):
+                for params, expected in self.cases():
+                    with self.subTest(bitmap_filters=bitmap_filters, params=params):
+                        self.assertEqual(self.titles(params), expected)
+
+    @override_settings(RECIPE_BITMAP_FILTERS=True)
+    def test_bitmap_page_is_fetched_by_primary_key(self):
+        indexes.get_index(self.user.id).bitmaps()
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'tags_all': str(self.vegan.id), 'limit': 1, 'offset': 1})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual([recipe['title'] for recipe in res.data['results']], ['Salad'])
+
+    @override_settings(RECIPE_BITMAP_FILTERS=True)
+    def test_bitmap_filters_follow_changes(self):
+        self.assertEqual(self.titles({'tags_all': f'{self.vegan.id},{self.dinner.id}'}), ['Stew', 'Bowl'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.steak.tags.add(self.vegan)
+            self.stew.delete()
+
+        self.assertEqual(self.titles({'tags_all': f'{self.vegan.id},{self.dinner.id}'}), ['Steak', 'Bowl'])
+
+    @override_settings(RECIPE_BITMAP_FILTERS=True, RECIPE_INDEX_SINGLE_PROCESS=False)
+    def test_bitmap_filters_use_joins_with_local_cache(self):
+        with patch('recipe.views.get_index') as get_index:
+            titles = self.titles({'tags_all': f'{self.vegan.id},{self.dinner.id}'})
+
+        self.assertEqual(titles, ['Stew', 'Bowl'])
+        get_index.assert_not_called()
+
+    def test_invalid_filter_ids(self):
+        res = self.client.get(RECIPES_URL, {'tags_not': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags_not', res.data)
@@ -0,0 +1,158 @@
+"""
+Tests for the similar recipes endpoint and the recipe index
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import indexes
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def create_recipe(user, title, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(user=user, title=title, time_minutes=10, price=Decimal('5.00'))
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@override_settings(RECIPE_INDEX_SINGLE_PROCESS=True)
+class IndexTestCase(TestCase):
+    """Start every test with empty index caches"""
+
+    def setUp(self):
+        indexes.clear()
+        cache.clear()
+        self.addCleanup(indexes.clear)
+        self.user = get_user_model().objects.create_user('similar@example.com', 'Password123')
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.salt, self.rice, self.tofu, self.saffron = (
+            Ingredient.objects.create(user=self.user, name=name) for name in ('Salt', 'Rice', 'Tofu', 'Saffron')
+        )
+
+
+class RecipeIndexTests(IndexTestCase):
+    """Test building and maintaining the recipe index"""
+
+    def assert_index_matches_database(self):
+        cached = indexes.get_index(self.user.id)
+        built = indexes.RecipeIndex.build(self.user.id)
+        self.assertEqual(cached.features, built.features)
+        self.assertEqual(dict(cached.postings['tags']), dict(built.postings['tags']))
+        self.assertEqual(dict(cached.postings['ingredients']), dict(built.postings['ingredients']))
+
+    def test_index_is_updated_in_place_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            paella = create_recipe(self.user, 'Paella', [self.dinner], [self.rice, self.saffron])
+        cached = indexes.get_index(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bowl = create_recipe(self.user, 'Bowl', [self.vegan], [self.rice, self.tofu])
+            paella.tags.add(self.vegan)
+            paella.ingredients.remove(self.saffron)
+            self.salt.recipe_set.add(paella, bowl)
+            self.dinner.recipe_set.clear()
+            bowl.ingredients.clear()
+
+        self.assertIs(indexes.get_index(self.user.id), cached)
+        self.assert_index_matches_database()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vegan.delete()
+            paella.delete()
+
+        self.assertIs(indexes.get_index(self.user.id), cached)
+        self.assert_index_matches_database()
+
+    def test_stale_index_is_rebuilt(self):
+        stale = indexes.get_index(self.user.id)
+        indexes._bump_generation(self.user.id)
+
+        self.assertIsNot(indexes.get_index(self.user.id), stale)
+
+    def test_lru_is_bounded(self):
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+
+        with self.settings(RECIPE_INDEX_CACHE_SIZE=1):
+            first = indexes.get_index(self.user.id)
+            indexes.get_index(other.id)
+
+            self.assertIsNot(indexes.get_index(self.user.id), first)
+
+
+@override_settings(RECIPE_INDEX_SINGLE_PROCESS=False)
+class LocalCacheFallbackTests(IndexTestCase):
+    """Test indexes are not kept when other workers cannot invalidate them"""
+
+    def test_index_built_per_request(self):
+        self.assertFalse(indexes.caching_enabled())
+        self.assertIsNot(indexes.get_index(self.user.id), indexes.get_index(self.user.id))
+
+    def test_write_of_another_worker_is_seen(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            paella = create_recipe(self.user, 'Paella', [], [self.rice])
+            bowl = create_recipe(self.user, 'Bowl', [], [])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(similar_url(paella.id)).data, [])
+
+        # A link written by another process, no signal reaches this one.
+        Recipe.ingredients.through.objects.create(recipe=bowl, ingredient=self.rice)
+
+        res = client.get(similar_url(paella.id))
+        self.assertEqual([recipe['id'] for recipe in res.data], [bowl.id])
+
+
+class SimilarRecipeApiTests(IndexTestCase):
+    """Test the similar recipes action"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paella = create_recipe(self.user, 'Paella', [self.dinner], [self.rice, self.saffron, self.salt])
+            self.risotto = create_recipe(self.user, 'Risotto', [self.dinner], [self.rice, self.saffron, self.salt])
+            self.bowl = create_recipe(self.user, 'Bowl', [self.vegan], [self.rice, self.tofu, self.salt])
+            self.soup = create_recipe(self.user, 'Soup', [], [self.salt])
+            create_recipe(self.user, 'Toast', [self.vegan], [])
+
+    def test_similar_ranks_by_weighted_overlap(self):
+        res = self.client.get(similar_url(self.paella.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe['id'] for recipe in res.data], [self.risotto.id, self.bowl.id, self.soup.id])
+        self.assertEqual(res.data[0]['similarity'], 1.0)
+        self.assertGreater(res.data[1]['similarity'], res.data[2]['similarity'])
+
+    def test_similar_limit(self):
+        res = self.client.get(similar_url(self.paella.id), {'limit': 1})
+
+        self.assertEqual([recipe['id'] for recipe in res.data], [self.risotto.id])
+
+    def test_similar_reflects_link_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.risotto.ingredients.clear()
+            self.risotto.tags.clear()
+
+        res = self.client.get(similar_url(self.paella.id))
+
+        self.assertEqual([recipe['id'] for recipe in res.data], [self.bowl.id, self.soup.id])
+
+    def test_similar_other_users_recipe_not_found(self):
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        recipe = create_recipe(other, 'Secret', [], [])
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
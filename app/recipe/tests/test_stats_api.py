@@ -0,0 +1,237 @@
+"""
+Tests for the recipe statistics endpoint and summaries
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeSummary, Tag, Ingredient
+from recipe.batching import batched_writes
+from recipe.stats import aggregate_stats, user_stats
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Recipe', 'time_minutes': 10, 'price': Decimal('5.00')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated stats requests"""
+
+    def test_auth_required(self):
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test the recipe statistics of an authenticated user"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('stats@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def _create_recipes(self):
+        soup = create_recipe(self.user, title='Soup', time_minutes=10, price=Decimal('4.50'))
+        soup.tags.add(self.dinner, self.vegan)
+        soup.ingredients.add(self.salt)
+        stew = create_recipe(self.user, title='Stew', time_minutes=30, price=Decimal('12.00'))
+        stew.tags.add(self.dinner)
+        return soup, stew
+
+    def assert_summary_matches_tables(self):
+        self.assertEqual(user_stats(self.user.id), aggregate_stats(self.user.id))
+
+    def test_stats(self):
+        self._create_recipes()
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        create_recipe(other, price=Decimal('99.00'))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['avg_time_minutes'], 20)
+        self.assertEqual(res.data['avg_price'], '8.25')
+        distribution = {bucket['range']: bucket['count'] for bucket in res.data['price_distribution']}
+        self.assertEqual(distribution, {'0-5': 1, '5-10': 0, '10-20': 1, '20-50': 0, '50-100': 0, '100+': 0})
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count']) for tag in res.data['top_tags']],
+            [('Dinner', 2), ('Vegan', 1)],
+        )
+        self.assertEqual([ingredient['name'] for ingredient in res.data['top_ingredients']], ['Salt'])
+
+    def test_stats_limits_top_entries(self):
+        self._create_recipes()
+
+        res = self.client.get(STATS_URL, {'top': 1})
+
+        self.assertEqual([tag['name'] for tag in res.data['top_tags']], ['Dinner'])
+        self.assertEqual(self.client.get(STATS_URL, {'top': 'many'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_without_recipes(self):
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['avg_price'])
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_from_summary_is_constant_queries(self):
+        self._create_recipes()
+        self.assertTrue(RecipeSummary.objects.filter(user=self.user).exists())
+
+        with self.assertNumQueries(3):
+            user_stats(self.user.id)
+
+    def test_stats_without_summary_uses_aggregates(self):
+        self._create_recipes()
+        expected = user_stats(self.user.id)
+        RecipeSummary.objects.all().delete()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], expected['recipe_count'])
+        self.assertEqual([tag['id'] for tag in res.data['top_tags']], [tag['id'] for tag in expected['top_tags']])
+        self.assertFalse(RecipeSummary.objects.exists())
+
+    def test_summary_tracks_updates_and_deletes(self):
+        soup, stew = self._create_recipes()
+
+        soup.price = Decimal('60.00')
+        soup.time_minutes = 15
+        soup.save()
+        self.assert_summary_matches_tables()
+
+        stew.delete()
+        self.assert_summary_matches_tables()
+        self.assertEqual(user_stats(self.user.id)['recipe_count'], 1)
+
+    def test_summary_tracks_link_changes(self):
+        soup, stew = self._create_recipes()
+
+        soup.tags.remove(self.vegan, self.dinner)
+        soup.tags.remove(self.vegan)
+        self.assert_summary_matches_tables()
+        stew.tags.clear()
+        self.assert_summary_matches_tables()
+        self.vegan.recipe_set.add(soup, stew)
+        self.assert_summary_matches_tables()
+        self.salt.recipe_set.clear()
+        self.assert_summary_matches_tables()
+        self.vegan.delete()
+        self.assert_summary_matches_tables()
+
+    def test_summary_tracks_api_writes(self):
+        payload = {'title': 'Pie', 'time_minutes': 40, 'price': '7.00', 'tags': [{'name': 'Dinner'}, {'name': 'New'}]}
+        res = self.client.post(reverse('recipe:recipe-list'), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.client.patch(reverse('recipe:recipe-detail', args=[res.data['id']]), {'tags': []}, format='json')
+
+        self.assert_summary_matches_tables()
+
+    def test_summary_written_once_per_batch(self):
+        self._create_recipes()
+
+        with CaptureQueriesContext(connection) as queries, batched_writes():
+            pie = create_recipe(self.user, title='Pie', time_minutes=40, price=Decimal('7.00'))
+            pie.tags.add(self.dinner, self.vegan)
+            pie.ingredients.add(self.salt)
+            pie.tags.remove(self.vegan)
+            pie.price = Decimal('25.00')
+            pie.save()
+
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len([query for query in sql if query.startswith('UPDATE "core_recipesummary"')]), 1)
+        self.assert_summary_matches_tables()
+
+    def test_batch_rebuilds_summaries_of_moved_recipe(self):
+        soup, _ = self._create_recipes()
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        create_recipe(other)
+
+        with batched_writes():
+            soup.tags.clear()
+            soup.ingredients.clear()
+            soup.user = other
+            soup.save()
+
+        self.assert_summary_matches_tables()
+        self.assertEqual(user_stats(other.id), aggregate_stats(other.id))
+
+    def test_api_create_query_count(self):
+        """Summary and change log are written once per request, not once per link"""
+        payload = {
+            'title': 'Pie', 'time_minutes': 40, 'price': '7.00',
+            'tags': [{'name': 'Dinner'}, {'name': 'Vegan'}], 'ingredients': [{'name': 'Salt'}, {'name': 'Flour'}],
+        }
+        self.client.post(reverse('recipe:recipe-list'), payload, format='json')
+
+        with self.assertNumQueries(21):
+            res = self.client.post(reverse('recipe:recipe-list'), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assert_summary_matches_tables()
+
+    def assert_user_locked_before_summary(self, queries):
+        """Both rows are locked in the order batched creates and updates use, so writers cannot deadlock"""
+        lock = ' FOR UPDATE' if connection.features.has_select_for_update else ''
+        sql = [query['sql'] for query in queries.captured_queries]
+
+        def first(prefix):
+            return next(i for i, query in enumerate(sql) if query.startswith(prefix) and query.endswith(lock))
+
+        self.assertLess(
+            first('SELECT "core_user"."id" AS "pk" FROM "core_user"'),
+            first('SELECT "core_recipesummary"."user_id"'),
+        )
+
+    def test_api_delete_locks_user_before_summary(self):
+        soup, _ = self._create_recipes()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.delete(reverse('recipe:recipe-detail', args=[soup.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_user_locked_before_summary(queries)
+        self.assert_summary_matches_tables()
+
+    def test_api_tag_delete_locks_user_before_summary(self):
+        self._create_recipes()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.delete(reverse('recipe:tag-detail', args=[self.vegan.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_user_locked_before_summary(queries)
+        self.assert_summary_matches_tables()
+
+    def test_user_delete_removes_summary(self):
+        self._create_recipes()
+
+        self.user.delete()
+
+        self.assertFalse(RecipeSummary.objects.exists())
+
+    def test_rebuild_recipe_stats_command(self):
+        self._create_recipes()
+        RecipeSummary.objects.update(recipe_count=0, tag_counts={})
+
+        call_command('rebuild_recipe_stats', stdout=StringIO())
+
+        self.assert_summary_matches_tables()
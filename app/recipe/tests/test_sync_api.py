@@ -0,0 +1,207 @@
+"""
+Tests for the delta sync endpoint
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, Recipe, SyncHorizon, Tag, Ingredient
+from recipe.sync import prune_change_log
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def create_recipe(user, title='Curry', **params):
+    defaults = {'time_minutes': 10, 'price': Decimal('5.00')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, title=title, **defaults)
+
+
+class SyncApiTests(TestCase):
+    """Test syncing changes since a version"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('sync@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.curry = create_recipe(self.user, 'Curry')
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(self.rice)
+
+    def sync(self, since=0, **params):
+        res = self.client.get(SYNC_URL, {'since': since, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync(self):
+        data = self.sync()
+
+        self.assertEqual([recipe['title'] for recipe in data['recipes']], ['Curry'])
+        self.assertEqual(data['recipes'][0]['tags'], [{'id': self.vegan.id, 'name': 'Vegan'}])
+        self.assertEqual([tag['name'] for tag in data['tags']], ['Vegan'])
+        self.assertEqual([ingredient['name'] for ingredient in data['ingredients']], ['Rice'])
+        self.assertIn('updated_at', data['recipes'][0])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(data['version'], ChangeLog.objects.latest('id').id)
+
+    def test_quiet_sync_is_empty(self):
+        version = self.sync()['version']
+
+        data = self.sync(version)
+
+        self.assertEqual(data['version'], version)
+        self.assertEqual((data['recipes'], data['tags'], data['ingredients']), ([], [], []))
+        self.assertEqual(data['deleted'], {'recipes': [], 'tags': [], 'ingredients': []})
+
+    def test_sync_returns_only_changes(self):
+        soup = create_recipe(self.user, 'Soup')
+        soup_id, vegan_id = soup.id, self.vegan.id
+        version = self.sync()['version']
+
+        self.curry.title = 'Green curry'
+        self.curry.save()
+        self.rice.recipe_set.remove(self.curry)
+        self.vegan.delete()
+        soup.delete()
+        data = self.sync(version)
+
+        self.assertEqual([recipe['title'] for recipe in data['recipes']], ['Green curry'])
+        self.assertEqual(data['recipes'][0]['ingredients'], [])
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(data['deleted'], {'recipes': [soup_id], 'tags': [vegan_id], 'ingredients': []})
+
+    def test_link_changes_are_logged_with_tombstones(self):
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.curry.ingredients.add(tofu)
+        self.curry.ingredients.clear()
+
+        links = ChangeLog.objects.filter(kind=ChangeLog.RECIPE_INGREDIENT).order_by('id')
+
+        self.assertEqual(
+            list(links.values_list('object_id', 'related_id', 'deleted')),
+            [
+                (self.curry.id, self.rice.id, False),
+                (self.curry.id, tofu.id, False),
+                (self.curry.id, self.rice.id, True),
+                (self.curry.id, tofu.id, True),
+            ],
+        )
+
+    def test_paginated_sync_collects_everything(self):
+        for index in range(5):
+            create_recipe(self.user, f'Recipe {index}')
+        titles = set()
+        version, pages = 0, 0
+
+        while True:
+            data = self.sync(version, limit=3)
+            titles.update(recipe['title'] for recipe in data['recipes'])
+            version, pages = data['version'], pages + 1
+            if not data['has_more']:
+                break
+
+        self.assertEqual(titles, set(Recipe.objects.values_list('title', flat=True)))
+        self.assertGreater(pages, 1)
+
+    def test_sync_limited_to_user(self):
+        other = get_user_model().objects.create_user('other@example.com', 'Password123')
+        version = self.sync()['version']
+        create_recipe(other, 'Secret')
+        Tag.objects.create(user=other, name='Secret')
+
+        data = self.sync(version)
+
+        self.assertEqual((data['recipes'], data['tags']), ([], []))
+
+    def test_sync_invalid_version(self):
+        res = self.client.get(SYNC_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeLogRetentionTests(TestCase):
+    """Test pruning the change log and resyncing clients behind it"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('retention@example.com', 'Password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.curry = create_recipe(self.user, 'Curry')
+        self.curry.tags.add(self.vegan)
+        self.stale_version = ChangeLog.objects.latest('id').id
+        soup = create_recipe(self.user, 'Soup')
+        self.curry.title = 'Green curry'
+        self.curry.save()
+        soup.delete()
+        self.tombstone_id = ChangeLog.objects.latest('id').id
+        self.age_log()
+
+    def age_log(self, days=40):
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=days))
+
+    def get(self, since, **params):
+        return self.client.get(SYNC_URL, {'since': since, **params})
+
+    def test_prune_keeps_latest_entry_of_live_objects(self):
+        pruned = prune_change_log(30)
+
+        kept = ChangeLog.objects.order_by('id').values_list('kind', 'object_id', 'deleted')
+        self.assertEqual(list(kept), [(ChangeLog.TAG, self.vegan.id, False), (ChangeLog.RECIPE, self.curry.id, False)])
+        self.assertEqual(pruned, 4)
+        self.assertEqual(SyncHorizon.objects.get(user=self.user).pruned_through, self.tombstone_id)
+
+    def test_prune_leaves_recent_entries(self):
+        self.assertEqual(prune_change_log(60), 0)
+        self.assertFalse(SyncHorizon.objects.exists())
+
+    def test_stale_version_requires_resync(self):
+        prune_change_log(30)
+
+        res = self.get(self.stale_version)
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+        self.assertEqual(res.data['detail'].code, 'resync_required')
+
+    def test_full_sync_after_pruning(self):
+        prune_change_log(30)
+        horizon = SyncHorizon.objects.get(user=self.user).pruned_through
+        titles, version = [], 0
+
+        while True:
+            res = self.get(version, limit=1, full=1)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            titles += [recipe['title'] for recipe in res.data['recipes']]
+            version = res.data['version']
+            if not res.data['has_more']:
+                break
+
+        self.assertEqual(titles, ['Green curry'])
+        self.assertGreaterEqual(version, horizon)
+        res = self.get(version)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], [])
+
+    def test_up_to_date_client_keeps_syncing(self):
+        version = self.get(0).data['version']
+
+        prune_change_log(30)
+
+        self.assertEqual(self.get(version).status_code, status.HTTP_200_OK)
+
+    def test_prune_change_log_command(self):
+        out = StringIO()
+
+        call_command('prune_change_log', days=30, stdout=out)
+
+        self.assertIn('Pruned 4 change log entries', out.getvalue())
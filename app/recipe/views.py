@@ -1,11 +1,38 @@
+from django.conf import settings
+from django.db.models.functions import Lower
 from rest_framework import viewsets, mixins, status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DecimalField, IntegerField
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse, OpenApiTypes
+from core.metrics import RECIPE_IMAGE_UPLOAD_BYTES
 from core.models import Recipe, Tag, Ingredient
 from . import serializers
+from .batching import batched_writes
+from .deletion import delete_recipes
+from .indexes import MatchingIds, caching_enabled, get_index
+from .stats import TOP_DEFAULT, user_stats
+from .sync import SYNC_LIMIT_DEFAULT, SYNC_LIMIT_MAX, changes_since
+
+ORDERING_FIELDS = ['title', 'time_minutes', 'price', 'id']
+# Suffixes of the tag and ingredient filter parameters and their match mode.
+LINK_FILTER_MODES = {'': 'any', '_all': 'all', '_not': 'not'}
+RANGE_FILTERS = {
+    'time_minutes_min': ('time_minutes__gte', lambda: IntegerField(min_value=0)),
+    'time_minutes_max': ('time_minutes__lte', lambda: IntegerField(min_value=0)),
+    'price_min': ('price__gte', lambda: DecimalField(max_digits=None, decimal_places=None)),
+    'price_max': ('price__lte', lambda: DecimalField(max_digits=None, decimal_places=None)),
+}
+
+
+class RecipePagination(LimitOffsetPagination):
+    """Opt-in pagination, lists stay unpaginated unless ``limit`` is given."""
+    max_limit = 1000
 
 # Recipe ViewSet
 @extend_schema_view(
@@ -20,7 +47,37 @@ from . import serializers
                 'ingredients',
                 type=OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter by.',
-            )
+            ),
+            OpenApiParameter(
+                'tags_all',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of tag IDs that recipes must all have.',
+            ),
+            OpenApiParameter(
+                'tags_not',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of tag IDs that recipes must not have.',
+            ),
+            OpenApiParameter(
+                'ingredients_all',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of ingredient IDs that recipes must all have.',
+            ),
+            OpenApiParameter(
+                'ingredients_not',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of ingredient IDs that recipes must not have.',
+            ),
+            OpenApiParameter('time_minutes_min', type=OpenApiTypes.INT, description='Minimum preparation time.'),
+            OpenApiParameter('time_minutes_max', type=OpenApiTypes.INT, description='Maximum preparation time.'),
+            OpenApiParameter('price_min', type=OpenApiTypes.DECIMAL, description='Minimum price.'),
+            OpenApiParameter('price_max', type=OpenApiTypes.DECIMAL, description='Maximum price.'),
+            OpenApiParameter(
+                'ordering',
+                type=OpenApiTypes.STR,
+                enum=[f'{sign}{field}' for field in ORDERING_FIELDS for sign in ('', '-')],
+                description='Sort field, prefix with - for descending. Defaults to -id.',
+            ),
         ],
         tags=['recipes']
     ),
@@ -28,7 +85,57 @@ from . import serializers
     create=extend_schema(tags=['recipes']),
     update=extend_schema(tags=['recipes']),
     partial_update=extend_schema(tags=['recipes']),
-    destroy=extend_schema(tags=['recipes'])
+    destroy=extend_schema(tags=['recipes']),
+    stats=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'top',
+                type=OpenApiTypes.INT,
+                description='Number of top tags and ingredients to return, 1 to 100.',
+            )
+        ],
+        tags=['recipes']
+    ),
+    similar=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                type=OpenApiTypes.INT,
+                description='Number of similar recipes to return, 1 to 50.',
+            )
+        ],
+        tags=['recipes']
+    ),
+    bulk_delete=extend_schema(
+        request=serializers.RecipeBulkDeleteSerializer,
+        responses=serializers.RecipeBulkDeleteResultSerializer,
+        tags=['recipes']
+    ),
+    pantry=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ingredients',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of ingredient IDs at hand.',
+            ),
+            OpenApiParameter(
+                'names',
+                type=OpenApiTypes.STR,
+                description='Comma separated list of ingredient names at hand, matched case-insensitively.',
+            ),
+            OpenApiParameter(
+                'max_missing',
+                type=OpenApiTypes.INT,
+                description='Leave out recipes missing more ingredients than this.',
+            ),
+            OpenApiParameter(
+                'limit',
+                type=OpenApiTypes.INT,
+                description='Number of recipes to return, 1 to 100.',
+            ),
+        ],
+        tags=['recipes']
+    )
 )
 class RecipeViewSet(viewsets.ModelViewSet):
     """ViewSet for viewing and editing recipes."""
@@ -36,6 +143,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipePagination
+    read_from_replica = True
 
     def _params_to_ints(self, qs):
         """Convert a list of comma-separated strings to a list of integers."""
@@ -43,18 +152,82 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Retrieve recipes for the authenticated user, optionally filtered by tags or ingredients."""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset.filter(user=self.request.user)
+        link_filters = self._link_filters()
+        range_filters = self._range_filters()
+        ordering = self._ordering()
+
+        self._matching_ids = None
+        if link_filters and settings.RECIPE_BITMAP_FILTERS and caching_enabled() and self.action == 'list':
+            bitmaps = get_index(self.request.user.id).bitmaps()
+            matches = MatchingIds(bitmaps, bitmaps.select(link_filters), reverse=ordering[0] == '-id')
+            if ordering[0].lstrip('-') == 'id' and not range_filters and \
+                    self.paginator.get_limit(self.request) is not None:
+                # Pages follow the id order of the bitset, paginate_queryset fetches only the page.
+                self._matching_ids = matches
+            else:
+                queryset = queryset.filter(id__in=list(matches))
+        else:
+            for (field, mode), ids in link_filters.items():
+                if mode == 'any':
+                    queryset = queryset.filter(**{f'{field}__id__in': ids})
+                elif mode == 'all':
+                    for pk in ids:
+                        queryset = queryset.filter(**{f'{field}__id': pk})
+                else:
+                    queryset = queryset.exclude(**{f'{field}__id__in': ids})
+        queryset = queryset.filter(**range_filters)
+
+        return queryset.order_by(*ordering).distinct().prefetch_related('tags', 'ingredients')
+
+    def paginate_queryset(self, queryset):
+        """Paginate, fetching only the page by primary key when bitmap filters matched in id order."""
+        if self._matching_ids is None:
+            return super().paginate_queryset(queryset)
+        page_ids = super().paginate_queryset(self._matching_ids)
+        recipes = queryset.in_bulk(page_ids)
+        return [recipes[pk] for pk in page_ids if pk in recipes]
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+    def _link_filters(self):
+        """Return the tag and ingredient filters as (field, mode) mapped to ids."""
+        filters = {}
+        for field in ('tags', 'ingredients'):
+            for suffix, mode in LINK_FILTER_MODES.items():
+                value = self.request.query_params.get(f'{field}{suffix}')
+                if not value:
+                    continue
+                try:
+                    filters[field, mode] = self._params_to_ints(value)
+                except ValueError:
+                    raise ValidationError({f'{field}{suffix}': 'A comma separated list of integers is required.'})
+        return filters
 
-        return queryset.order_by('-id').distinct()
+    def _range_filters(self):
+        """Return lookups for the time and price range query parameters."""
+        filters = {}
+        errors = {}
+        for param, (lookup, field) in RANGE_FILTERS.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                filters[lookup] = field().run_validation(value)
+            except ValidationError as exc:
+                errors[param] = exc.detail
+        if errors:
+            raise ValidationError(errors)
+        return filters
+
+    def _ordering(self):
+        """Return the requested ordering with id as tie-breaker, matching a (user, field, id) index."""
+        ordering = self.request.query_params.get('ordering') or '-id'
+        field = ordering.lstrip('-')
+        if field not in ORDERING_FIELDS or len(ordering) - len(field) > 1:
+            raise ValidationError({
+                'ordering': f'Must be one of {", ".join(ORDERING_FIELDS)}, optionally prefixed with -.',
+            })
+        sign = '-' if ordering.startswith('-') else ''
+        return [ordering] if field == 'id' else [ordering, f'{sign}id']
 
     def get_serializer_class(self):
         """Return appropriate serializer class based on action."""
@@ -62,12 +235,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'stats':
+            return serializers.RecipeStatsSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
+        elif self.action == 'pantry':
+            return serializers.PantryRecipeSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.RecipeBulkDeleteSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new recipe for the authenticated user."""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete the recipe in a write batch, which locks the user row before the summary."""
+        with batched_writes():
+            instance.delete()
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a specific recipe."""
@@ -76,9 +262,112 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            RECIPE_IMAGE_UPLOAD_BYTES.inc(recipe.image.size)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """Return recipe count, averages, price distribution and top tags and ingredients."""
+        try:
+            top = min(max(int(request.query_params.get('top', TOP_DEFAULT)), 1), 100)
+        except ValueError:
+            raise ValidationError({'top': 'A valid integer is required.'})
+        serializer = self.get_serializer(user_stats(request.user.id, top))
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=True, pagination_class=None)
+    def similar(self, request, pk=None):
+        """Return the user's recipes sharing the most tags and ingredients with this one."""
+        recipe = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        ranked = get_index(request.user.id).similar(recipe.id, limit)
+        recipes = Recipe.objects.filter(user=request.user).prefetch_related('tags', 'ingredients').in_bulk(
+            [recipe_id for recipe_id, _ in ranked]
+        )
+        similar = []
+        for recipe_id, score in ranked:
+            if recipe_id in recipes:
+                recipes[recipe_id].similarity = score
+                similar.append(recipes[recipe_id])
+        return Response(self.get_serializer(similar, many=True).data)
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete the user's recipes with the given ids or matching all given filters."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selection = serializer.validated_data
+
+        recipes = Recipe.objects.all()
+        if 'ids' in selection:
+            recipes = recipes.filter(id__in=selection['ids'])
+        if 'tags' in selection:
+            recipes = recipes.filter(tags__id__in=selection['tags'])
+        if 'ingredients' in selection:
+            recipes = recipes.filter(ingredients__id__in=selection['ingredients'])
+        if 'updated_after' in selection:
+            recipes = recipes.filter(updated_at__gte=selection['updated_after'])
+        if 'updated_before' in selection:
+            recipes = recipes.filter(updated_at__lt=selection['updated_before'])
+
+        counts = delete_recipes(request.user.id, recipes)
+        return Response(serializers.RecipeBulkDeleteResultSerializer(counts).data)
+
+    def _pantry_ingredient_ids(self):
+        """Return the user's ingredient ids given by id or name."""
+        ids = self.request.query_params.get('ingredients')
+        names = self.request.query_params.get('names')
+        if not ids and not names:
+            raise ValidationError({'ingredients': 'Give ingredient IDs or names.'})
+
+        ingredient_ids = set()
+        if ids:
+            try:
+                ingredient_ids.update(self._params_to_ints(ids))
+            except ValueError:
+                raise ValidationError({'ingredients': 'A comma separated list of integers is required.'})
+        if names:
+            lowered = {name.strip().lower() for name in names.split(',') if name.strip()}
+            ingredient_ids.update(
+                Ingredient.objects.filter(user=self.request.user)
+                .annotate(lowered=Lower('name'))
+                .filter(lowered__in=lowered)
+                .values_list('id', flat=True)
+            )
+        return ingredient_ids
+
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def pantry(self, request):
+        """Return the user's recipes that can be cooked with the given ingredients, fewest missing first."""
+        ingredient_ids = self._pantry_ingredient_ids()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        max_missing = request.query_params.get('max_missing') or None
+        if max_missing is not None:
+            try:
+                max_missing = IntegerField(min_value=0).run_validation(max_missing)
+            except ValidationError as exc:
+                raise ValidationError({'max_missing': exc.detail})
+
+        ranked = get_index(request.user.id).bitmaps().pantry(ingredient_ids, limit, max_missing)
+        recipes = Recipe.objects.filter(user=request.user).prefetch_related('tags', 'ingredients').in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked]
+        )
+        matches = []
+        for recipe_id, missing, covered in ranked:
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_count = missing
+                recipes[recipe_id].covered_count = covered
+                matches.append(recipes[recipe_id])
+        return Response(self.get_serializer(matches, many=True).data)
+
 # Base ViewSet for Recipe Attributes (Tags and Ingredients)
 @extend_schema_view(
     list=extend_schema(
@@ -96,6 +385,7 @@ class BaseRecipeAttrViewSet(mixins.UpdateModelMixin, mixins.DestroyModelMixin, m
     """Base viewset for recipe attributes such as tags and ingredients."""
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    read_from_replica = True
 
     def get_queryset(self):
         """Retrieve attributes for the authenticated user, optionally filtering by assigned status."""
@@ -107,6 +397,11 @@ class BaseRecipeAttrViewSet(mixins.UpdateModelMixin, mixins.DestroyModelMixin, m
 
         return queryset.order_by('name').distinct()
 
+    def perform_destroy(self, instance):
+        """Delete the tag or ingredient in a write batch, which locks the user row before the summary."""
+        with batched_writes():
+            instance.delete()
+
 # Tag ViewSet
 @extend_schema_view(
     list=extend_schema(tags=['tags']),
@@ -134,3 +429,52 @@ class IngredientAttrViewSet(BaseRecipeAttrViewSet):
     """ViewSet for viewing and editing ingredients."""
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+
+# Sync View
+class SyncView(APIView):
+    """Changes of the user's recipes, tags and ingredients since a version."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    read_from_replica = True
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                type=OpenApiTypes.INT,
+                description='Version returned by the previous sync, 0 or omitted for a full sync.',
+            ),
+            OpenApiParameter(
+                'full',
+                type=OpenApiTypes.INT,
+                enum=[0, 1],
+                description='1 while paging through a full sync started from version 0.',
+            ),
+            OpenApiParameter(
+                'limit',
+                type=OpenApiTypes.INT,
+                description=f'Changes per page, 1 to {SYNC_LIMIT_MAX}.',
+            ),
+        ],
+        responses={
+            200: serializers.SyncSerializer,
+            410: OpenApiResponse(description='Changes since the version were pruned, sync again from version 0.'),
+        },
+        tags=['sync'],
+    )
+    def get(self, request):
+        """Return the next page of changes, sync again from the returned version while has_more is true.
+
+        A client answered with 410 drops its data and syncs again from version 0.
+        """
+        try:
+            since = IntegerField(min_value=0).run_validation(request.query_params.get('since') or 0)
+        except ValidationError as exc:
+            raise ValidationError({'since': exc.detail})
+        try:
+            limit = min(max(int(request.query_params.get('limit', SYNC_LIMIT_DEFAULT)), 1), SYNC_LIMIT_MAX)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        full = request.query_params.get('full') == '1'
+        changes = changes_since(request.user, since, limit, full=full)
+        return Response(serializers.SyncSerializer(changes, context={'request': request}).data)
@@ -0,0 +1,90 @@
+"""
+Batched deletion of users
+
+Deleting a user with Django's collector loads every recipe, tag,
+ingredient and link row into memory and deletes them in one transaction.
+request_deletion deactivates the user at once and records a UserDeletion,
+run_deletion then deletes the user's rows in small batches that commit
+one at a time, recording the rows deleted so far on the UserDeletion. An
+interrupted deletion continues where it stopped when run again.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient, UserDeletion
+from recipe.deletion import delete_rows
+
+DELETE_BATCH_SIZE = 1000
+# Tables deleted in order: (progress key, model, link tables as (progress key, through model, column)).
+STEPS = [
+    ('recipes', Recipe, [
+        ('recipe_tags', Recipe.tags.through, 'recipe_id'),
+        ('recipe_ingredients', Recipe.ingredients.through, 'recipe_id'),
+    ]),
+    ('tags', Tag, [('recipe_tags', Recipe.tags.through, 'tag_id')]),
+    ('ingredients', Ingredient, [('recipe_ingredients', Recipe.ingredients.through, 'ingredient_id')]),
+    ('change_log', ChangeLog, []),
+]
+
+
+def request_deletion(user):
+    """Deactivate a user and return its pending or unfinished UserDeletion."""
+    with transaction.atomic():
+        get_user_model().objects.filter(pk=user.pk).update(is_active=False)
+        deletion = UserDeletion.objects.filter(user=user).exclude(status=UserDeletion.DONE).first()
+        if deletion is None:
+            deletion = UserDeletion.objects.create(user=user, email=user.email)
+    return deletion
+
+
+def _delete_batch(deletion, name, model, ids, links):
+    """Delete one batch of rows and their links, recording progress in the same transaction."""
+    with transaction.atomic():
+        for link_name, through, column in links:
+            deleted = through.objects.filter(**{f'{column}__in': ids}).delete()[0]
+            deletion.progress[link_name] = deletion.progress.get(link_name, 0) + deleted
+        # Link rows are gone, nothing else references the rows, skip the collector and its signals.
+        deleted = delete_rows(model, ids)
+        deletion.progress[name] = deletion.progress.get(name, 0) + deleted
+        UserDeletion.objects.filter(pk=deletion.pk).update(progress=deletion.progress)
+
+
+def run_deletion(deletion_id, batch_size=DELETE_BATCH_SIZE, report=None):
+    """Delete the rows of a requested deletion batch by batch, then the user.
+
+    report is called with the UserDeletion after every batch.
+    """
+    deletion = UserDeletion.objects.get(pk=deletion_id)
+    if deletion.status == UserDeletion.DONE:
+        return deletion
+    user_id = deletion.user_id
+    deletion.status = UserDeletion.RUNNING
+    deletion.started_at = deletion.started_at or timezone.now()
+    deletion.error = ''
+    deletion.save(update_fields=['status', 'started_at', 'error'])
+
+    try:
+        if user_id is not None:
+            for name, model, links in STEPS:
+                rows = model.objects.filter(user_id=user_id).order_by('id').values_list('id', flat=True)
+                while ids := list(rows[:batch_size]):
+                    _delete_batch(deletion, name, model, ids, links)
+                    if report is not None:
+                        report(deletion)
+            # What is left (summary, admin log entries, permissions) is small enough for the collector.
+            get_user_model().objects.filter(pk=user_id).delete()
+    except Exception as exc:
+        deletion.status = UserDeletion.FAILED
+        deletion.error = repr(exc)
+        deletion.save(update_fields=['status', 'error'])
+        raise
+
+    deletion.user = None
+    deletion.status = UserDeletion.DONE
+    deletion.finished_at = timezone.now()
+    deletion.save(update_fields=['user', 'status', 'finished_at'])
+    if report is not None:
+        report(deletion)
+    return deletion
+
@@ -0,0 +1,74 @@
+"""Concurrency limiting for CPU-heavy user endpoints"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+
+class LimiterSaturated(Exception):
+    """Raised when no slot could be acquired in time"""
+
+
+class ConcurrencyLimiter:
+    """Bounded number of concurrent executions across worker processes.
+
+    Each of the ``max_concurrency`` slots is a key in the default cache,
+    taken with an atomic ``cache.add`` and leased for ``lease`` seconds so a
+    slot held by a killed worker frees itself. The bound therefore covers
+    every process sharing the cache; with a local-memory cache it only
+    covers the threads of one worker process, which under sync workers
+    with one thread never reaches the bound.
+
+    Callers that cannot get a slot within ``timeout`` seconds are rejected
+    instead of queueing, so a burst sheds load rather than starving
+    every worker.
+
+    The cache cannot compare and delete atomically. Once a lease has run
+    out another caller may take the slot, so a get followed by a delete
+    could free that caller's slot. A slot is therefore deleted only while
+    its lease has at least ``release_margin`` seconds left, otherwise it
+    is left to expire.
+    """
+
+    poll_interval = 0.005
+    release_margin = 1.0
+
+    def __init__(self, max_concurrency, timeout=0, key_prefix='limiter', lease=30):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.lease = lease
+
+    def _slot_key(self, index):
+        return f'{self.key_prefix}:slot:{index}'
+
+    def _try_acquire(self, token):
+        """Take a free slot and return its key, or None if all are held"""
+        start = random.randrange(self.max_concurrency)
+        for offset in range(self.max_concurrency):
+            key = self._slot_key((start + offset) % self.max_concurrency)
+            if cache.add(key, token, timeout=self.lease):
+                return key
+        return None
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        key = self._try_acquire(token)
+        while key is None and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            key = self._try_acquire(token)
+        if key is None:
+            raise LimiterSaturated()
+        acquired = time.monotonic()
+        try:
+            yield
+        finally:
+            if time.monotonic() - acquired < self.lease - self.release_margin:
+                cache.delete(key)
@@ -0,0 +1,12 @@
+"""
+Background jobs of the user app
+"""
+from core.jobs import job
+
+from .deletion import run_deletion
+
+
+@job('user.delete', timeout=3600)
+def delete_user(deletion_id):
+    """Run a deletion from request_deletion, an earlier failed attempt resumes where it stopped."""
+    run_deletion(deletion_id)
@@ -0,0 +1,94 @@
+"""
+Tests for batched user deletion
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient, UserDeletion
+from user import deletion
+
+
+def create_account(email, recipes=5):
+    user = get_user_model().objects.create_user(email, 'Password123')
+    tag = Tag.objects.create(user=user, name='Dinner')
+    ingredients = [Ingredient.objects.create(user=user, name=f'Ingredient {i}') for i in range(3)]
+    for index in range(recipes):
+        recipe = Recipe.objects.create(user=user, title=f'Recipe {index}', time_minutes=5, price=Decimal('1.00'))
+        recipe.tags.add(tag)
+        recipe.ingredients.add(*ingredients)
+    return user
+
+
+class UserDeletionTests(TestCase):
+    """Test deactivating users and deleting their rows in batches"""
+
+    def setUp(self):
+        self.user = create_account('delete@example.com')
+        self.other = create_account('keep@example.com', recipes=2)
+
+    def test_request_deletion_deactivates_once(self):
+        first = deletion.request_deletion(self.user)
+        second = deletion.request_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(first, second)
+        self.assertEqual(first.status, UserDeletion.PENDING)
+
+    def test_run_deletion_in_batches(self):
+        requested = deletion.request_deletion(self.user)
+        logged = ChangeLog.objects.filter(user=self.user).count()
+        reports = []
+
+        done = deletion.run_deletion(requested.pk, batch_size=2, report=lambda d: reports.append(dict(d.progress)))
+
+        self.assertEqual(done.status, UserDeletion.DONE)
+        self.assertIsNone(done.user)
+        self.assertEqual(done.progress, {
+            'recipes': 5, 'recipe_tags': 5, 'recipe_ingredients': 15, 'tags': 1, 'ingredients': 3,
+            'change_log': logged,
+        })
+        self.assertEqual(reports[0], {'recipe_tags': 2, 'recipe_ingredients': 6, 'recipes': 2})
+        self.assertFalse(get_user_model().objects.filter(email='delete@example.com').exists())
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 2)
+        self.assertEqual(Recipe.tags.through.objects.count(), 2)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 6)
+
+    def test_failed_deletion_resumes(self):
+        requested = deletion.request_deletion(self.user)
+        original = deletion._delete_batch
+        calls = []
+
+        def fail_second_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            original(*args)
+
+        with patch('user.deletion._delete_batch', side_effect=fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                deletion.run_deletion(requested.pk, batch_size=2)
+
+        requested.refresh_from_db()
+        self.assertEqual(requested.status, UserDeletion.FAILED)
+        self.assertEqual(requested.progress['recipes'], 2)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+        done = deletion.run_deletion(requested.pk, batch_size=2)
+
+        self.assertEqual(done.status, UserDeletion.DONE)
+        self.assertEqual(done.progress['recipes'], 5)
+        self.assertEqual(done.error, '')
+
+    def test_run_deletion_query_count(self):
+        requested = deletion.request_deletion(self.user)
+
+        # Per table one batch of a DELETE per link table and one for the rows, then the
+        # empty batch and the user, none of it growing with the number of rows.
+        with self.assertNumQueries(43):
+            deletion.run_deletion(requested.pk)
+
+        self.assertFalse(Recipe.objects.filter(user_id=self.user.id).exists())
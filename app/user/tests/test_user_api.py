@@ -1,10 +1,15 @@
 """Tests for the use Api"""
 
-from django.test import TestCase
+import socket
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from user import views
+from user.limiter import ConcurrencyLimiter
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -126,6 +131,93 @@ class PublicUserApiTest(TestCase):
         self.assertEqual(refresh_response.status_code, status.HTTP_200_OK)
         self.assertIn('access', refresh_response.data)
 
+    def test_create_token_rejected_when_limiter_saturated(self):
+        """Test that token requests are shed with 429 when all slots are busy"""
+        user_detail = {
+            'email': 'testuserapi36@example.com',
+            'password': 'Haslo1234',
+            'name': 'Adam',
+        }
+        create_user(**user_detail)
+        limiter = ConcurrencyLimiter(1)
+        payload = {
+            'email': user_detail['email'],
+            'password': user_detail['password'],
+        }
+
+        with patch('user.views.token_limiter', limiter), limiter.slot():
+            response = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertNotIn('access', response.data)
+
+    def test_create_token_rejected_when_other_worker_holds_slots(self):
+        """Test that the bound is shared by workers with one thread each"""
+        user_detail = {
+            'email': 'testuserapi38@example.com',
+            'password': 'Haslo1234',
+            'name': 'Piotr',
+        }
+        create_user(**user_detail)
+        # Every sync worker imports its own limiter, they only share the cache.
+        other_worker = ConcurrencyLimiter(1, key_prefix='auth-token-test')
+        this_worker = ConcurrencyLimiter(1, key_prefix='auth-token-test')
+        payload = {
+            'email': user_detail['email'],
+            'password': user_detail['password'],
+        }
+
+        with patch('user.views.token_limiter', this_worker):
+            with other_worker.slot():
+                response = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+            response = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_slots_are_per_host(self):
+        """Test that the token endpoint bounds the logins of one host, not of every host sharing the cache"""
+        self.assertIn(socket.gethostname(), views.token_limiter.key_prefix)
+
+    def test_slot_with_expiring_lease_is_left_to_expire(self):
+        """Test that a slot is not deleted once its lease may have been taken over"""
+        limiter = ConcurrencyLimiter(1, key_prefix='auth-token-test', lease=30)
+
+        with limiter.slot():
+            pass
+        self.assertIsNone(cache.get('auth-token-test:slot:0'))
+
+        with patch('user.limiter.time.monotonic', side_effect=[0, 0, 29.5]):
+            with limiter.slot():
+                token = cache.get('auth-token-test:slot:0')
+        self.assertIsNotNone(token)
+        self.assertEqual(cache.get('auth-token-test:slot:0'), token)
+        cache.delete('auth-token-test:slot:0')
+
+    def test_create_token_upgrades_password_hash(self):
+        """Test that logging in re-hashes the password with the configured cost"""
+        user_detail = {
+            'email': 'testuserapi37@example.com',
+            'password': 'Haslo1234',
+            'name': 'Ewa',
+        }
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            user = create_user(**user_detail)
+        self.assertIn('$1000$', user.password)
+        payload = {
+            'email': user_detail['email'],
+            'password': user_detail['password'],
+        }
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn('$2000$', user.password)
+        self.assertTrue(user.check_password(user_detail['password']))
+
     def test_retrieve_user_unauthorized(self):
         """Test that authentication is required for users"""
         response = self.client.get(ME_URL)
@@ -1,8 +1,21 @@
 """Views for the use Api"""
+import socket
+
+from django.conf import settings
 from rest_framework import  generics, authentication, permissions
+from rest_framework.exceptions import Throttled
 from rest_framework_simplejwt.views import TokenObtainPairView
+from .limiter import ConcurrencyLimiter, LimiterSaturated
 from .serializers import UserSerializer, AuthTokenSerializer
 
+token_limiter = ConcurrencyLimiter(
+    settings.AUTH_TOKEN_MAX_CONCURRENCY,
+    timeout=settings.AUTH_TOKEN_QUEUE_TIMEOUT,
+    # Slots are per host, AUTH_TOKEN_MAX_CONCURRENCY bounds the logins hashing on one machine.
+    key_prefix=f'auth-token:{socket.gethostname()}',
+    lease=settings.AUTH_TOKEN_SLOT_LEASE,
+)
+
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
@@ -11,6 +24,14 @@ class CreateTokenView(TokenObtainPairView):
     """Create a new JWT token for the user"""
     serializer_class = AuthTokenSerializer
 
+    def post(self, request, *args, **kwargs):
+        """Hash the password only when a limiter slot is free, shed with 429 otherwise"""
+        try:
+            with token_limiter.slot():
+                return super().post(request, *args, **kwargs)
+        except LimiterSaturated:
+            raise Throttled(wait=settings.AUTH_TOKEN_RETRY_AFTER)
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
@@ -19,4 +40,4 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Retrieve and return authenticated user"""
-        return self.request.user
\ No newline at end of file
+        return self.request.user